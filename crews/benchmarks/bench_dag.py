@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""Compare sequential and DAG execution of TestingCrews on the stub LLM
+
+Usage: python benchmarks/bench_dag.py [--latency SECONDS] [--runs N]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent))
+
+from testing_crews.crew import TestingCrews
+from stub_llm import StubLLM
+
+
+def run_once(execution: str, latency: float) -> float:
+    llm = StubLLM(latency=latency)
+    crew = TestingCrews(execution=execution).crew()
+    crew.verbose = False
+    for agent in crew.agents:
+        agent.llm = llm
+        agent.verbose = False
+
+    start = time.perf_counter()
+    crew.kickoff(inputs={"query": "5 days in Dubai from 1 June 2025, medium budget"})
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per stub LLM call")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per execution mode")
+    args = parser.parse_args()
+
+    results = {}
+    for execution in ("sequential", "dag"):
+        timings = [run_once(execution, args.latency) for _ in range(args.runs)]
+        results[execution] = statistics.median(timings)
+
+    print(f"\nStub LLM latency: {args.latency:.2f}s per call, {args.runs} runs per mode")
+    for execution, median in results.items():
+        print(f"  {execution:<10} median {median:.2f}s")
+    print(f"  speedup    {results['sequential'] / results['dag']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import json
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from crewai.llms.base_llm import BaseLLM
+
+STUB_TRIP_DETAILS = {
+    "destination": "Dubai",
+    "duration": "5 days",
+    "start_date": "1 June 2025",
+    "budget": "medium",
+    "interests": ["culture", "food"],
+    "group_size": 2,
+    "accommodation_type": None,
+}
+
+STUB_ATTRACTIONS = {
+    "destination": "Dubai",
+    "attractions": [
+        {
+            "name": "Burj Khalifa",
+            "description": "Observation deck at the world's tallest building.",
+            "location": "Downtown Dubai",
+            "opening_hours": "8:30 AM - 11:00 PM",
+            "estimated_visit_time": "1-2 hours",
+            "category": "Landmark",
+            "rating": 4.7,
+        },
+        {
+            "name": "Al Fahidi Historical Neighbourhood",
+            "description": "Restored old quarter with galleries and museums.",
+            "location": "Bur Dubai",
+            "opening_hours": "8:00 AM - 8:00 PM",
+            "estimated_visit_time": "2 hours",
+            "category": "Culture",
+            "rating": 4.5,
+        },
+    ],
+    "total_found": 2,
+    "search_date": "2025-06-01",
+}
+
+STUB_TRIP_PLAN = "#### Day 1: Downtown Dubai\n- 10:00 AM Burj Khalifa\n\n#### Day 2: Old Dubai\n- 9:00 AM Al Fahidi"
+
+
+class StubLLM(BaseLLM):
+    """Offline LLM that answers every call with a canned final answer after a fixed delay
+
+    The response is picked from the task prompt, so the same stub can drive every agent of the crew.
+    """
+
+    def __init__(self, latency: float = 0.5):
+        super().__init__(model="stub")
+        self.latency = latency
+        self.calls = 0
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+
+        prompt = messages if isinstance(messages, str) else "\n".join(m["content"] for m in messages)
+        if "Extract trip details" in prompt:
+            answer = json.dumps(STUB_TRIP_DETAILS)
+        elif "day-by-day trip plan" in prompt:
+            answer = STUB_TRIP_PLAN
+        else:
+            answer = json.dumps(STUB_ATTRACTIONS)
+
+        return f"Thought: I now can give a great answer\nFinal Answer: {answer}"
+
+    def supports_function_calling(self) -> bool:
+        return False
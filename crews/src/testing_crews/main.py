@@ -1,5 +1,7 @@
 #!/usr/bin/env python
+import os
 import sys
+import json
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
@@ -7,12 +9,16 @@ sys.path.append(str(Path(__file__).parent.parent))
 from datetime import datetime
 
 from testing_crews.crew import TestingCrews
+from testing_crews.model_routing import get_router
 
 
 def run():
     """
-    Run the crew.
+    Run the crew. Pass --profile to profile each task (same as CREW_PROFILE=1).
     """
+    if "--profile" in sys.argv[1:]:
+        os.environ["CREW_PROFILE"] = "1"
+
     query = input("Enter your trip query: ")
     inp = {
         "query": query
@@ -25,5 +31,8 @@ def run():
     except Exception as e:
         raise Exception(f"An error occurred while running the crew: {e}")
 
+    print("Model routes:")
+    print(json.dumps(get_router().report(), indent=2))
+
 if __name__ == "__main__":
     run()   
\ No newline at end of file
@@ -10,6 +10,7 @@ class TripDetails(BaseModel):
     interests: List[str] = Field(default_factory=list, description="List of interests or preferences mentioned")
     group_size: Optional[int] = Field(None, description="Number of people traveling")
     accommodation_type: Optional[str] = Field(None, description="Preferred accommodation type if mentioned")
+    origin: Optional[str] = Field(None, description="City the trip starts from, the traveller's home city unless mentioned")
 
 class Attraction(BaseModel):
     """Model for a single attraction"""
@@ -0,0 +1,43 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+from crewai.agents.agent_builder.base_agent import BaseAgent
+from crewai.tasks.task_output import TaskOutput
+from crewai.tools import BaseTool
+
+from testing_crews.profiling import ProfiledTask
+
+# Upper bound on the number of async tasks running at the same time across all crews in the process
+DEFAULT_MAX_PARALLEL_TASKS = 3
+
+_task_pool: Optional[ThreadPoolExecutor] = None
+_task_pool_lock = threading.Lock()
+
+
+def get_task_pool() -> ThreadPoolExecutor:
+    """Return the shared worker pool used to run async tasks, creating it on first use"""
+    global _task_pool
+    with _task_pool_lock:
+        if _task_pool is None:
+            max_workers = int(os.getenv("CREW_MAX_PARALLEL_TASKS", DEFAULT_MAX_PARALLEL_TASKS))
+            _task_pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="crew-task")
+        return _task_pool
+
+
+class BoundedTask(ProfiledTask):
+    """Task whose async execution runs on the shared, bounded task pool
+
+    crewai starts a new thread for every async task. Submitting to a pool instead caps how many
+    searches run at once, and errors raised by the task are propagated through the future
+    instead of leaving the crew waiting on it.
+    """
+
+    def execute_async(
+        self,
+        agent: Optional[BaseAgent] = None,
+        context: Optional[str] = None,
+        tools: Optional[List[BaseTool]] = None,
+    ) -> Future[TaskOutput]:
+        return get_task_pool().submit(self._execute_core, agent, context, tools)
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# User whose profile is crewai's shared knowledge file; other users without a profile get none
+DEFAULT_USER = "default"
+DEFAULT_PROFILE = "user_preference.txt"
+
+# Size of the hashed feature vectors; changing it or the vectorizer invalidates stored vectors
+VECTOR_DIM = 512
+EMBEDDING_VERSION = f"hashed-ngrams-{VECTOR_DIM}-v1"
+
+# Words left out of the vectors: every profile statement is about "the user"
+STOPWORDS = frozenset("a an the is are was of in on to and or what where who which user users their they".split())
+
+# Words per chunk; profiles are short statements, so most chunks are a whole statement
+CHUNK_WORDS = 40
+
+# Questions whose best matching chunks hold each default, and how to read the value from them
+DEFAULT_QUERIES = {
+    "home_city": ("where is the user based, home city, lives in", r"\b(?:based in|lives in|living in|from|home (?:city|town) is)\s+([^.\n]+)"),
+    "interests": ("what is the user interested in, interests, likes, enjoys", r"\b(?:interested in|interests are|likes|enjoys|loves)\s+([^.\n]+)"),
+}
+
+
+def _split_chunks(text: str) -> List[str]:
+    """Split a profile into statements, and statements longer than CHUNK_WORDS into pieces"""
+    chunks: List[str] = []
+    for statement in re.split(r"(?<=[.!?])\s+|\n+", text):
+        words = statement.split()
+        chunks += [" ".join(words[i:i + CHUNK_WORDS]) for i in range(0, len(words), CHUNK_WORDS)]
+    return chunks
+
+
+def embed(texts: List[str]) -> np.ndarray:
+    """L2-normalized hashed word and character trigram vectors; cheap, local and the same in every process"""
+    vectors = np.zeros((len(texts), VECTOR_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = [word for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS]
+        features = [(f"w:{word}", 1.0) for word in words]
+        features += [(f"c:{word[i:i + 3]}", 0.25) for word in words for i in range(max(len(word) - 2, 1))]
+        for feature, weight in features:
+            value = zlib.crc32(feature.encode("utf-8"))
+            vectors[row, value % VECTOR_DIM] += weight if value & 0x80000000 else -weight
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class UserProfile:
+    """Chunks of one user's profile with their vectors, memory-mapped from the store"""
+
+    def __init__(self, user_id: str, chunks: List[str], vectors: np.ndarray):
+        self.user_id = user_id
+        self.chunks = chunks
+        self.vectors = vectors
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Chunks most similar to a query, with their cosine similarity"""
+        if not self.chunks:
+            return []
+        similarities = self.vectors @ embed([query])[0]
+        order = np.argsort(-similarities)[:limit]
+        return [(self.chunks[index], float(similarities[index])) for index in order]
+
+    def defaults(self) -> Dict[str, object]:
+        """Trip detail defaults read from the profile: the home city and the interests"""
+        found: Dict[str, object] = {}
+        for field, (query, pattern) in DEFAULT_QUERIES.items():
+            values = [
+                match.group(1).strip()
+                for chunk, similarity in self.search(query)
+                if similarity > 0
+                for match in [re.search(pattern, chunk, re.IGNORECASE)]
+                if match
+            ]
+            if not values:
+                continue
+            if field == "interests":
+                found[field] = [part.strip() for value in values for part in re.split(r",|\band\b", value) if part.strip()]
+            else:
+                found[field] = values[0]
+        return found
+
+
+class ProfileStore:
+    """Per-user profile knowledge, chunked and embedded once and kept on disk
+
+    A user's profile is read from <knowledge_dir>/users/<user_id>.txt, or from
+    <knowledge_dir>/user_preference.txt for the default user; other users without a profile file
+    get an empty profile, never someone else's. Its chunks and vectors are stored in
+    <store_dir>/<user_id>/ together with a hash of the profile text; they are rebuilt only when
+    the profile changes, and the vectors are memory-mapped when the profile is first used.
+    """
+
+    def __init__(self, knowledge_dir: str = "knowledge", store_dir: Optional[str] = None):
+        self.knowledge_dir = Path(knowledge_dir)
+        self.store_dir = Path(store_dir) if store_dir else self.knowledge_dir / ".profile_store"
+        self._profiles: Dict[str, UserProfile] = {}
+        self._lock = threading.Lock()
+
+    def profile_path(self, user_id: str) -> Path:
+        """Profile file of a user; only the default user falls back to the shared profile"""
+        if not user_id or user_id in (".", "..") or any(separator in user_id for separator in ("/", "\\", os.sep)):
+            raise ValueError(f"Invalid user id: {user_id!r}")
+        user_path = self.knowledge_dir / "users" / f"{user_id}.txt"
+        if user_id == DEFAULT_USER and not user_path.exists():
+            return self.knowledge_dir / DEFAULT_PROFILE
+        return user_path
+
+    def get(self, user_id: str = DEFAULT_USER) -> UserProfile:
+        """Load a user's profile, embedding it first if it is new or has changed since it was stored"""
+        with self._lock:
+            if user_id not in self._profiles:
+                self._profiles[user_id] = self._load(user_id)
+            return self._profiles[user_id]
+
+    def _load(self, user_id: str) -> UserProfile:
+        path = self.profile_path(user_id)
+        if not path.exists():
+            return UserProfile(user_id, [], np.zeros((0, VECTOR_DIM), dtype=np.float32))
+
+        text = path.read_text(encoding="utf-8")
+        content_hash = hashlib.sha256(f"{EMBEDDING_VERSION}\n{text}".encode("utf-8")).hexdigest()
+        user_dir = self.store_dir / user_id
+        index_path = user_dir / "chunks.json"
+        vectors_path = user_dir / "vectors.npy"
+
+        if index_path.exists() and vectors_path.exists():
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("content_hash") == content_hash:
+                return UserProfile(user_id, index["chunks"], np.load(vectors_path, mmap_mode="r"))
+
+        print(f"🧠 Embedding the profile of {user_id} from {path}")
+        chunks = _split_chunks(text)
+        user_dir.mkdir(parents=True, exist_ok=True)
+        # Write to temporary files and rename, so a crew starting meanwhile never reads half a store
+        np.save(user_dir / "vectors.tmp.npy", embed(chunks))
+        os.replace(user_dir / "vectors.tmp.npy", vectors_path)
+        with open(user_dir / "chunks.tmp.json", "w", encoding="utf-8") as f:
+            json.dump({"content_hash": content_hash, "source": str(path), "chunks": chunks}, f, indent=2)
+        os.replace(user_dir / "chunks.tmp.json", index_path)
+        return UserProfile(user_id, chunks, np.load(vectors_path, mmap_mode="r"))
+
+
+def describe_defaults(defaults: Dict[str, object]) -> str:
+    """Profile defaults as a line for the extraction prompt"""
+    if not defaults:
+        return "No traveller profile is available."
+    parts = []
+    if defaults.get("home_city"):
+        parts.append(f"home city (origin): {defaults['home_city']}")
+    if defaults.get("interests"):
+        parts.append(f"interests: {', '.join(defaults['interests'])}")
+    return "; ".join(parts)
+
+
+_store: Optional[ProfileStore] = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store() -> ProfileStore:
+    """Return the process-wide profile store, reading profiles from CREW_KNOWLEDGE_DIR (default: knowledge)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ProfileStore(os.getenv("CREW_KNOWLEDGE_DIR", "knowledge"))
+        return _store
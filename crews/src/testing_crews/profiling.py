@@ -0,0 +1,236 @@
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from crewai import Task
+from crewai.agents.agent_builder.base_agent import BaseAgent
+from crewai.tasks.task_output import TaskOutput
+from crewai.tools import BaseTool
+
+# Directory the reports are written to, overridden by CREW_PROFILE_DIR
+DEFAULT_PROFILE_DIR = os.path.join("output", "profile")
+
+# Seconds between stack samples, overridden by CREW_PROFILE_INTERVAL
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# Allocation sites listed in each task's report
+TOP_ALLOCATIONS = 25
+
+# Frames kept per traced allocation; deeper tracebacks make every allocation slower
+TRACEMALLOC_FRAMES = 10
+
+# Functions a thread blocks in while it waits on another thread, a model or a web search; samples
+# ending in them are counted as idle and left out of the flamegraph, which shows local CPU time
+IDLE_FUNCTIONS = frozenset({
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "readinto"),
+    ("ssl.py", "read"),
+    ("ssl.py", "recv_into"),
+})
+
+
+def profiling_enabled() -> bool:
+    """Whether tasks are profiled, from CREW_PROFILE"""
+    return os.getenv("CREW_PROFILE", "").lower() in ("1", "true", "yes", "on")
+
+
+class TaskProfile:
+    """Stack samples and allocations of one task, written to the profile directory when it ends"""
+
+    def __init__(self, name: str, output_dir: str):
+        self.name = name
+        self.output_dir = output_dir
+        self.stacks: Counter = Counter()
+        self.threads = {threading.get_ident()}
+        self.samples = 0
+        self.idle = 0
+        # Set when another task was profiled at the same time, whose allocations are then mixed in
+        self.overlapped = False
+        self.started = time.perf_counter()
+        self.duration = 0.0
+
+    def write(self, snapshot: tracemalloc.Snapshot, traced_memory: Tuple[int, int]) -> List[str]:
+        """Write the collapsed stacks, for flamegraph.pl or speedscope, and the allocations report"""
+        directory = self.output_dir
+        os.makedirs(directory, exist_ok=True)
+        collapsed_path = os.path.join(directory, f"{self.name}.collapsed")
+        with open(collapsed_path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        allocations_path = os.path.join(directory, f"{self.name}.alloc.txt")
+        current, peak = traced_memory
+        with open(allocations_path, "w") as f:
+            busy = sum(self.stacks.values())
+            f.write(f"# {self.name}: {self.duration:.3f}s, {self.samples} samples, {busy} thread samples on CPU, {self.idle} idle\n")
+            f.write(f"# allocated during the task and still held {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n")
+            if self.overlapped:
+                f.write("# other tasks were profiled at the same time: their allocations are included\n")
+            f.write(f"# top {TOP_ALLOCATIONS} allocation sites of the memory still held\n\n")
+            for stat in snapshot.statistics("traceback")[:TOP_ALLOCATIONS]:
+                f.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                for line in stat.traceback.format(most_recent_first=True)[:TRACEMALLOC_FRAMES * 2]:
+                    f.write(f"    {line}\n")
+        return [collapsed_path, allocations_path]
+
+
+class Sampler:
+    """Process-wide thread that samples the stacks of the threads running profiled tasks
+
+    Sampling reads every thread's current frame with sys._current_frames, so the profiled code is
+    not instrumented and runs at full speed; the cost is one stack walk per profiled thread per
+    interval, in this thread. The thread sleeps while no task is being profiled.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._profiles: List[TaskProfile] = []
+        self._labels: Dict[object, str] = {}
+        self._idle_codes: Dict[object, bool] = {}
+        self._lock = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        # Whether the sampler started tracemalloc, and so stops it once no task is profiled
+        self._tracing = False
+
+    def add(self, profile: TaskProfile) -> bool:
+        """Start sampling for a profile, returning whether it is the only one being sampled"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                self._tracing = True
+            self._profiles.append(profile)
+            if len(self._profiles) > 1:
+                for other in self._profiles:
+                    other.overlapped = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="profiler")
+                self._thread.start()
+            self._lock.notify_all()
+            return len(self._profiles) == 1
+
+    def remove(self, profile: TaskProfile):
+        """Stop sampling for a profile, and tracing allocations after the last one"""
+        with self._lock:
+            self._profiles.remove(profile)
+            # Tracing slows every allocation down, so it is only kept on while tasks are profiled
+            if not self._profiles and self._tracing:
+                tracemalloc.stop()
+                self._tracing = False
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            # Module path relative to its package, so frames read "testing_crews/crew.py" not the full path
+            path = "/".join(code.co_filename.replace(os.sep, "/").split("/")[-2:])
+            label = re.sub(r"[;\s]", "_", f"{code.co_name}({path}:{code.co_firstlineno})")
+            self._labels[code] = label
+        return label
+
+    def _is_idle(self, code) -> bool:
+        idle = self._idle_codes.get(code)
+        if idle is None:
+            idle = (os.path.basename(code.co_filename), code.co_name) in IDLE_FUNCTIONS
+            self._idle_codes[code] = idle
+        return idle
+
+    def _collapse(self, frame) -> str:
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(labels))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._profiles:
+                    self._lock.wait()
+                profiles = list(self._profiles)
+
+            frames = sys._current_frames()
+            for profile in profiles:
+                profile.samples += 1
+                for thread_id in list(profile.threads):
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    if self._is_idle(frame.f_code):
+                        profile.idle += 1
+                    else:
+                        profile.stacks[self._collapse(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+_sampler: Optional[Sampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler() -> Sampler:
+    """Return the process-wide sampler, sampling every CREW_PROFILE_INTERVAL seconds"""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = Sampler(float(os.getenv("CREW_PROFILE_INTERVAL", DEFAULT_SAMPLE_INTERVAL)))
+        return _sampler
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    # Leave out the profiler's own allocations: the samples and tracemalloc's bookkeeping
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+
+
+@contextmanager
+def profile_task(name: str, output_dir: Optional[str] = None) -> Iterator[Optional[TaskProfile]]:
+    """Sample the stacks and trace the allocations of a task, if profiling is enabled
+
+    The samples cover the thread running the task. Allocations are traced from a clean slate: the
+    traces are cleared when the task starts, so the snapshot taken when it ends holds only what the
+    task allocated and still holds, and comparing two snapshots of the whole heap is avoided.
+    tracemalloc traces the whole process, so while other tasks are profiled the traces are left
+    alone and the reports of overlapping tasks, like the concurrent searches of the "dag"
+    execution, include each other's allocations; use execution="sequential" for clean ones.
+    """
+    if not profiling_enabled():
+        yield None
+        return
+
+    profile = TaskProfile(name, output_dir or os.getenv("CREW_PROFILE_DIR", DEFAULT_PROFILE_DIR))
+    sampler = get_sampler()
+    if sampler.add(profile):
+        tracemalloc.clear_traces()
+        tracemalloc.reset_peak()
+    try:
+        yield profile
+    finally:
+        profile.duration = time.perf_counter() - profile.started
+        # Read the allocations before the profile is removed, which may stop tracing
+        snapshot, traced_memory = _take_snapshot(), tracemalloc.get_traced_memory()
+        sampler.remove(profile)
+        paths = profile.write(snapshot, traced_memory)
+        print(f"🔬 Profiled {name} ({profile.samples} samples): {', '.join(paths)}")
+
+
+class ProfiledTask(Task):
+    """Task that is profiled while it runs, when CREW_PROFILE is set"""
+
+    def _execute_core(
+        self,
+        agent: Optional[BaseAgent],
+        context: Optional[str],
+        tools: Optional[List[BaseTool]],
+    ) -> TaskOutput:
+        with profile_task(self.name or "task"):
+            return super()._execute_core(agent, context, tools)
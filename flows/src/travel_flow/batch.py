@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+import argparse
+import json
+import os
+import re
+import signal
+import socket
+import sys
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from travel_flow.main import TripPlanningFlow
+from travel_flow.work_queue import DEFAULT_QUEUE_PATH, DEFAULT_VISIBILITY_TIMEOUT, LeaseLost, Lease, SQLiteWorkQueue, WorkQueue
+
+# Seconds an idle worker waits before asking the queue for work again
+POLL_INTERVAL = 5.0
+
+# Job ids name the run's output directory, so they are limited to a single safe path component
+JOB_ID_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]{0,127}")
+
+
+def job_from_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a job payload from a requests.jsonl-style line, which must have a query"""
+    query = request.get("query")
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("Request has no query")
+    payload: Dict[str, Any] = {"query": query.strip()}
+    if request.get("time_budget") is not None:
+        payload["time_budget"] = float(request["time_budget"])
+    return payload
+
+
+def job_id_from_request(request: Dict[str, Any]) -> Optional[str]:
+    """Read the job id of a requests.jsonl-style line from "run_id" or "request_id", if it has one"""
+    job_id = request.get("run_id") or request.get("request_id")
+    if job_id is None:
+        return None
+    if not isinstance(job_id, str) or not JOB_ID_PATTERN.fullmatch(job_id):
+        raise ValueError(f"Invalid job id {job_id!r}: use letters, digits, '.', '_' and '-' only")
+    return job_id
+
+
+class BatchWorker:
+    """Pulls trip planning jobs from a WorkQueue and runs TripPlanningFlow for each
+
+    The job id is the run id: each run writes its files to <output_root>/<run_id>/ and the queue
+    keeps a summary of the result under the same id. While a run is in progress its lease is
+    extended in the background; if the lease is lost anyway, the run's deadline is cancelled so
+    it winds down instead of racing the worker that took the job over.
+    """
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        worker_id: Optional[str] = None,
+        concurrency: int = 1,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+        poll_interval: float = POLL_INTERVAL,
+        output_root: str = os.path.join("output", "runs"),
+        time_budget: Optional[float] = None,
+    ):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.output_root = output_root
+        self.time_budget = time_budget
+        self._stopping = threading.Event()
+
+    def stop(self):
+        """Stop leasing new jobs; the jobs in progress are finished"""
+        self._stopping.set()
+
+    def run(self, stop_when_empty: bool = False):
+        """Work on jobs until stopped, or until the queue has nothing left to lease"""
+        threads = [
+            threading.Thread(target=self._work, args=(stop_when_empty,), name=f"batch-{index}")
+            for index in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            # Join with a timeout so the main thread still receives signals
+            while thread.is_alive():
+                thread.join(timeout=1)
+
+    def _work(self, stop_when_empty: bool):
+        while not self._stopping.is_set():
+            lease = self.queue.lease(self.worker_id, self.visibility_timeout)
+            if lease is None:
+                if stop_when_empty:
+                    return
+                self._stopping.wait(self.poll_interval)
+                continue
+            self.process(lease)
+
+    def process(self, lease: Lease):
+        """Run the flow for one leased job and report the outcome to the queue"""
+        job = lease.job
+        print(f"📦 Job {job.job_id} (attempt {job.attempts}/{job.max_attempts}): {job.payload['query']}")
+
+        flow = TripPlanningFlow(
+            time_budget=job.payload.get("time_budget", self.time_budget),
+            output_dir=os.path.join(self.output_root, job.job_id),
+            interactive=False,
+        )
+
+        def on_lease_lost():
+            print(f"⚠️ Lost the lease on job {job.job_id}, stopping the run")
+            if flow.deadline is not None:
+                flow.deadline.cancel()
+
+        error = None
+        with LeaseKeeper(self.queue, lease, self.visibility_timeout, on_lease_lost) as keeper:
+            try:
+                flow.kickoff(inputs={"id": job.job_id, "user_query": job.payload["query"]})
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+
+        try:
+            if error is not None:
+                print(f"❌ Job {job.job_id} failed: {error}")
+                self.queue.fail(keeper.lease, error)
+                return
+            self.queue.complete(keeper.lease, {
+                "run_id": job.job_id,
+                "output_dir": flow.output_dir,
+                "destination": flow.state.trip_details.destination if flow.state.trip_details else None,
+                "degraded_steps": flow.state.degraded_steps,
+            })
+            print(f"✅ Job {job.job_id} done: {flow.output_dir}")
+        except LeaseLost:
+            print(f"⚠️ Lease on job {job.job_id} was lost, its outcome is left to the worker that took it over")
+
+
+class LeaseKeeper:
+    """Extends a lease in the background while its job runs"""
+
+    def __init__(self, queue: WorkQueue, lease: Lease, visibility_timeout: float, on_lost: Callable[[], None]):
+        self.queue = queue
+        self.lease = lease
+        self.visibility_timeout = visibility_timeout
+        self.on_lost = on_lost
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._keep, daemon=True, name=f"lease-{lease.job.job_id}")
+
+    def __enter__(self) -> "LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._done.set()
+        self._thread.join()
+
+    def _keep(self):
+        # Extend well before expiry so a slow queue doesn't cost the lease
+        while not self._done.wait(self.visibility_timeout / 3):
+            try:
+                self.lease = self.queue.extend(self.lease, self.visibility_timeout)
+            except LeaseLost:
+                self.on_lost()
+                return
+
+
+def batch():
+    """Enqueue trip planning jobs and work on them from a durable queue"""
+    parser = argparse.ArgumentParser(description="Batch trip planning from a durable work queue")
+    parser.add_argument("--queue", default=os.getenv("TRAVEL_FLOW_QUEUE", DEFAULT_QUEUE_PATH), help="SQLite queue file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Queue one job per line of a requests.jsonl-style file")
+    enqueue.add_argument("requests_file")
+    enqueue.add_argument("--max-attempts", type=int, default=3)
+
+    work = commands.add_parser("work", help="Run queued jobs")
+    work.add_argument("--concurrency", type=int, default=1)
+    work.add_argument("--visibility-timeout", type=float, default=DEFAULT_VISIBILITY_TIMEOUT)
+    work.add_argument("--time-budget", type=float, default=None)
+    work.add_argument("--output-root", default=os.path.join("output", "runs"))
+    work.add_argument("--until-empty", action="store_true", help="Exit once no job is left to lease")
+    work.add_argument("--profile", action="store_true", help="Profile each step into <run>/profile/ (same as TRAVEL_FLOW_PROFILE=1)")
+
+    status = commands.add_parser("status", help="Show job counts, or the jobs with a given status")
+    status.add_argument("status", nargs="?", choices=["queued", "leased", "done", "dead"])
+
+    requeue = commands.add_parser("requeue", help="Give dead-lettered jobs a fresh set of attempts")
+    requeue.add_argument("job_ids", nargs="+")
+
+    args = parser.parse_args()
+    queue = SQLiteWorkQueue(args.queue)
+
+    if args.command == "enqueue":
+        queued = duplicates = 0
+        with open(args.requests_file, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("Request is not a JSON object")
+                    payload = job_from_request(request)
+                    job_id = job_id_from_request(request)
+                except (json.JSONDecodeError, ValueError) as e:
+                    print(f"⚠️ Skipping line {line_number}: {e}")
+                    continue
+                if queue.enqueue(payload, job_id=job_id, max_attempts=args.max_attempts) is None:
+                    duplicates += 1
+                else:
+                    queued += 1
+        print(f"📥 Queued {queued} jobs in {args.queue}" + (f", {duplicates} already queued" if duplicates else ""))
+
+    elif args.command == "work":
+        if args.profile:
+            os.environ["TRAVEL_FLOW_PROFILE"] = "1"
+        worker = BatchWorker(
+            queue,
+            concurrency=args.concurrency,
+            visibility_timeout=args.visibility_timeout,
+            output_root=args.output_root,
+            time_budget=args.time_budget,
+        )
+        # Finish the jobs in progress on Ctrl+C or a termination signal
+        signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+        signal.signal(signal.SIGINT, lambda *_: worker.stop())
+        worker.run(stop_when_empty=args.until_empty)
+
+    elif args.command == "status":
+        if args.status:
+            for job in queue.jobs(args.status):
+                print(json.dumps(job.model_dump(include={"job_id", "attempts", "last_error", "result"})))
+        else:
+            print(json.dumps(queue.stats(), indent=2))
+
+    elif args.command == "requeue":
+        for job_id in args.job_ids:
+            print(f"{job_id}: {'requeued' if queue.requeue(job_id) else 'not dead-lettered'}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(batch())
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+# Seconds a cached search or attractions result stays fresh, overridden by TRAVEL_FLOW_CACHE_TTL
+DEFAULT_CACHE_TTL = 6 * 60 * 60
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a time to live
+
+    The caches live for the lifetime of the process, so a long-running process (the HTTP
+    service, or a pool worker serving one shard of destinations) reuses results across runs.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl: Optional[float] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl if ttl is not None else float(os.getenv("TRAVEL_FLOW_CACHE_TTL", DEFAULT_CACHE_TTL))
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Check for a fresh entry without counting a hit or a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def expires_in(self, key: Hashable) -> Optional[float]:
+        """Seconds until an entry expires, or None if there is no fresh entry; not counted as a lookup"""
+        with self._lock:
+            entry = self._entries.get(key)
+            remaining = entry[0] - time.monotonic() if entry is not None else 0
+            return remaining if remaining > 0 else None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+_caches: Dict[str, Any] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str, max_entries: int = 1024) -> TTLCache:
+    """Return the process-wide cache with the given name, creating it on first use"""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = TTLCache(name, max_entries)
+        return _caches[name]
+
+
+def register_cache(cache: Any):
+    """Include a cache of another kind, with a name and a stats() method, in cache_stats()"""
+    with _caches_lock:
+        _caches[cache.name] = cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit and size counters of every cache in this process"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
@@ -0,0 +1,124 @@
+import os
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from travel_flow.models import TripDetails
+from travel_flow.trip_utils import budget_tier, duration_bucket, parse_duration_days
+
+# Attractions a trip needs, by duration bucket (the lower end of the ranges in the search prompt)
+TARGET_ATTRACTIONS = {
+    "short": 3,
+    "medium": 6,
+    "long": 10,
+}
+
+# Categories the search results should cover for each budget tier, with the words that show them
+BUDGET_CATEGORIES: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "low": {
+        "free": ("free", "no charge", "no entry fee", "free entry", "free admission"),
+        "outdoors": ("park", "garden", "beach", "walk", "viewpoint", "hike"),
+        "markets": ("market", "street food", "bazaar"),
+    },
+    "medium": {
+        "culture": ("museum", "gallery", "cathedral", "church", "palace", "temple", "historic"),
+        "free": ("free", "park", "garden", "walk"),
+        "food": ("restaurant", "cafe", "food", "bistro", "tapas", "market"),
+    },
+    "high": {
+        "premium": ("luxury", "exclusive", "private", "vip", "premium", "skip-the-line"),
+        "dining": ("fine dining", "michelin", "gourmet", "tasting menu", "rooftop"),
+        "culture": ("museum", "gallery", "opera", "palace", "theatre", "theater"),
+    },
+}
+
+# What to search for when a category is missing
+CATEGORY_QUERIES = {
+    "free": "free things to do",
+    "outdoors": "parks and walks",
+    "markets": "local markets",
+    "culture": "museums and landmarks",
+    "food": "local restaurants",
+    "premium": "luxury experiences",
+    "dining": "fine dining",
+}
+
+# Share of the score given to the number of attractions found; the rest is the category mix
+COUNT_WEIGHT = 0.6
+
+# Score from which the first search is good enough and the follow-up search is skipped
+DEFAULT_COVERAGE_THRESHOLD = 0.8
+
+# Listicle titles ("Top 15 things to do", "25 best attractions") cover that many attractions
+LISTED_COUNT = re.compile(r"\b(\d{1,2})\s+(?:best|top|must|things|places|attractions|sights|free|cheap)", re.IGNORECASE)
+TOP_COUNT = re.compile(r"\btop\s+(\d{1,2})\b", re.IGNORECASE)
+
+
+class Coverage(NamedTuple):
+    """How well the search results so far cover what the trip needs"""
+    score: float
+    candidates: int
+    target: int
+    covered: List[str]
+    missing: List[str]
+
+    def describe(self) -> str:
+        missing = f", missing {', '.join(self.missing)}" if self.missing else ""
+        return f"{self.score:.2f} ({self.candidates}/{self.target} attractions{missing})"
+
+
+def coverage_threshold() -> float:
+    """Coverage score that makes a follow-up search unnecessary, from TRAVEL_FLOW_COVERAGE_THRESHOLD"""
+    return float(os.getenv("TRAVEL_FLOW_COVERAGE_THRESHOLD", DEFAULT_COVERAGE_THRESHOLD))
+
+
+def target_attractions(trip_details: TripDetails) -> int:
+    """Number of attractions the trip duration calls for"""
+    return TARGET_ATTRACTIONS[duration_bucket(parse_duration_days(trip_details.duration)) or "medium"]
+
+
+def required_categories(trip_details: TripDetails) -> Dict[str, Tuple[str, ...]]:
+    """Categories the budget calls for; budgets given as a plain amount get the medium mix"""
+    return BUDGET_CATEGORIES[budget_tier(trip_details.budget) or "medium"]
+
+
+def _candidate_count(result: Dict[str, Any]) -> int:
+    """Attractions a single search result is likely to name"""
+    title = result.get("title") or ""
+    match = TOP_COUNT.search(title) or LISTED_COUNT.search(title)
+    return max(int(match.group(1)), 1) if match else 1
+
+
+def score_coverage(search_results: List[Dict[str, Any]], trip_details: TripDetails, answer: Optional[str] = None) -> Coverage:
+    """Score accumulated Tavily results against the attraction count and category mix the trip needs
+
+    The score is deterministic: the share of the target attraction count the results name (a
+    "top 10" page counts for ten), weighted with the share of the budget's categories that appear
+    anywhere in the results' titles, contents or the search answer.
+    """
+    target = target_attractions(trip_details)
+    seen_urls = set()
+    candidates = 0
+    texts = [answer or ""]
+    for result in search_results:
+        url = result.get("url") or result.get("title")
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+        candidates += _candidate_count(result)
+        texts.append(f"{result.get('title') or ''} {result.get('content') or ''}")
+
+    text = " ".join(texts).lower()
+    categories = required_categories(trip_details)
+    covered = [name for name, words in categories.items() if any(re.search(rf"\b{re.escape(word)}", text) for word in words)]
+    missing = [name for name in categories if name not in covered]
+
+    score = COUNT_WEIGHT * min(candidates / target, 1.0) + (1 - COUNT_WEIGHT) * len(covered) / len(categories)
+    return Coverage(round(score, 3), candidates, target, covered, missing)
+
+
+def follow_up_query(trip_details: TripDetails, coverage: Coverage) -> str:
+    """Search targeted at what the results so far are missing"""
+    topics = [CATEGORY_QUERIES[name] for name in coverage.missing]
+    if coverage.candidates < coverage.target or not topics:
+        topics.insert(0, "must-see attractions")
+    return f"{', '.join(topics)} in {trip_details.destination}"
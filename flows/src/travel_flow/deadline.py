@@ -0,0 +1,143 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from travel_flow.profiling import profiled_thread
+
+# Default time budget of a whole run in seconds, overridden by TRAVEL_FLOW_TIME_BUDGET
+DEFAULT_TIME_BUDGET = 300.0
+
+# Share of the remaining budget given to each step. Time a step doesn't use rolls over to the
+# later steps, and a skipped step (collect_missing_details on most runs) gives its share away.
+STEP_SHARES = {
+    "extract_trip_details": 0.15,
+    "collect_missing_details": 0.15,
+    "search_attractions": 0.3,
+    "generate_trip_plan": 0.4,
+}
+
+_current_deadline: contextvars.ContextVar[Optional["Deadline"]] = contextvars.ContextVar("current_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a step or call runs past its time budget"""
+
+
+class Deadline:
+    """Time budget of a run, or of one step of a run
+
+    Step deadlines are slices of the run deadline: they never outlive it, cancelling the run
+    cancels them, and they share the run's partial results so a step that times out can still
+    return what it collected.
+    """
+
+    def __init__(self, seconds: float, name: str = "run", parent: Optional["Deadline"] = None):
+        self.name = name
+        self.parent = parent
+        self.expires_at = time.monotonic() + max(seconds, 0.0)
+        if parent is not None:
+            self.expires_at = min(self.expires_at, parent.expires_at)
+        self.partial_results: Dict[str, List[Any]] = parent.partial_results if parent else {}
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline, 0 once it has passed or been cancelled"""
+        if self.cancelled():
+            return 0.0
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled())
+
+    def check(self):
+        """Raise DeadlineExceeded if the deadline has passed"""
+        if self.expired():
+            raise DeadlineExceeded(f"Time budget for {self.name} exhausted")
+
+    def timeout(self, default: float) -> float:
+        """Timeout to use for a single blocking call, bounded by the time left"""
+        self.check()
+        return min(default, self.remaining())
+
+    def for_step(self, step: str) -> "Deadline":
+        """Slice of the remaining run budget for a flow step"""
+        if step not in STEP_SHARES:
+            return Deadline(self.remaining(), name=step, parent=self)
+
+        steps = list(STEP_SHARES)
+        later_shares = sum(STEP_SHARES[later] for later in steps[steps.index(step):])
+        return Deadline(self.remaining() * STEP_SHARES[step] / later_shares, name=step, parent=self)
+
+    def add_partial_result(self, key: str, value: Any):
+        """Keep an intermediate result that a degraded step can fall back to"""
+        self.partial_results.setdefault(key, []).append(value)
+
+
+def default_time_budget() -> float:
+    return float(os.getenv("TRAVEL_FLOW_TIME_BUDGET", DEFAULT_TIME_BUDGET))
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the step currently running, if any"""
+    return _current_deadline.get()
+
+
+@contextmanager
+def use_deadline(deadline: Deadline) -> Iterator[Deadline]:
+    """Make a deadline the current one for the duration of the block"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def start_with_deadline(fn: Callable[[], Any], deadline: Deadline) -> Future:
+    """Start a call in a worker thread that runs with the given deadline as the current one"""
+    future: Future = Future()
+    context = contextvars.copy_context()
+
+    def run():
+        with use_deadline(deadline), profiled_thread():
+            return fn()
+
+    def worker():
+        try:
+            future.set_result(context.run(run))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=worker, daemon=True, name=f"deadline-{deadline.name}").start()
+    return future
+
+
+def wait_with_deadline(future: Future, deadline: Deadline, worker_deadline: Optional[Deadline] = None) -> Any:
+    """Wait for a call started with start_with_deadline, giving up when the deadline passes
+
+    Threads can't be killed, so on timeout the worker's deadline is cancelled instead: routed LLM
+    calls and tool calls made by the abandoned worker check it and stop at their next call.
+    """
+    try:
+        return future.result(timeout=deadline.remaining())
+    except FutureTimeoutError:
+        (worker_deadline or deadline).cancel()
+        raise DeadlineExceeded(f"Time budget for {deadline.name} exhausted")
+
+
+def run_with_deadline(fn: Callable[[], Any], deadline: Optional[Deadline] = None) -> Any:
+    """Run a blocking call in a worker thread, giving up when the deadline passes"""
+    deadline = deadline or current_deadline()
+    if deadline is None:
+        return fn()
+    deadline.check()
+    return wait_with_deadline(start_with_deadline(fn, deadline), deadline)
@@ -3,7 +3,8 @@ import sys
 import json
 import os
 from pathlib import Path
-from typing import List, Dict, Optional
+from concurrent.futures import Future
+from typing import Any, Callable, List, Dict, NamedTuple, Optional, Tuple
 from pydantic import BaseModel, Field
 from crewai.flow.flow import Flow, listen, start, router, or_
 from crewai import Agent, Crew, Task, Process
@@ -11,9 +12,35 @@ from datetime import datetime
 
 sys.path.append(str(Path(__file__).parent.parent))
 
-from travel_flow.tools.tavily_search_tool import TavilySearchTool
+from travel_flow.tools.tavily_search_tool import SearchError, TavilySearchTool
 from travel_flow.tools.human_input_tool import HumanInputTool
-from travel_flow.models import TripDetails, AttractionsSearchResult
+from travel_flow.models import TripDetails, AttractionsSearchResult, TripSkeleton
+from travel_flow.cache import get_cache
+from travel_flow.coverage import coverage_threshold, follow_up_query, score_coverage
+from travel_flow.model_routing import get_router
+from travel_flow.deadline import (
+    Deadline, DeadlineExceeded, current_deadline, default_time_budget, run_with_deadline, start_with_deadline, wait_with_deadline,
+)
+from travel_flow.scheduling import parse_start_date, schedule_trip, skeleton_markdown
+from travel_flow.partial_json import RepairingConverter, StreamingJSONParser, attractions_defaults, parse_model_output
+from travel_flow.profiling import profiled
+from travel_flow.steps import flow_step
+from travel_flow.streaming import detached_from_stream, listen_to_stream
+from travel_flow.trip_utils import (
+    attractions_cache_key, attractions_from_search_results, fallback_trip_plan, parse_duration_days, plan_cache_key,
+)
+
+# Trip details the attractions search depends on; once all of them have streamed in the search starts early
+SEARCH_FIELDS = ("destination", "duration", "budget")
+
+# Maximum number of attractions search results kept in memory
+ATTRACTIONS_CACHE_SIZE = 256
+
+# Maximum number of generated plans kept in memory
+PLANS_CACHE_SIZE = 128
+
+# Web searches per attractions search; the follow-up search only runs when the first one falls short
+MAX_ATTRACTION_SEARCHES = 2
 
 
 # Define our flow state to maintain data across nodes
@@ -22,23 +49,73 @@ class TripPlanningState(BaseModel):
     trip_details: Optional[TripDetails] = None
     missing_fields: List[str] = []
     attractions_result: Optional[AttractionsSearchResult] = None
+    day_skeleton: Optional[TripSkeleton] = None
     final_trip_plan: str = ""
     needs_missing_details: bool = False
+    degraded_steps: List[str] = []
+
+
+class SpeculativeSearch(NamedTuple):
+    """Attractions search started from streamed trip details before the extraction step finished"""
+    key: Tuple[str, ...]
+    future: Future
+    deadline: Deadline
+
+
+def _search_key(trip_details: TripDetails) -> Tuple[str, ...]:
+    return tuple((getattr(trip_details, field) or "").strip().lower() for field in SEARCH_FIELDS)
 
 
 class TripPlanningFlow(Flow[TripPlanningState]):
     """Flow for comprehensive trip planning with detail extraction, validation, and itinerary generation"""
 
+    def __init__(
+        self,
+        time_budget: Optional[float] = None,
+        output_dir: str = "output",
+        interactive: bool = True,
+        progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        speculative_search: bool = True,
+        **kwargs,
+    ):
+        # Seconds the whole run may take, split between the steps by the run deadline
+        self.time_budget = time_budget if time_budget is not None else default_time_budget()
+        self.deadline: Optional[Deadline] = None
+        self._speculative_search: Optional[SpeculativeSearch] = None
+        # Where save_trip_plan writes the run's files
+        self.output_dir = output_dir
+        # Non-interactive runs (e.g. from the HTTP service) never prompt on stdin
+        self.interactive = interactive
+        # Called with an event name and its data as the run progresses
+        self.progress = progress
+        # Start the attractions search while the trip details stream in; off when another process
+        # runs the search step and the early search could never be used
+        self.speculative_search = speculative_search
+        super().__init__(**kwargs)
+
+    def _emit_progress(self, event: str, **data: Any):
+        if self.progress is not None:
+            self.progress(event, data)
+
+    def _mark_degraded(self, step: str):
+        """Record that a step ran out of time and returned a fallback result"""
+        print(f"⏱️ {step} ran out of time, continuing with a degraded result")
+        self.state.degraded_steps.append(step)
+        self._emit_progress("step_degraded", step=step)
+
     @start()
     def get_user_input(self):
         """Get the initial trip query from the user"""
         print("\n=== Welcome to AI Trip Planner ===\n")
         
-        self.state.user_query = input("Enter your trip query (destination, dates, budget, interests, etc.): ")
+        # The query may already be set from the kickoff inputs
+        if not self.state.user_query:
+            self.state.user_query = input("Enter your trip query (destination, dates, budget, interests, etc.): ")
         
         print(f"\nProcessing your trip request: {self.state.user_query}\n")
 
     @listen(get_user_input)
+    @flow_step
     def extract_trip_details(self):
         """Extract trip details from user query using the detail extractor agent"""
         print("🔍 Extracting trip details from your query...")
@@ -48,6 +125,7 @@ class TripPlanningFlow(Flow[TripPlanningState]):
             role="Detail Extractor",
             goal="Extract trip details from user query and collect missing mandatory information using the Human Input Collector tool",
             backstory="You're a precise detail extractor who extracts information from user queries. When mandatory information is missing (destination, duration, start_date, budget), you use the Human Input Collector tool to gather the missing details from the user. You never make up or assume any data.",
+            llm=get_router().llm_for("extract_trip_details"),
         )
         
         # Create extraction task
@@ -82,6 +160,7 @@ class TripPlanningFlow(Flow[TripPlanningState]):
             expected_output="Complete trip details with all mandatory fields (destination, duration, start_date, budget) filled in",
             agent=detail_extractor,
             output_pydantic=TripDetails,
+            converter_cls=RepairingConverter,
         )
         
         # Create and run crew
@@ -92,24 +171,36 @@ class TripPlanningFlow(Flow[TripPlanningState]):
             verbose=True,
         )
         
-        result = extraction_crew.kickoff()
+        # Parse the answer as it streams in to start the attractions search early
+        parser = StreamingJSONParser()
+
+        def on_chunk(chunk: str):
+            parser.feed(chunk)
+            self._start_speculative_search(parser.fields)
+
+        try:
+            with listen_to_stream(on_chunk, on_call_started=parser.reset):
+                result = run_with_deadline(extraction_crew.kickoff)
+        except DeadlineExceeded:
+            self._mark_degraded("extract_trip_details")
+            result = None
         
         # Parse the result to get TripDetails
-        if hasattr(result, 'pydantic') and result.pydantic:
+        if result is None:
+            self.state.trip_details = TripDetails()
+        elif hasattr(result, 'pydantic') and result.pydantic:
             self.state.trip_details = result.pydantic
         else:
-            # Fallback parsing if needed
-            try:
-                trip_data = json.loads(result.raw) if isinstance(result.raw, str) else result.raw
-                self.state.trip_details = TripDetails(**trip_data)
-            except Exception as e:
-                print(f"⚠️ Error parsing trip details: {e}")
-                # Create empty TripDetails if parsing fails
+            # Repair malformed or truncated JSON locally instead of losing the extraction
+            self.state.trip_details = parse_model_output(result.raw, TripDetails)
+            if self.state.trip_details is None:
+                print("⚠️ Error parsing trip details, continuing without them")
                 self.state.trip_details = TripDetails()
         
         print(f"✅ Trip details extracted: {self.state.trip_details}")
 
     @router(extract_trip_details)
+    @profiled
     def validate_trip_details(self):
         """Validate if all mandatory trip details are present"""
         print("🔍 Validating trip details...")
@@ -133,16 +224,22 @@ class TripPlanningFlow(Flow[TripPlanningState]):
             return "search_attractions_no_loop"
 
     @listen("collect_missing_details_no_loop")
+    @flow_step
     def collect_missing_details(self):
         """Collect missing mandatory details from the user"""
         print("📝 Collecting missing trip details...")
         
+        if not self.interactive:
+            print(f"⚠️ Can't ask for missing details in a non-interactive run: {', '.join(self.state.missing_fields)}")
+            return
+        
         # Create detail collector agent
         detail_collector = Agent(
             role="Detail Collector",
             goal="Collect missing mandatory trip information from the user",
             backstory="You specialize in gathering missing information from users in a friendly and efficient manner.",
             tools=[HumanInputTool()],
+            llm=get_router().llm_for("collect_missing_details"),
         )
         
         # Create a context with missing fields information
@@ -164,6 +261,7 @@ class TripPlanningFlow(Flow[TripPlanningState]):
             expected_output="Complete trip details with all mandatory fields (destination, duration, start_date, budget) filled in",
             agent=detail_collector,
             output_pydantic=TripDetails,
+            converter_cls=RepairingConverter,
         )
         
         # Create and run crew
@@ -174,7 +272,12 @@ class TripPlanningFlow(Flow[TripPlanningState]):
             verbose=True,
         )
         
-        result = collection_crew.kickoff()
+        try:
+            result = run_with_deadline(collection_crew.kickoff)
+        except DeadlineExceeded:
+            # Keep the details extracted so far
+            self._mark_degraded("collect_missing_details")
+            return
         
         # Update trip details with collected information
         if hasattr(result, 'pydantic') and result.pydantic:
@@ -185,61 +288,137 @@ class TripPlanningFlow(Flow[TripPlanningState]):
         
 
     @listen(or_("search_attractions_no_loop", "collect_missing_details"))
+    @flow_step
     def search_attractions(self):
         """Search for attractions based on the trip details"""
         print("🔍 Searching for attractions...")
         
-        if not self.state.trip_details:
+        speculative_search, self._speculative_search = self._speculative_search, None
+        
+        if not self.state.trip_details or not self.state.trip_details.destination:
             print("❌ No trip details available for attractions search")
+            if speculative_search is not None:
+                speculative_search.deadline.cancel()
             return None
         
+        trip_details = self.state.trip_details
+        cache = get_cache("attractions", ATTRACTIONS_CACHE_SIZE)
+        cache_key = attractions_cache_key(trip_details)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(f"♻️ Using cached attractions for {trip_details.destination}")
+            if speculative_search is not None:
+                speculative_search.deadline.cancel()
+            self.state.attractions_result = cached.model_copy(deep=True)
+            print(f"✅ Found {len(self.state.attractions_result.attractions)} attractions")
+            return
+        
+        try:
+            if speculative_search is not None and speculative_search.key == _search_key(trip_details):
+                print("⚡ Using the attractions search started while the trip details were streaming")
+                result = wait_with_deadline(speculative_search.future, current_deadline(), speculative_search.deadline)
+            else:
+                if speculative_search is not None:
+                    # The final details differ from the streamed ones, so its results don't apply
+                    print("↩️ Trip details changed after the early attractions search started, searching again")
+                    speculative_search.deadline.cancel()
+                    current_deadline().partial_results.pop("search_results", None)
+                result = run_with_deadline(lambda: self._run_attractions_search(trip_details))
+        except DeadlineExceeded:
+            result = None
+        
+        # Parse the attractions result
+        if result is None:
+            # Plan with the attractions found by the searches that finished in time
+            self._mark_degraded("search_attractions")
+            search_results = current_deadline().partial_results.get("search_results", [])
+            self.state.attractions_result = attractions_from_search_results(trip_details.destination, search_results)
+        elif hasattr(result, 'pydantic') and result.pydantic:
+            self.state.attractions_result = result.pydantic
+        else:
+            # Keep the attractions that parse, even if the output was cut off
+            defaults = attractions_defaults(trip_details.destination)
+            self.state.attractions_result = parse_model_output(result.raw, AttractionsSearchResult, defaults)
+            if self.state.attractions_result is None:
+                print("⚠️ Could not parse attractions result")
+                self.state.attractions_result = AttractionsSearchResult(**defaults)
+            if not self.state.attractions_result.total_found:
+                self.state.attractions_result.total_found = len(self.state.attractions_result.attractions)
+        
+        # Degraded results are not cached, so the next run for these details searches again
+        if result is not None and self.state.attractions_result.attractions:
+            cache.set(cache_key, self.state.attractions_result.model_copy(deep=True))
+        
+        print(f"✅ Found {len(self.state.attractions_result.attractions) if self.state.attractions_result else 0} attractions")
+
+    def _start_speculative_search(self, fields: Dict[str, object]):
+        """Start the attractions search once the streamed extraction has all the details it needs"""
+        if not self.speculative_search or self._speculative_search is not None or self.deadline is None:
+            return
+        if not all(isinstance(fields.get(field), str) and fields[field].strip() for field in SEARCH_FIELDS):
+            return
+
+        trip_details = TripDetails(**{field: fields[field] for field in SEARCH_FIELDS})
+        if attractions_cache_key(trip_details) in get_cache("attractions", ATTRACTIONS_CACHE_SIZE):
+            return
+        print(f"⚡ Starting the attractions search early for {trip_details.destination}")
+
+        def search():
+            # The search makes LLM calls of its own, keep them out of the extraction's stream
+            with detached_from_stream():
+                return self._run_attractions_search(trip_details)
+
+        # Bounded by the run only; the search step cancels it if it isn't used or runs out of time
+        deadline = Deadline(self.deadline.remaining(), name="search_attractions", parent=self.deadline)
+        self._speculative_search = SpeculativeSearch(_search_key(trip_details), start_with_deadline(search, deadline), deadline)
+
+    def _run_attractions_search(self, trip_details: TripDetails):
+        """Search the web for attractions and have the attractions searcher compile them
+
+        The searches run here rather than as agent tool calls: a second, targeted search is made
+        only when the first one scores below the coverage threshold, so the agent compiles the
+        results in a single call instead of deciding when to stop searching.
+        """
+        search_text = self._search_with_coverage(trip_details)
+
         # Create attractions searcher agent
         attractions_searcher = Agent(
             role="Attractions Searcher",
-            goal="Find attractions that match the trip duration and budget using maximum 2 targeted searches",
-            backstory="You are a smart travel researcher who tailors attraction recommendations based on trip length and budget. For short trips, you focus on must-see highlights. For longer trips, you find diverse experiences. You always consider the budget - suggesting free attractions for budget travelers and premium experiences for high-budget trips. You perform efficient, targeted searches and stop once you have the right number of attractions for the trip duration.",
-            tools=[TavilySearchTool()],
+            goal="Select attractions that match the trip duration and budget from web search results",
+            backstory="You are a smart travel researcher who tailors attraction recommendations based on trip length and budget. For short trips, you focus on must-see highlights. For longer trips, you find diverse experiences. You always consider the budget - suggesting free attractions for budget travelers and premium experiences for high-budget trips.",
+            llm=get_router().llm_for("search_attractions"),
         )
         
         # Create attractions search task
         attractions_task = Task(
             description=f"""
-            Search for attractions in {self.state.trip_details.destination} based on the trip duration ({self.state.trip_details.duration}) and budget ({self.state.trip_details.budget}).
+            Select attractions in {trip_details.destination} for a trip of {trip_details.duration} with a {trip_details.budget} budget,
+            using these web search results:
             
-            DYNAMIC SEARCH REQUIREMENTS (based on trip details):
+            {search_text}
             
             DURATION-BASED ATTRACTION COUNT:
-            - Short trips (1-3 days): Find 3-5 key attractions
-            - Medium trips (4-7 days): Find 6-10 attractions  
-            - Long trips (8+ days or weeks/months): Find 10-15 attractions
+            - Short trips (1-3 days): 3-5 key attractions
+            - Medium trips (4-7 days): 6-10 attractions
+            - Long trips (8+ days or weeks/months): 10-15 attractions
             
             BUDGET-BASED ATTRACTION TYPES:
             - Budget/Low budget: Focus on free attractions, parks, walking tours, local markets
             - Medium budget: Mix of free and paid attractions, museums, local restaurants
             - High budget: Premium attractions, fine dining, exclusive experiences, luxury activities
             
-            SEARCH PROCESS:
-            1. Analyze the trip duration to determine target number of attractions
-            2. Consider the budget to prioritize appropriate attraction types
-            3. Do ONE comprehensive search: "top attractions in {self.state.trip_details.destination} for {self.state.trip_details.duration} trip {self.state.trip_details.budget} budget"
-            4. If needed, do ONE additional targeted search based on budget level
-            5. STOP after maximum 2 searches
-            6. Compile results prioritizing attractions that match the duration and budget
+            Use the search results first, and add well-known attractions of {trip_details.destination} only if they
+            don't name enough. Include the opening hours and visit time where the results give them.
             
             DO NOT:
             - Ignore the trip duration when selecting attractions
             - Suggest expensive attractions for budget trips
             - Suggest too few attractions for long trips
-            - Search more than 2 times total
-            
-            STOPPING CRITERIA:
-            - Stop when you have appropriate number of attractions for the trip duration
-            - Stop after 2 searches regardless of results
-            - Stop if search results are repetitive
             """,
             expected_output="List of attractions appropriate for the trip duration and budget, with names, locations, brief descriptions, and estimated costs where relevant.",
             agent=attractions_searcher,
             output_pydantic=AttractionsSearchResult,
+            converter_cls=RepairingConverter,
         )
         
         # Create and run crew
@@ -250,39 +429,167 @@ class TripPlanningFlow(Flow[TripPlanningState]):
             verbose=True,
         )
         
-        result = attractions_crew.kickoff()
-        
-        # Parse the attractions result
-        if hasattr(result, 'pydantic') and result.pydantic:
-            self.state.attractions_result = result.pydantic
-        else:
+        return attractions_crew.kickoff()
+
+    def _search_with_coverage(self, trip_details: TripDetails) -> str:
+        """Run the attractions searches, stopping after the first when its results cover the trip"""
+        search_tool = TavilySearchTool()
+        queries = [f"top attractions in {trip_details.destination} for {trip_details.duration} trip {trip_details.budget} budget"]
+        sections = []
+        results: List[Dict[str, Any]] = []
+        answers = []
+
+        for attempt in range(MAX_ATTRACTION_SEARCHES):
+            query = queries[attempt]
             try:
-                attractions_data = json.loads(result.raw) if isinstance(result.raw, str) else result.raw
-                self.state.attractions_result = AttractionsSearchResult(**attractions_data)
-            except Exception as e:
-                print(f"⚠️ Could not parse attractions result: {e}")
-                # Create a basic result structure
-                self.state.attractions_result = AttractionsSearchResult(
-                    destination=self.state.trip_details.destination,
-                    attractions=[],
-                    total_found=0,
-                    search_date=datetime.now().strftime('%Y-%m-%d')
-                )
-        
-        print(f"✅ Found {len(self.state.attractions_result.attractions) if self.state.attractions_result else 0} attractions")
+                data = search_tool.search(query)
+            except SearchError as e:
+                print(f"⚠️ Attractions search failed: {e}")
+                break
+            results.extend(data.get("results") or [])
+            answers.append(data.get("answer") or "")
+            sections.append(f"SEARCH: {query}\n{search_tool.format_results(data)}")
+
+            coverage = score_coverage(results, trip_details, " ".join(answers))
+            threshold = coverage_threshold()
+            if coverage.score >= threshold:
+                print(f"📏 Search coverage {coverage.describe()} meets {threshold:.2f}, no further search")
+                break
+            if attempt + 1 == MAX_ATTRACTION_SEARCHES:
+                print(f"📏 Search coverage {coverage.describe()} is below {threshold:.2f}, but the search limit is reached")
+                break
+            queries.append(follow_up_query(trip_details, coverage))
+            print(f"📏 Search coverage {coverage.describe()} is below {threshold:.2f}, searching for: {queries[-1]}")
+
+        return "\n\n".join(sections) or "No search results are available."
 
     @listen(search_attractions)
+    @flow_step
     def generate_trip_plan(self):
         """Generate the final trip itinerary"""
         print("📅 Generating your personalized trip plan...")
         
-        # Create trip planner agent
-        trip_planner = Agent(
+        if not self.state.trip_details or not self.state.trip_details.destination:
+            print("❌ No destination available, saving a basic plan")
+            self.state.final_trip_plan = fallback_trip_plan(self.state.trip_details, [])
+            return
+        
+        self._schedule_days()
+        
+        plans = get_cache("plans", PLANS_CACHE_SIZE)
+        cached_plan = plans.get(plan_cache_key(self.state.trip_details))
+        if cached_plan is not None:
+            print(f"♻️ Using a cached trip plan for {self.state.trip_details.destination}")
+            self.state.final_trip_plan = cached_plan
+            return
+        
+        trip_planner = self._create_trip_planner()
+        
+        # Create trip planning task
+        planning_task = Task(
+            description=f"""
+            Create a detailed day-by-day trip plan using the following information:
+            
+            {self._planning_context()}
+            
+            {self._planning_instructions()}
+            """,
+            expected_output="A detailed trip plan with day-wise itinerary including timings, attractions to visit, and activities for each day",
+            agent=trip_planner,
+        )
+        
+        # Create and run crew
+        planning_crew = Crew(
+            agents=[trip_planner],
+            tasks=[planning_task],
+            process=Process.sequential,
+            verbose=True,
+        )
+        
+        try:
+            result = run_with_deadline(planning_crew.kickoff)
+        except DeadlineExceeded:
+            self._mark_degraded("generate_trip_plan")
+            attractions = self.state.attractions_result.attractions if self.state.attractions_result else []
+            self.state.final_trip_plan = fallback_trip_plan(self.state.trip_details, attractions, self.state.day_skeleton)
+            return
+        
+        self.state.final_trip_plan = result.raw if hasattr(result, 'raw') else str(result)
+        if self.state.final_trip_plan and not self.state.degraded_steps:
+            plans.set(plan_cache_key(self.state.trip_details), self.state.final_trip_plan)
+        
+        print("✅ Trip plan generated successfully!")
+
+    def _create_trip_planner(self) -> Agent:
+        """Create the trip planner agent used for full and partial plan generation"""
+        return Agent(
             role="Trip Planner",
             goal="Plan a trip to the given location",
             backstory="You are a travel enthusiast who is very good at planning trips to a given location. You are excellent at planning a trip from day to day basis with detailed information about the attractions, restaurants, and activities. You are also very good at providing information about the trip in a clear and concise manner.",
+            llm=get_router().llm_for("generate_trip_plan"),
         )
-        
+
+    def _schedule_days(self):
+        """Lay out the day skeleton the planner writes around: which attractions on which day, in which order
+
+        Scheduling is deterministic and takes milliseconds, so the skeleton is rebuilt whenever a plan
+        is generated rather than kept in step with changes to the trip details or attractions.
+        """
+        attractions = self.state.attractions_result.attractions if self.state.attractions_result else []
+        days = parse_duration_days(self.state.trip_details.duration)
+        if not attractions or not days:
+            self.state.day_skeleton = None
+            return
+
+        self.state.day_skeleton = schedule_trip(
+            attractions,
+            days,
+            destination=self.state.trip_details.destination,
+            start_date=parse_start_date(self.state.trip_details.start_date),
+        )
+        scheduled = sum(len(day.visits) for day in self.state.day_skeleton.days)
+        print(f"🗺️ Scheduled {scheduled} attractions over {days} days")
+        if self.state.day_skeleton.unlocated:
+            print(f"⚠️ No coordinates for: {', '.join(self.state.day_skeleton.unlocated)}")
+
+    def _planning_instructions(self) -> str:
+        """What the planner should write, depending on whether a day skeleton is available"""
+        if self.state.day_skeleton:
+            return """Write the itinerary around the DAY SKELETON: keep every day, attraction, order and timing as
+            given, and add only concise prose for each day:
+            1. A short theme for the day and one or two sentences per visit
+            2. Where to have lunch and dinner near that day's attractions
+            3. How to get between the visits
+            4. The day's estimated cost within the budget
+            Fill free days with a brief suggestion. Finish with a budget summary and a few tips."""
+
+        return """Create a comprehensive day-by-day itinerary that includes:
+            1. Daily schedule with specific timings
+            2. Attractions to visit each day
+            3. Recommended restaurants for meals
+            4. Transportation suggestions between locations
+            5. Budget considerations for each day
+            6. Tips and recommendations
+            
+            Make sure the plan is realistic, considering travel time between locations and the specified budget."""
+
+    def _planning_context(self, day_numbers: Optional[List[int]] = None) -> str:
+        """Build the trip details and attractions section shared by the planning prompts
+
+        Args:
+            day_numbers: Days whose skeleton to include, all of them if None
+        """
+        if self.state.day_skeleton:
+            skeleton = self.state.day_skeleton
+            if day_numbers is not None:
+                skeleton = skeleton.model_copy(update={
+                    "days": [day for day in skeleton.days if day.day in day_numbers],
+                })
+            schedule = f"""DAY SKELETON (fixed by the scheduler from attraction locations and opening hours):
+            {skeleton_markdown(skeleton)}"""
+        else:
+            schedule = ""
+
         # Prepare attractions info for the planner
         attractions_info = ""
         if self.state.attractions_result and self.state.attractions_result.attractions:
@@ -292,13 +599,8 @@ class TripPlanningFlow(Flow[TripPlanningState]):
             ])
         else:
             attractions_info = "No specific attractions found, please research popular attractions for the destination."
-        
-        # Create trip planning task
-        planning_task = Task(
-            description=f"""
-            Create a detailed day-by-day trip plan using the following information:
-            
-            TRIP DETAILS:
+
+        return f"""TRIP DETAILS:
             - Destination: {self.state.trip_details.destination}
             - Duration: {self.state.trip_details.duration}
             - Start Date: {self.state.trip_details.start_date}
@@ -309,59 +611,103 @@ class TripPlanningFlow(Flow[TripPlanningState]):
             AVAILABLE ATTRACTIONS:
             {attractions_info}
             
-            Create a comprehensive day-by-day itinerary that includes:
-            1. Daily schedule with specific timings
-            2. Attractions to visit each day
-            3. Recommended restaurants for meals
-            4. Transportation suggestions between locations
-            5. Budget considerations for each day
-            6. Tips and recommendations
+            {schedule}"""
+
+    @flow_step
+    def generate_plan_days(self, day_numbers: List[int], kept_plan: str) -> str:
+        """Generate only the given days of the itinerary, keeping the rest of an existing plan
+
+        Runs within the rest of the run's time budget; if it runs out, the days come from the
+        simple fallback plan instead.
+
+        Args:
+            day_numbers: Days of the trip that need to be (re)written
+            kept_plan: Markdown of the days that are kept from the previous plan
+
+        Returns:
+            Markdown with a title line, the requested days and an updated closing summary
+        """
+        days_str = ", ".join(str(day) for day in day_numbers) if day_numbers else "none"
+        print(f"📅 Regenerating trip plan days: {days_str}")
+
+        self._schedule_days()
+        trip_planner = self._create_trip_planner()
+
+        partial_planning_task = Task(
+            description=f"""
+            An existing itinerary is being updated after the traveller changed their trip details.
             
-            Make sure the plan is realistic, considering travel time between locations and the specified budget.
+            {self._planning_context(day_numbers)}
+            
+            DAYS KEPT FROM THE EXISTING ITINERARY (do not rewrite these):
+            {kept_plan or 'None'}
+            
+            Write ONLY the following days: {days_str}
+            Do not repeat attractions that are already covered by the kept days.
+            
+            OUTPUT FORMAT:
+            1. A single title line starting with "### " describing the whole trip
+            2. Each requested day under a heading of the form "#### Day N: <theme>", with timings, attractions, restaurants, transportation and budget for that day, following the day skeleton if one is given
+            3. A closing "### Total Trip Budget Summary" and "### Final Tips" section covering the whole trip, including the kept days
             """,
-            expected_output="A detailed trip plan with day-wise itinerary including timings, attractions to visit, and activities for each day",
+            expected_output="The requested itinerary days in markdown followed by an updated trip budget summary and tips",
             agent=trip_planner,
         )
-        
-        # Create and run crew
-        planning_crew = Crew(
+
+        partial_planning_crew = Crew(
             agents=[trip_planner],
-            tasks=[planning_task],
+            tasks=[partial_planning_task],
             process=Process.sequential,
             verbose=True,
         )
-        
-        result = planning_crew.kickoff()
-        
-        self.state.final_trip_plan = result.raw if hasattr(result, 'raw') else str(result)
-        
-        print("✅ Trip plan generated successfully!")
+
+        try:
+            result = run_with_deadline(partial_planning_crew.kickoff)
+        except DeadlineExceeded:
+            self._mark_degraded("generate_plan_days")
+            attractions = self.state.attractions_result.attractions if self.state.attractions_result else []
+            return fallback_trip_plan(self.state.trip_details, attractions, self.state.day_skeleton)
+
+        return result.raw if hasattr(result, 'raw') else str(result)
 
 
     @listen(generate_trip_plan)
+    @profiled
     def save_trip_plan(self):
         """Save the complete trip plan to files"""
         print("💾 Saving your trip plan...")
         
         # Ensure output directory exists
-        os.makedirs("output", exist_ok=True)
+        os.makedirs(self.output_dir, exist_ok=True)
+        
+        # Save the original query, so a re-plan from these files still has it
+        if self.state.user_query:
+            with open(os.path.join(self.output_dir, "user_query.txt"), "w") as f:
+                f.write(self.state.user_query)
         
         # Save trip details as JSON
         if self.state.trip_details:
-            with open("output/trip_details.json", "w") as f:
+            with open(os.path.join(self.output_dir, "trip_details.json"), "w") as f:
                 json.dump(self.state.trip_details.model_dump(), f, indent=2)
         
         # Save attractions as JSON
         if self.state.attractions_result:
-            with open("output/attractions.json", "w") as f:
+            with open(os.path.join(self.output_dir, "attractions.json"), "w") as f:
                 json.dump(self.state.attractions_result.model_dump(), f, indent=2)
         
+        # Save the day skeleton the plan was written around
+        if self.state.day_skeleton:
+            with open(os.path.join(self.output_dir, "day_skeleton.json"), "w") as f:
+                json.dump(self.state.day_skeleton.model_dump(), f, indent=2)
+        
         # Save final trip plan as markdown
         if self.state.final_trip_plan:
             trip_title = f"Trip to {self.state.trip_details.destination}" if self.state.trip_details else "Your Trip Plan"
             
             plan_content = f"# {trip_title}\n\n"
             plan_content += f"**Generated on:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+            if self.state.degraded_steps:
+                plan_content += f"**Note:** These steps ran out of time and used a simplified result: {', '.join(self.state.degraded_steps)}\n\n"
             
             if self.state.trip_details:
                 plan_content += "## Trip Details\n\n"
@@ -378,14 +724,17 @@ class TripPlanningFlow(Flow[TripPlanningState]):
             plan_content += "## Your Itinerary\n\n"
             plan_content += self.state.final_trip_plan
             
-            with open("output/complete_trip_plan.md", "w") as f:
+            with open(os.path.join(self.output_dir, "complete_trip_plan.md"), "w") as f:
                 f.write(plan_content)
         
+        # Save latency and cost of each model route
+        with open(os.path.join(self.output_dir, "model_routes.json"), "w") as f:
+            json.dump(get_router().report(), f, indent=2)
+        
         print("\n🎉 Trip planning completed!")
         print("📁 Files saved:")
-        print("   - output/trip_details.json")
-        print("   - output/attractions.json") 
-        print("   - output/complete_trip_plan.md")
+        for filename in ("user_query.txt", "trip_details.json", "attractions.json", "complete_trip_plan.md", "model_routes.json"):
+            print(f"   - {os.path.join(self.output_dir, filename)}")
         
         return "Trip planning flow completed successfully"
 
@@ -0,0 +1,238 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import yaml
+from crewai import LLM
+from crewai.llms.base_llm import BaseLLM
+
+from travel_flow.deadline import current_deadline
+
+DEFAULT_ROUTES_PATH = Path(__file__).parent / "config" / "model_routes.yaml"
+
+# Rough characters-per-token ratio used to estimate token counts when pricing a call
+CHARS_PER_TOKEN = 4
+
+# Number of recent call latencies kept per route for the percentile report
+LATENCY_WINDOW = 1000
+
+
+def _message_text(messages: Union[str, List[Dict[str, str]]]) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.get("content", "")) for message in messages)
+
+
+def final_answer_is_json(response: Any) -> bool:
+    """Check whether the final answer in an agent response parses as a JSON object
+
+    Responses that are tool calls rather than final answers are accepted as they are.
+    """
+    if not isinstance(response, str):
+        return True
+    _, marker, answer = response.partition("Final Answer:")
+    if not marker:
+        return "Action:" in response
+    match = re.search(r"\{.*\}", answer, re.DOTALL)
+    if not match:
+        return False
+    try:
+        json.loads(match.group(0), strict=False)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+class RoutedLLM(BaseLLM):
+    """LLM that sends each call to the first healthy model of a route's tier
+
+    Models are tried in order. A call falls back to the next model when it times out or fails,
+    or, for structured routes, when the final answer is not valid JSON. Calls made inside a
+    step's deadline are bounded by it, and raise DeadlineExceeded once it has passed. Streaming
+    routes emit their output chunk by chunk on the crewai event bus.
+    """
+
+    def __init__(self, route: str, models: List[str], timeout: Optional[float], structured: bool, router: "ModelRouter", stream: bool = False):
+        super().__init__(model=models[0])
+        self.route = route
+        self.models = models
+        self.timeout = timeout
+        self.structured = structured
+        self.stream = stream
+        self.router = router
+        self._llms: Dict[str, LLM] = {}
+
+    def _llm_for_model(self, model: str) -> LLM:
+        if model not in self._llms:
+            self._llms[model] = LLM(model=model, timeout=self.timeout, stream=self.stream)
+        return self._llms[model]
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+    ) -> Union[str, Any]:
+        prompt_chars = len(_message_text(messages))
+        last_error: Optional[Exception] = None
+        response: Any = None
+
+        deadline = current_deadline()
+
+        for index, model in enumerate(self.models):
+            llm = self._llm_for_model(model)
+            llm.stop = self.stop
+            # Never wait on a model for longer than the step has left
+            if deadline is not None:
+                llm.timeout = deadline.timeout(self.timeout or deadline.remaining())
+            is_last = index == len(self.models) - 1
+
+            start = time.perf_counter()
+            try:
+                response = llm.call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions)
+            except Exception as e:
+                self.router.record(self.route, model, time.perf_counter() - start, prompt_chars, 0, "error")
+                print(f"⚠️ Model {model} failed for {self.route}: {e}")
+                last_error = e
+                continue
+
+            latency = time.perf_counter() - start
+            completion_chars = len(str(response))
+            if self.structured and not is_last and not final_answer_is_json(response):
+                self.router.record(self.route, model, latency, prompt_chars, completion_chars, "parse_failure")
+                print(f"⚠️ Model {model} returned an unparseable answer for {self.route}, falling back")
+                continue
+
+            self.router.record(self.route, model, latency, prompt_chars, completion_chars, "ok")
+            return response
+
+        raise last_error if last_error else RuntimeError(f"No model available for route {self.route}")
+
+    def supports_function_calling(self) -> bool:
+        return self._llm_for_model(self.models[0]).supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self._llm_for_model(self.models[0]).supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return min(self._llm_for_model(model).get_context_window_size() for model in self.models)
+
+
+class ModelRouter:
+    """Maps flow steps or agent roles to model tiers and records the latency and cost of each route"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.tiers: Dict[str, Dict[str, Any]] = config.get("tiers", {})
+        self.routes: Dict[str, Dict[str, Any]] = config.get("routes", {})
+        self.pricing: Dict[str, List[float]] = config.get("pricing", {})
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "ModelRouter":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(yaml.safe_load(f))
+
+    def llm_for(self, route: str) -> Optional[BaseLLM]:
+        """Return the routed LLM for a step or role, or None to use the default LLM"""
+        route_config = self.routes.get(route)
+        if not route_config:
+            return None
+        if isinstance(route_config, str):
+            route_config = {"tier": route_config}
+
+        tier = self.tiers.get(route_config["tier"])
+        if not tier or not tier.get("models"):
+            raise ValueError(f"Route {route} uses unknown or empty tier: {route_config['tier']}")
+
+        return RoutedLLM(
+            route=route,
+            models=list(tier["models"]),
+            timeout=tier.get("timeout"),
+            structured=bool(route_config.get("structured", False)),
+            router=self,
+            stream=bool(route_config.get("stream", False)),
+        )
+
+    def estimate_cost(self, model: str, prompt_tokens: float, completion_tokens: float) -> float:
+        input_price, output_price = self.pricing.get(model, [0.0, 0.0])
+        return (prompt_tokens * input_price + completion_tokens * output_price) / 1000
+
+    def record(self, route: str, model: str, latency: float, prompt_chars: int, completion_chars: int, outcome: str):
+        """Record one model call made for a route"""
+        prompt_tokens = prompt_chars / CHARS_PER_TOKEN
+        completion_tokens = completion_chars / CHARS_PER_TOKEN
+        cost = self.estimate_cost(model, prompt_tokens, completion_tokens)
+
+        with self._lock:
+            stats = self._stats.setdefault(route, {
+                "calls": 0,
+                "fallbacks": 0,
+                "latencies": deque(maxlen=LATENCY_WINDOW),
+                "estimated_cost_usd": 0.0,
+                "models": {},
+            })
+            stats["calls"] += 1
+            if outcome != "ok":
+                stats["fallbacks"] += 1
+            stats["latencies"].append(latency)
+            stats["estimated_cost_usd"] += cost
+
+            model_stats = stats["models"].setdefault(model, {
+                "calls": 0, "errors": 0, "parse_failures": 0,
+                "total_latency": 0.0, "estimated_tokens": 0, "estimated_cost_usd": 0.0,
+            })
+            model_stats["calls"] += 1
+            model_stats["errors"] += outcome == "error"
+            model_stats["parse_failures"] += outcome == "parse_failure"
+            model_stats["total_latency"] += latency
+            model_stats["estimated_tokens"] += int(prompt_tokens + completion_tokens)
+            model_stats["estimated_cost_usd"] += cost
+
+    def report(self) -> Dict[str, Any]:
+        """Summarize the calls, latency and estimated cost of every route used so far"""
+        report = {}
+        with self._lock:
+            for route, stats in self._stats.items():
+                latencies = sorted(stats["latencies"])
+                report[route] = {
+                    "calls": stats["calls"],
+                    "fallbacks": stats["fallbacks"],
+                    "p50_latency": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                    "p95_latency": round(latencies[int(len(latencies) * 0.95)], 3) if latencies else None,
+                    "estimated_cost_usd": round(stats["estimated_cost_usd"], 6),
+                    "models": {
+                        model: {
+                            **{key: value for key, value in model_stats.items() if key != "total_latency"},
+                            "avg_latency": round(model_stats["total_latency"] / model_stats["calls"], 3),
+                            "estimated_cost_usd": round(model_stats["estimated_cost_usd"], 6),
+                        }
+                        for model, model_stats in stats["models"].items()
+                    },
+                }
+        return report
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    """Return the process-wide model router
+
+    Routes are read from TRAVEL_FLOW_MODEL_ROUTES if set, otherwise from config/model_routes.yaml.
+    Setting TRAVEL_FLOW_MODEL_ROUTES to "off" disables routing and every agent uses the default LLM.
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            path = os.getenv("TRAVEL_FLOW_MODEL_ROUTES", str(DEFAULT_ROUTES_PATH))
+            _router = ModelRouter() if path.lower() == "off" else ModelRouter.from_file(path)
+        return _router
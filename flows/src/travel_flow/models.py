@@ -26,4 +26,27 @@ class AttractionsSearchResult(BaseModel):
     destination: str = Field(..., description="The destination that was searched")
     attractions: List[Attraction] = Field(..., description="List of found attractions")
     total_found: int = Field(..., description="Total number of attractions found")
-    search_date: str = Field(..., description="Date when the search was performed") 
\ No newline at end of file
+    search_date: str = Field(..., description="Date when the search was performed") 
+
+class ScheduledVisit(BaseModel):
+    """Model for one attraction visit in a day skeleton"""
+    name: str = Field(..., description="Name of the attraction")
+    location: str = Field(..., description="Location/address of the attraction")
+    start: str = Field(..., description="Planned start time (HH:MM)")
+    end: str = Field(..., description="Planned end time (HH:MM)")
+    travel_minutes: Optional[int] = Field(None, description="Estimated travel time from the previous visit, None if unknown")
+    opening_hours: Optional[str] = Field(None, description="Opening hours the visit was scheduled within")
+
+class DaySkeleton(BaseModel):
+    """Model for the fixed structure of one day of the itinerary"""
+    day: int = Field(..., description="Day number, starting at 1")
+    date: Optional[str] = Field(None, description="Date of the day if the start date is known")
+    visits: List[ScheduledVisit] = Field(default_factory=list, description="Visits in order")
+    lunch: Optional[str] = Field(None, description="Lunch break start time (HH:MM)")
+    travel_minutes: int = Field(0, description="Total estimated travel time of the day")
+
+class TripSkeleton(BaseModel):
+    """Model for the deterministic day-by-day schedule the trip plan is written around"""
+    days: List[DaySkeleton] = Field(default_factory=list, description="One entry per day of the trip")
+    unscheduled: List[str] = Field(default_factory=list, description="Attractions that did not fit any day")
+    unlocated: List[str] = Field(default_factory=list, description="Attractions without known coordinates")
@@ -0,0 +1,349 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Type
+
+from crewai.utilities.converter import Converter
+from pydantic import BaseModel, ValidationError
+
+from travel_flow.streaming import FinalAnswerFilter
+
+# Python literals that LLMs sometimes emit instead of JSON ones
+BARE_LITERALS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+
+# Characters that may follow a backslash in a JSON string
+JSON_ESCAPES = frozenset('"\\/bfnrtu')
+
+# Maximum number of times invalid fields are dropped and the model validated again
+MAX_VALIDATION_PASSES = 5
+
+
+class _Frame:
+    """An open object or array while scanning JSON"""
+
+    def __init__(self, kind: str, member_start: int):
+        self.kind = kind
+        # object: key -> colon -> value -> comma, array: value -> comma
+        self.phase = "key" if kind == "{" else "value"
+        # Output position before the member being read, used to drop it if it is incomplete
+        self.member_start = member_start
+
+
+class JSONRepairer:
+    """Incremental scanner that rewrites LLM JSON into valid JSON
+
+    It accepts single-quoted strings, unquoted keys and values, Python literals, trailing commas,
+    raw newlines and invalid escapes in strings and text before or after the JSON value. An
+    unquoted value runs up to the next comma or closing bracket, so "5 days" and "9:00 AM" are read
+    whole. Output that is cut off can be closed at any point with snapshot(), which drops the
+    member that is still incomplete.
+    """
+
+    def __init__(self):
+        self.out: List[str] = []
+        self.stack: List[_Frame] = []
+        self.started = False
+        self.done = False
+        self.in_string = False
+        self.string_is_key = False
+        self.quote = '"'
+        self.escape = False
+        # Hex digits still expected by the \u escape being read, and where that escape starts in out
+        self.unicode_left = 0
+        self.unicode_start = 0
+        self.bareword: List[str] = []
+        # Number of top-level object members completed so far, and where the last one ends in out
+        self.completed_members = 0
+        self.completed_end = 0
+
+    def feed(self, text: str):
+        for char in text:
+            if self.done:
+                return
+            self._consume(char)
+
+    def _value_completed(self):
+        if not self.stack:
+            self.done = True
+            return
+        frame = self.stack[-1]
+        frame.phase = "comma"
+        if len(self.stack) == 1 and frame.kind == "{":
+            self.completed_members += 1
+            self.completed_end = len(self.out)
+
+    def _flush_bareword(self):
+        if not self.bareword:
+            return
+        word = "".join(self.bareword).rstrip()
+        self.bareword = []
+        frame = self.stack[-1] if self.stack else None
+        if frame and frame.kind == "{" and frame.phase == "key":
+            self.out.append(json.dumps(word))
+            frame.phase = "colon"
+            return
+        self.out.append(_bareword_value(word))
+        self._value_completed()
+
+    def _consume(self, char: str):
+        if not self.started:
+            if char in "{[":
+                self.started = True
+                self._open(char)
+            return
+
+        if self.in_string:
+            self._consume_string(char)
+            return
+
+        frame = self.stack[-1]
+        if self.bareword:
+            # Keys end at the colon, values only at the next member or the closing bracket
+            ends = ",:}]" if frame.kind == "{" and frame.phase == "key" else ",}]"
+            if char not in ends:
+                self.bareword.append(char)
+                return
+            self._flush_bareword()
+            if self.done:
+                return
+
+        if char.isspace():
+            return
+        if char in "\"'":
+            self.in_string = True
+            self.quote = char
+            self.string_is_key = frame.kind == "{" and frame.phase == "key"
+            self.out.append('"')
+        elif char in "{[":
+            self._open(char)
+        elif char in "}]":
+            self._close()
+        elif char == ",":
+            if frame.phase == "comma":
+                frame.member_start = len(self.out)
+                self.out.append(",")
+                frame.phase = "key" if frame.kind == "{" else "value"
+        elif char == ":":
+            if frame.kind == "{" and frame.phase == "colon":
+                self.out.append(":")
+                frame.phase = "value"
+        else:
+            self.bareword.append(char)
+
+    def _consume_string(self, char: str):
+        if self.escape:
+            self.escape = False
+            if char not in JSON_ESCAPES:
+                # Not a JSON escape, like \' in a single-quoted string: keep the character alone
+                self.out.pop()
+            elif char == "u":
+                self.unicode_left = 4
+                self.unicode_start = len(self.out) - 1
+            self.out.append(char)
+        elif self.unicode_left and char != self.quote:
+            self.unicode_left -= 1
+            self.out.append(char)
+        elif char == "\\":
+            self.escape = True
+            self.out.append(char)
+        elif char == self.quote:
+            self.in_string = False
+            if self.unicode_left:
+                # A \u escape cut short by the end of the string
+                del self.out[self.unicode_start:]
+                self.unicode_left = 0
+            self.out.append('"')
+            if self.string_is_key:
+                self.stack[-1].phase = "colon"
+            else:
+                self._value_completed()
+        elif char == '"':
+            # A double quote inside a single-quoted string
+            self.out.append('\\"')
+        elif char == "\n":
+            self.out.append("\\n")
+        elif char == "\t":
+            self.out.append("\\t")
+        else:
+            self.out.append(char)
+
+    def _open(self, char: str):
+        self.out.append(char)
+        self.stack.append(_Frame(char, len(self.out)))
+
+    def _close(self):
+        frame = self.stack[-1]
+        if frame.phase != "comma":
+            # Drop a trailing comma or a member without a value
+            del self.out[frame.member_start:]
+        self.out.append("}" if frame.kind == "{" else "]")
+        self.stack.pop()
+        self._value_completed()
+
+    def snapshot(self) -> str:
+        """Return the JSON read so far as a valid document, closing anything left open"""
+        if self.done:
+            return "".join(self.out)
+        if not self.started:
+            raise ValueError("No JSON object found")
+
+        out = list(self.out)
+        frame = self.stack[-1]
+        value_kept = False
+        if self.in_string and not self.string_is_key:
+            # Keep a partial string value, without a dangling escape character or \u escape
+            if self.escape:
+                out.pop()
+            elif self.unicode_left:
+                del out[self.unicode_start:]
+            out.append('"')
+            value_kept = True
+        elif self.bareword and not (frame.kind == "{" and frame.phase == "key"):
+            out.append(_bareword_value("".join(self.bareword).rstrip()))
+            value_kept = True
+
+        if not value_kept and frame.phase != "comma":
+            # Drop a partial key, a key without a value or a trailing comma
+            del out[frame.member_start:]
+
+        for open_frame in reversed(self.stack):
+            out.append("}" if open_frame.kind == "{" else "]")
+
+        return "".join(out)
+
+    def completed_snapshot(self) -> str:
+        """Return the top-level object with only its completed members, leaving out the one in progress"""
+        if self.done:
+            return "".join(self.out)
+        if not self.completed_members:
+            return "{}"
+        return "".join(self.out[:self.completed_end]) + "}"
+
+
+def _bareword_value(word: str) -> str:
+    """JSON for an unquoted value: a literal, a number, or otherwise a string"""
+    if word in BARE_LITERALS:
+        return BARE_LITERALS[word]
+    try:
+        float(word)
+        return word
+    except ValueError:
+        return json.dumps(word)
+
+
+def repair_json(text: str) -> str:
+    """Rewrite possibly malformed or truncated LLM JSON output into a valid JSON document"""
+    repairer = JSONRepairer()
+    repairer.feed(text)
+    return repairer.snapshot()
+
+
+def validate_partial(model: Type[BaseModel], data: Dict[str, Any], defaults: Optional[Dict[str, Any]] = None) -> Optional[BaseModel]:
+    """Validate data against a model, dropping fields and list items that don't validate
+
+    Dropped fields fall back to the given defaults or the model's own defaults. Returns None if a
+    required field is still missing.
+    """
+    defaults = defaults or {}
+    data = {**defaults, **{key: value for key, value in data.items() if key in model.model_fields}}
+
+    for _ in range(MAX_VALIDATION_PASSES):
+        try:
+            return model.model_validate(data)
+        except ValidationError as e:
+            invalid_items: Dict[str, List[int]] = {}
+            for error in e.errors():
+                loc = error["loc"]
+                field = loc[0] if loc else None
+                if field not in model.model_fields:
+                    return None
+                if len(loc) > 1 and isinstance(loc[1], int) and isinstance(data.get(field), list):
+                    invalid_items.setdefault(field, []).append(loc[1])
+                elif field in defaults and data.get(field) != defaults[field]:
+                    data[field] = defaults[field]
+                elif field in data and not model.model_fields[field].is_required():
+                    data.pop(field)
+                else:
+                    return None
+            for field, indexes in invalid_items.items():
+                data[field] = [item for index, item in enumerate(data[field]) if index not in set(indexes)]
+    return None
+
+
+def parse_model_output(text: str, model: Type[BaseModel], defaults: Optional[Dict[str, Any]] = None) -> Optional[BaseModel]:
+    """Parse an LLM output into a model, repairing the JSON locally instead of asking the LLM again"""
+    if not isinstance(text, str):
+        return None
+    try:
+        data = json.loads(repair_json(text))
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return validate_partial(model, data, defaults)
+
+
+class RepairingConverter(Converter):
+    """Output converter that repairs malformed JSON locally before falling back to an LLM conversion"""
+
+    def to_pydantic(self, current_attempt=1) -> BaseModel:
+        result = parse_model_output(self.text, self.model)
+        if result is not None:
+            return result
+        return super().to_pydantic(current_attempt)
+
+    def to_json(self, current_attempt=1):
+        result = parse_model_output(self.text, self.model)
+        if result is not None:
+            return result.model_dump_json()
+        return super().to_json(current_attempt)
+
+
+class StreamingJSONParser:
+    """Parse the final answer of a streamed agent response as it arrives
+
+    Text before the start marker (the agent's reasoning) is skipped. Top-level fields are reported
+    once their value is complete, so a partially streamed string is never exposed.
+    """
+
+    def __init__(self, start_marker: str = "Final Answer:"):
+        self._answer = FinalAnswerFilter(start_marker)
+        self.reset()
+
+    def reset(self):
+        """Start over, e.g. when the agent makes a new LLM call"""
+        self._answer.reset()
+        self._repairer = JSONRepairer()
+        self._completed_members = 0
+        self.fields: Dict[str, Any] = {}
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """Add a chunk of streamed text, returning the top-level fields completed by it"""
+        chunk = self._answer.feed(chunk)
+        if not chunk:
+            return {}
+
+        self._repairer.feed(chunk)
+        if self._repairer.completed_members == self._completed_members:
+            return {}
+        self._completed_members = self._repairer.completed_members
+
+        try:
+            # Only members that closed: a string still streaming would be published cut short
+            snapshot = json.loads(self._repairer.completed_snapshot())
+        except ValueError:
+            return {}
+        if not isinstance(snapshot, dict):
+            return {}
+        new_fields = {key: value for key, value in snapshot.items() if key not in self.fields}
+        self.fields.update(new_fields)
+        return new_fields
+
+
+def attractions_defaults(destination: Optional[str]) -> Dict[str, Any]:
+    """Defaults used to recover an AttractionsSearchResult from incomplete output"""
+    return {
+        "destination": destination or "",
+        "attractions": [],
+        "total_found": 0,
+        "search_date": datetime.now().strftime('%Y-%m-%d'),
+    }
@@ -0,0 +1,251 @@
+import contextvars
+import functools
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Seconds between stack samples, overridden by TRAVEL_FLOW_PROFILE_INTERVAL
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# Allocation sites listed in each step's report
+TOP_ALLOCATIONS = 25
+
+# Frames kept per traced allocation; deeper tracebacks make every allocation slower
+TRACEMALLOC_FRAMES = 10
+
+# Functions a thread blocks in while it waits on another thread, a model or a web search; samples
+# ending in them are counted as idle and left out of the flamegraph, which shows local CPU time
+IDLE_FUNCTIONS = frozenset({
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "readinto"),
+    ("ssl.py", "read"),
+    ("ssl.py", "recv_into"),
+})
+
+_current_profile: contextvars.ContextVar[Optional["StepProfile"]] = contextvars.ContextVar("current_profile", default=None)
+
+
+def profiling_enabled() -> bool:
+    """Whether steps are profiled, from TRAVEL_FLOW_PROFILE"""
+    return os.getenv("TRAVEL_FLOW_PROFILE", "").lower() in ("1", "true", "yes", "on")
+
+
+class StepProfile:
+    """Stack samples and allocations of one step, written to <output_dir>/profile/ when it ends"""
+
+    def __init__(self, name: str, output_dir: str):
+        self.name = name
+        self.output_dir = output_dir
+        self.stacks: Counter = Counter()
+        self.threads = {threading.get_ident()}
+        self.samples = 0
+        self.idle = 0
+        # Set when another step was profiled at the same time, whose allocations are then mixed in
+        self.overlapped = False
+        self.started = time.perf_counter()
+        self.duration = 0.0
+
+    def write(self, snapshot: tracemalloc.Snapshot, traced_memory: Tuple[int, int]) -> List[str]:
+        """Write the collapsed stacks, for flamegraph.pl or speedscope, and the allocations report"""
+        directory = os.path.join(self.output_dir, "profile")
+        os.makedirs(directory, exist_ok=True)
+        collapsed_path = os.path.join(directory, f"{self.name}.collapsed")
+        with open(collapsed_path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        allocations_path = os.path.join(directory, f"{self.name}.alloc.txt")
+        current, peak = traced_memory
+        with open(allocations_path, "w") as f:
+            busy = sum(self.stacks.values())
+            f.write(f"# {self.name}: {self.duration:.3f}s, {self.samples} samples, {busy} thread samples on CPU, {self.idle} idle\n")
+            f.write(f"# allocated during the step and still held {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n")
+            if self.overlapped:
+                f.write("# other steps were profiled at the same time: their allocations are included\n")
+            f.write(f"# top {TOP_ALLOCATIONS} allocation sites of the memory still held\n\n")
+            for stat in snapshot.statistics("traceback")[:TOP_ALLOCATIONS]:
+                f.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                for line in stat.traceback.format(most_recent_first=True)[:TRACEMALLOC_FRAMES * 2]:
+                    f.write(f"    {line}\n")
+        return [collapsed_path, allocations_path]
+
+
+class Sampler:
+    """Process-wide thread that samples the stacks of the threads running profiled steps
+
+    Sampling reads every thread's current frame with sys._current_frames, so the profiled code is
+    not instrumented and runs at full speed; the cost is one stack walk per profiled thread per
+    interval, in this thread. The thread sleeps while no step is being profiled.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._profiles: List[StepProfile] = []
+        self._labels: Dict[object, str] = {}
+        self._idle_codes: Dict[object, bool] = {}
+        self._lock = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        # Whether the sampler started tracemalloc, and so stops it once no step is profiled
+        self._tracing = False
+
+    def add(self, profile: StepProfile) -> bool:
+        """Start sampling for a profile, returning whether it is the only one being sampled"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                self._tracing = True
+            self._profiles.append(profile)
+            if len(self._profiles) > 1:
+                for other in self._profiles:
+                    other.overlapped = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="profiler")
+                self._thread.start()
+            self._lock.notify_all()
+            return len(self._profiles) == 1
+
+    def remove(self, profile: StepProfile):
+        """Stop sampling for a profile, and tracing allocations after the last one"""
+        with self._lock:
+            self._profiles.remove(profile)
+            # Tracing slows every allocation down, so it is only kept on while steps are profiled
+            if not self._profiles and self._tracing:
+                tracemalloc.stop()
+                self._tracing = False
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            # Module path relative to its package, so frames read "travel_flow/main.py" not the full path
+            path = "/".join(code.co_filename.replace(os.sep, "/").split("/")[-2:])
+            label = re.sub(r"[;\s]", "_", f"{code.co_name}({path}:{code.co_firstlineno})")
+            self._labels[code] = label
+        return label
+
+    def _is_idle(self, code) -> bool:
+        idle = self._idle_codes.get(code)
+        if idle is None:
+            idle = (os.path.basename(code.co_filename), code.co_name) in IDLE_FUNCTIONS
+            self._idle_codes[code] = idle
+        return idle
+
+    def _collapse(self, frame) -> str:
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(labels))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._profiles:
+                    self._lock.wait()
+                profiles = list(self._profiles)
+
+            frames = sys._current_frames()
+            for profile in profiles:
+                profile.samples += 1
+                for thread_id in list(profile.threads):
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    if self._is_idle(frame.f_code):
+                        profile.idle += 1
+                    else:
+                        profile.stacks[self._collapse(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+_sampler: Optional[Sampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler() -> Sampler:
+    """Return the process-wide sampler, sampling every TRAVEL_FLOW_PROFILE_INTERVAL seconds"""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = Sampler(float(os.getenv("TRAVEL_FLOW_PROFILE_INTERVAL", DEFAULT_SAMPLE_INTERVAL)))
+        return _sampler
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    # Leave out the profiler's own allocations: the samples and tracemalloc's bookkeeping
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+
+
+@contextmanager
+def profile_step(name: str, output_dir: str) -> Iterator[Optional[StepProfile]]:
+    """Sample the stacks and trace the allocations of a step, if profiling is enabled
+
+    The samples cover the calling thread and the worker threads started for the step (see
+    profiled_thread). Allocations are traced from a clean slate: the traces are cleared when the
+    step starts, so the snapshot taken when it ends holds only what the step allocated and still
+    holds, and comparing two snapshots of the whole heap is avoided. tracemalloc traces the whole
+    process, so while other steps are profiled the traces are left alone and the reports of
+    overlapping steps include each other's allocations; profile one run at a time for clean ones.
+    """
+    if not profiling_enabled():
+        yield None
+        return
+
+    profile = StepProfile(name, output_dir)
+    token = _current_profile.set(profile)
+    sampler = get_sampler()
+    if sampler.add(profile):
+        tracemalloc.clear_traces()
+        tracemalloc.reset_peak()
+    try:
+        yield profile
+    finally:
+        profile.duration = time.perf_counter() - profile.started
+        # Read the allocations before the profile is removed, which may stop tracing
+        snapshot, traced_memory = _take_snapshot(), tracemalloc.get_traced_memory()
+        sampler.remove(profile)
+        _current_profile.reset(token)
+        paths = profile.write(snapshot, traced_memory)
+        print(f"🔬 Profiled {name} ({profile.samples} samples): {', '.join(paths)}")
+
+
+def profiled(method: Callable) -> Callable:
+    """Profile a TripPlanningFlow step that has no time budget of its own (see flow_step)"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with profile_step(method.__name__, self.output_dir):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def profiled_thread() -> Iterator[None]:
+    """Include the current thread in the samples of the step it works for
+
+    Used by worker threads that run with a copy of the step's context, like the ones started by
+    start_with_deadline.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    thread_id = threading.get_ident()
+    profile.threads.add(thread_id)
+    try:
+        yield
+    finally:
+        profile.threads.discard(thread_id)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+import sys
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from pydantic import BaseModel, Field
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from travel_flow.main import TripPlanningFlow, TripPlanningState
+from travel_flow.models import TripDetails, AttractionsSearchResult
+from travel_flow.trip_utils import parse_duration_days, duration_bucket, budget_tier
+
+# Markdown headings such as "#### Day 3: Desert Safari" or "## Day 3"
+DAY_HEADING_PATTERN = re.compile(r"^(#{1,6})\s*\**\s*Day\s+(\d+)\b", re.IGNORECASE)
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s")
+
+DURATION_BUCKETS = ["short", "medium", "long"]
+
+# Trip fields that change the content of every day of the itinerary
+PLAN_WIDE_FIELDS = ["destination", "start_date", "budget", "interests", "group_size", "accommodation_type"]
+
+
+class PlanSections(BaseModel):
+    """A trip plan split into its title, per-day sections and closing summary"""
+    header: str = ""
+    days: Dict[int, str] = Field(default_factory=dict)
+    footer: str = ""
+
+
+class Invalidation(BaseModel):
+    """Which artifacts of a previous run have to be recomputed after a trip details edit"""
+    changed_fields: List[str] = Field(default_factory=list)
+    refresh_attractions: bool = False
+    regenerate_full_plan: bool = False
+    days_to_generate: List[int] = Field(default_factory=list)
+    days_to_drop: List[int] = Field(default_factory=list)
+
+    @property
+    def is_noop(self) -> bool:
+        return not (self.refresh_attractions or self.regenerate_full_plan or self.days_to_generate or self.days_to_drop)
+
+
+def split_plan_days(plan: str) -> PlanSections:
+    """Split a markdown itinerary into the text before day 1, each day's section and the text after the last day"""
+    sections = PlanSections()
+    current_day: Optional[int] = None
+    day_level = 0
+    lines: List[str] = []
+
+    def flush():
+        text = "\n".join(lines).strip("\n")
+        if current_day is None:
+            if sections.days:
+                sections.footer = text
+            else:
+                sections.header = text
+        else:
+            sections.days[current_day] = text
+
+    for line in plan.splitlines():
+        day_match = DAY_HEADING_PATTERN.match(line)
+        heading_match = HEADING_PATTERN.match(line)
+        if day_match:
+            flush()
+            current_day = int(day_match.group(2))
+            day_level = len(day_match.group(1))
+            lines = [line]
+        elif current_day is not None and heading_match and len(heading_match.group(1)) <= day_level:
+            # A heading at the same or a higher level than the day headings closes the last day
+            flush()
+            current_day = None
+            lines = [line]
+        else:
+            lines.append(line)
+    flush()
+
+    # Drop horizontal rules left dangling between sections, join_plan_sections adds them back
+    sections.header = _strip_trailing_rules(sections.header)
+    for day, text in sections.days.items():
+        sections.days[day] = _strip_trailing_rules(text)
+
+    return sections
+
+
+def _strip_trailing_rules(text: str) -> str:
+    return re.sub(r"(\s*\n\s*-{3,}\s*)+$", "", text).rstrip()
+
+
+def shorten_plan_sections(sections: PlanSections, old_days: int, new_days: int):
+    """Fit the title and closing summary of a plan to a trip shortened without the planner
+
+    The day count in the title is updated and the budget summary, which still totals the dropped
+    days, is removed; the other closing sections, like the tips, are kept.
+    """
+    sections.header = re.sub(rf"\b{old_days}(\s*-?\s*)(days?)\b", lambda match: f"{new_days}{match.group(1)}{match.group(2)}", sections.header, flags=re.IGNORECASE)
+
+    kept: List[str] = []
+    skip_level = 0
+    for line in sections.footer.splitlines():
+        heading_match = HEADING_PATTERN.match(line)
+        if heading_match:
+            level = len(heading_match.group(1))
+            if skip_level and level <= skip_level:
+                skip_level = 0
+            if not skip_level and "budget" in line.lower():
+                skip_level = level
+        if not skip_level:
+            kept.append(line)
+    sections.footer = _strip_trailing_rules("\n".join(kept).strip("\n"))
+
+
+def join_plan_sections(sections: PlanSections) -> str:
+    """Reassemble plan sections into a single markdown itinerary"""
+    parts = [sections.header] if sections.header else []
+    parts.extend(sections.days[day] for day in sorted(sections.days))
+    if sections.footer:
+        parts.append(sections.footer)
+    return "\n\n---\n\n".join(part.strip("\n") for part in parts)
+
+
+def apply_delta(trip_details: TripDetails, delta: Union[TripDetails, Dict[str, Any]]) -> TripDetails:
+    """Return a copy of the trip details with the fields set in the delta applied"""
+    if isinstance(delta, TripDetails):
+        changes = delta.model_dump(exclude_unset=True)
+    else:
+        changes = dict(delta)
+
+    unknown = set(changes) - set(TripDetails.model_fields)
+    if unknown:
+        raise ValueError(f"Unknown trip detail fields: {', '.join(sorted(unknown))}")
+
+    return TripDetails(**{**trip_details.model_dump(), **changes})
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, list):
+        return sorted(_normalize(item) for item in value)
+    return value
+
+
+def compute_invalidation(old: TripDetails, new: TripDetails, previous_plan: str = "") -> Invalidation:
+    """Work out which downstream artifacts are invalidated by moving from the old to the new trip details
+
+    The attractions search only depends on the destination, the duration bucket and the budget tier,
+    while the itinerary depends on every field. A pure duration change keeps the days that still fit
+    the trip and only writes the new ones.
+    """
+    invalidation = Invalidation(changed_fields=[
+        field for field in TripDetails.model_fields
+        if _normalize(getattr(old, field)) != _normalize(getattr(new, field))
+    ])
+    changed = set(invalidation.changed_fields)
+    if not changed:
+        return invalidation
+
+    old_days = parse_duration_days(old.duration)
+    new_days = parse_duration_days(new.duration)
+
+    # Attractions search inputs: destination, duration bucket and budget tier
+    if "destination" in changed:
+        invalidation.refresh_attractions = True
+    if "duration" in changed:
+        old_bucket, new_bucket = duration_bucket(old_days), duration_bucket(new_days)
+        # A shorter trip can pick from the attractions already found, a longer one needs more
+        if old_bucket is None or new_bucket is None or DURATION_BUCKETS.index(new_bucket) > DURATION_BUCKETS.index(old_bucket):
+            invalidation.refresh_attractions = True
+    if "budget" in changed:
+        old_tier, new_tier = budget_tier(old.budget), budget_tier(new.budget)
+        # Plain amounts can't be compared reliably, so any change to them refreshes the search
+        if old_tier is None or new_tier is None or old_tier != new_tier:
+            invalidation.refresh_attractions = True
+
+    if changed & set(PLAN_WIDE_FIELDS) or not previous_plan:
+        invalidation.regenerate_full_plan = True
+        return invalidation
+
+    # Only the duration changed: keep the days that still fit and write the missing ones
+    sections = split_plan_days(previous_plan)
+    if old_days is None or new_days is None or sorted(sections.days) != list(range(1, old_days + 1)):
+        invalidation.regenerate_full_plan = True
+        return invalidation
+
+    invalidation.days_to_generate = list(range(old_days + 1, new_days + 1))
+    invalidation.days_to_drop = list(range(new_days + 1, old_days + 1))
+    return invalidation
+
+
+def replan_trip(
+    previous_state: TripPlanningState,
+    delta: Union[TripDetails, Dict[str, Any]],
+    save: bool = True,
+) -> TripPlanningState:
+    """Re-plan a previous run after a trip details edit, recomputing only the invalidated artifacts
+
+    Args:
+        previous_state: Final state of an earlier TripPlanningFlow run
+        delta: Trip detail fields that changed, as a dict or a TripDetails with only those fields set
+        save: Whether to write the updated trip plan files
+
+    Returns:
+        The state of the re-planned trip
+    """
+    if not previous_state.trip_details:
+        raise ValueError("The previous run has no trip details to re-plan from")
+
+    new_details = apply_delta(previous_state.trip_details, delta)
+    invalidation = compute_invalidation(previous_state.trip_details, new_details, previous_state.final_trip_plan)
+
+    print("\n=== Incremental Re-planning ===\n")
+    print(f"✏️ Changed fields: {', '.join(invalidation.changed_fields) or 'none'}")
+
+    flow = TripPlanningFlow()
+    flow.state.user_query = previous_state.user_query
+    flow.state.trip_details = new_details
+    flow.state.attractions_result = previous_state.attractions_result
+    flow.state.final_trip_plan = previous_state.final_trip_plan
+
+    if invalidation.is_noop:
+        print("✅ Nothing to recompute, the previous plan is still valid")
+        return flow.state
+
+    if invalidation.refresh_attractions:
+        flow.search_attractions()
+    else:
+        print("♻️ Reusing previous attractions")
+
+    if invalidation.regenerate_full_plan:
+        flow.generate_trip_plan()
+    else:
+        sections = split_plan_days(previous_state.final_trip_plan)
+        for day in invalidation.days_to_drop:
+            sections.days.pop(day, None)
+        print(f"♻️ Reusing days: {', '.join(str(day) for day in sorted(sections.days)) or 'none'}")
+
+        # A shorter trip only drops days, which needs no new text from the planner
+        if not invalidation.days_to_generate:
+            shorten_plan_sections(sections, parse_duration_days(previous_state.trip_details.duration), parse_duration_days(new_details.duration))
+        else:
+            kept_plan = "\n\n".join(sections.days[day] for day in sorted(sections.days))
+            generated = split_plan_days(flow.generate_plan_days(invalidation.days_to_generate, kept_plan))
+
+            sections.header = generated.header or sections.header
+            sections.footer = generated.footer or sections.footer
+            for day in invalidation.days_to_generate:
+                if day in generated.days:
+                    sections.days[day] = generated.days[day]
+        flow.state.final_trip_plan = join_plan_sections(sections)
+
+    if save:
+        flow.save_trip_plan()
+
+    return flow.state
+
+
+def load_previous_state(output_dir: str = "output") -> TripPlanningState:
+    """Rebuild the state of the last run from the files written by save_trip_plan"""
+    with open(os.path.join(output_dir, "trip_details.json")) as f:
+        trip_details = TripDetails(**json.load(f))
+
+    attractions_result = None
+    attractions_path = os.path.join(output_dir, "attractions.json")
+    if os.path.exists(attractions_path):
+        with open(attractions_path) as f:
+            attractions_result = AttractionsSearchResult(**json.load(f))
+
+    user_query = ""
+    query_path = os.path.join(output_dir, "user_query.txt")
+    if os.path.exists(query_path):
+        with open(query_path) as f:
+            user_query = f.read()
+
+    final_trip_plan = ""
+    plan_path = os.path.join(output_dir, "complete_trip_plan.md")
+    if os.path.exists(plan_path):
+        with open(plan_path) as f:
+            plan_content = f.read()
+        # save_trip_plan wraps the itinerary in a title and trip details section
+        _, _, final_trip_plan = plan_content.partition("## Your Itinerary\n\n")
+
+    return TripPlanningState(
+        user_query=user_query,
+        trip_details=trip_details,
+        attractions_result=attractions_result,
+        final_trip_plan=final_trip_plan,
+    )
+
+
+def replan():
+    """Re-plan the last saved trip with field edits given as key=value arguments"""
+    delta: Dict[str, Any] = {}
+    for argument in sys.argv[1:]:
+        field, separator, value = argument.partition("=")
+        if not separator:
+            raise SystemExit(f"Expected key=value, got: {argument}")
+        if field == "interests":
+            delta[field] = [item.strip() for item in value.split(",") if item.strip()]
+        elif field == "group_size":
+            delta[field] = int(value) if value else None
+        else:
+            delta[field] = value or None
+
+    replan_trip(load_previous_state(), delta)
+    print("\n=== Re-planning Complete ===")
+
+
+if __name__ == "__main__":
+    replan()
@@ -0,0 +1,554 @@
+import math
+import os
+import re
+import threading
+import unicodedata
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import yaml
+
+from travel_flow.models import Attraction, DaySkeleton, ScheduledVisit, TripSkeleton
+
+DEFAULT_GAZETTEER_PATH = Path(__file__).parent / "config" / "gazetteer.yaml"
+
+# Day window in minutes after midnight
+DAY_START = 9 * 60
+DAY_END = 20 * 60
+
+# Lunch is taken before the first visit that starts after LUNCH_AFTER, or earlier (from
+# LUNCH_EARLIEST) if the next visit would otherwise keep going past LUNCH_LATEST
+LUNCH_EARLIEST = 12 * 60
+LUNCH_AFTER = 12 * 60 + 30
+LUNCH_LATEST = 14 * 60
+LUNCH_MINUTES = 60
+
+# Visit length used when an attraction doesn't say how long it takes
+DEFAULT_VISIT_MINUTES = 90
+
+# Sightseeing per day aimed for when deciding how many days the attractions need; trips with
+# more days than that get free days in between
+TARGET_DAY_MINUTES = 6 * 60
+MAX_VISITS_PER_DAY = 5
+
+# Travel time model: walk short hops, take transit for anything longer
+WALK_MAX_KM = 1.5
+WALK_KMH = 4.5
+TRANSIT_KMH = 20.0
+TRANSIT_OVERHEAD_MINUTES = 10
+# Travel time assumed to and from an attraction without coordinates
+UNKNOWN_TRAVEL_MINUTES = 20
+# Average travel per visit used to estimate how full a day is before it is routed
+ESTIMATED_TRAVEL_MINUTES = 15
+
+KMEANS_ITERATIONS = 20
+IMPROVEMENT_PASSES = 10
+
+# Minimum share of name words two names have in common to be taken as the same place
+NAME_MATCH_THRESHOLD = 0.5
+NAME_STOPWORDS = {"the", "of", "and", "de", "la", "le", "di", "del", "st", "saint"}
+
+# Words that may follow a destination's name without naming another place ("New York City")
+PLACE_SUFFIXES = {"city"}
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%B %d, %Y", "%b %d, %Y", "%d %B %Y", "%d %b %Y", "%B %d %Y", "%b %d %Y"]
+
+_TIME = r"(\d{1,2})(?:[:.h](\d{2}))?\s*([ap]\.?m\.?)?"
+TIME_RANGE = re.compile(_TIME + r"\s*(?:-|–|—|to|until)\s*" + _TIME, re.IGNORECASE)
+CLOSED_DAYS = re.compile(r"closed\s+(?:on\s+)?((?:(?:mon|tue|wed|thu|fri|sat|sun)[a-z]*[\s,&]*(?:and\s+)?)+)", re.IGNORECASE)
+COORDINATES = re.compile(r"(-?\d{1,2}\.\d+)\s*,\s*(-?\d{1,3}\.\d+)")
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)\s*(?:(?:-|–|to)\s*(\d+(?:\.\d+)?)\s*)?(hours?|hrs?|h\b|minutes?|mins?)", re.IGNORECASE)
+
+
+class OpeningHours(NamedTuple):
+    open: int
+    close: int
+    closed_weekdays: frozenset
+
+
+ALWAYS_OPEN = OpeningHours(0, 24 * 60, frozenset())
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase ASCII words of a place name, so "Sacré-Cœur" and "sacre coeur" compare equal"""
+    text = unicodedata.normalize("NFKD", text.replace("œ", "oe").replace("Œ", "Oe"))
+    text = text.encode("ascii", "ignore").decode("ascii").lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+def _name_words(text: str) -> Set[str]:
+    return set(normalize_name(text).split()) - NAME_STOPWORDS
+
+
+def split_destination(destination: str) -> Tuple[str, List[str]]:
+    """A destination's place name and the regions qualifying it: "Paris, France" -> ("paris", ["france"])"""
+    parts = [normalize_name(part) for part in destination.split(",")]
+    return parts[0], [part for part in parts[1:] if part]
+
+
+def _clock_minutes(hour: str, minute: Optional[str], suffix: Optional[str]) -> int:
+    hours = int(hour) % 24
+    if suffix:
+        hours = hours % 12 + (12 if suffix.lower().startswith("p") else 0)
+    return hours * 60 + int(minute or 0)
+
+
+def parse_opening_hours(text: Optional[str]) -> OpeningHours:
+    """Read the first opening time range and any closing days from free-text opening hours
+
+    Anything that can't be read leaves the attraction open all day, so only the day window applies.
+    """
+    if not text:
+        return ALWAYS_OPEN
+    lower = text.lower()
+
+    closed = frozenset(
+        WEEKDAYS.index(day[:3])
+        for match in CLOSED_DAYS.finditer(lower)
+        for day in re.findall(r"(mon|tue|wed|thu|fri|sat|sun)", match.group(1))
+    )
+    if any(marker in lower for marker in ("24 hours", "24/7", "always open", "open all day")):
+        return OpeningHours(0, 24 * 60, closed)
+
+    match = TIME_RANGE.search(text)
+    if not match:
+        return OpeningHours(0, 24 * 60, closed)
+
+    open_hour, open_minute, open_suffix, close_hour, close_minute, close_suffix = match.groups()
+    close = _clock_minutes(close_hour, close_minute, close_suffix)
+    opens = _clock_minutes(open_hour, open_minute, open_suffix)
+    if not open_suffix and close_suffix:
+        # "9-5pm": the suffix belongs to the opening time only if that keeps it before closing
+        with_suffix = _clock_minutes(open_hour, open_minute, close_suffix)
+        opens = with_suffix if with_suffix < close else _clock_minutes(open_hour, open_minute, "am")
+    if close <= opens:
+        # "9-5" means 17:00, and "18:00-02:00" closes after midnight
+        close = close + 12 * 60 if not close_suffix and close + 12 * 60 > opens else 24 * 60
+    return OpeningHours(opens, min(close, 24 * 60), closed)
+
+
+def parse_visit_minutes(text: Optional[str]) -> int:
+    """Convert a free-text visit time ("2 hours", "1-2 hrs", "45 minutes", "half day") into minutes"""
+    if not text:
+        return DEFAULT_VISIT_MINUTES
+    lower = text.lower()
+    if "full day" in lower or "whole day" in lower or "all day" in lower:
+        return 7 * 60
+    if "half day" in lower or "half a day" in lower:
+        return 4 * 60
+
+    total = 0.0
+    for low, high, unit in DURATION_PART.findall(lower):
+        amount = (float(low) + float(high)) / 2 if high else float(low)
+        total += amount * (60 if unit.startswith("h") else 1)
+    return int(min(max(total, 15), 8 * 60)) if total else DEFAULT_VISIT_MINUTES
+
+
+def parse_start_date(text: Optional[str]) -> Optional[date]:
+    """Read a trip start date, or None when it isn't a specific date ("next month", "June")"""
+    if not text:
+        return None
+    cleaned = re.sub(r"(\d)(st|nd|rd|th)\b", r"\1", text.strip())
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(cleaned, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+class Gazetteer:
+    """Offline place name to coordinates lookup, grouped by destination
+
+    Destinations are keyed by their place name, optionally followed by the regions and countries
+    they are in ("paris, ile de france, france"), which tell them apart from places of the same
+    name elsewhere.
+    """
+
+    def __init__(self, places: Optional[Dict[str, Dict[str, Sequence[float]]]] = None):
+        self.places: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        self.regions: Dict[str, Set[str]] = {}
+        for destination, entries in (places or {}).items():
+            self.add(destination, entries)
+
+    def add(self, destination: str, entries: Dict[str, Sequence[float]]):
+        place, regions = split_destination(destination)
+        self.regions.setdefault(place, set()).update(regions)
+        target = self.places.setdefault(place, {})
+        for name, (lat, lon) in entries.items():
+            target[name] = (float(lat), float(lon))
+
+    def merge(self, other: "Gazetteer"):
+        """Add the destinations and places of another gazetteer"""
+        for place, entries in other.places.items():
+            self.regions.setdefault(place, set()).update(other.regions.get(place, set()))
+            self.places.setdefault(place, {}).update(entries)
+
+    def destination_places(self, destination: str) -> Optional[Dict[str, Tuple[float, float]]]:
+        """Places of the gazetteer destination a trip's destination names, or None if there is none
+
+        The place name has to match on whole words, and anything else the destination says
+        ("Paris, France", "Rome Italy") has to be one of the regions listed for it, so "Paris,
+        Texas" or "Rome, Georgia" don't get the European cities' places.
+        """
+        place, regions = split_destination(destination)
+        for key, entries in self.places.items():
+            if not key or not (place == key or place.startswith(key + " ")):
+                continue
+            known = self.regions.get(key, set())
+            rest = place[len(key):].strip()
+            if rest and rest not in known | PLACE_SUFFIXES:
+                continue
+            if all(region in known for region in regions):
+                return entries
+        return None
+
+    @classmethod
+    def from_file(cls, path: str) -> "Gazetteer":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(yaml.safe_load(f) or {})
+
+    def lookup(self, name: str, destination: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        """Coordinates of a place, matching its name exactly or by most words in common
+
+        With a destination only its own places are searched: generic names like "Central Park"
+        or "Art Museum" exist in many cities, so a destination missing from the gazetteer leaves
+        its attractions unplaced rather than placing them in another city.
+        """
+        if destination:
+            entries = self.destination_places(destination)
+            if entries is None:
+                return None
+            groups = [entries]
+        else:
+            groups = list(self.places.values())
+
+        wanted = normalize_name(name)
+        wanted_words = _name_words(name)
+        best, best_score = None, 0.0
+        for entries in groups:
+            for place, coordinates in entries.items():
+                if normalize_name(place) == wanted:
+                    return coordinates
+                place_words = _name_words(place)
+                if not wanted_words or not place_words:
+                    continue
+                score = len(wanted_words & place_words) / len(wanted_words | place_words)
+                if score > best_score:
+                    best, best_score = coordinates, score
+        return best if best_score >= NAME_MATCH_THRESHOLD else None
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Return the process-wide gazetteer: the bundled places plus those in TRAVEL_FLOW_GAZETTEER"""
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            _gazetteer = Gazetteer.from_file(str(DEFAULT_GAZETTEER_PATH))
+            extra_path = os.getenv("TRAVEL_FLOW_GAZETTEER")
+            if extra_path:
+                _gazetteer.merge(Gazetteer.from_file(extra_path))
+        return _gazetteer
+
+
+class _Stop:
+    """An attraction prepared for scheduling"""
+
+    def __init__(self, attraction: Attraction, coordinates: Optional[Tuple[float, float]]):
+        self.attraction = attraction
+        self.name = attraction.name
+        self.coordinates = coordinates
+        self.hours = parse_opening_hours(attraction.opening_hours)
+        self.minutes = parse_visit_minutes(attraction.estimated_visit_time)
+
+
+class _DayPlan(NamedTuple):
+    visits: List[Tuple[_Stop, int, int, Optional[int]]]
+    lunch: int
+    travel: int
+    finish: int
+
+
+def _distance_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+def travel_minutes(a: Optional[Tuple[float, float]], b: Optional[Tuple[float, float]]) -> int:
+    """Estimated door-to-door travel time between two places"""
+    if a is None or b is None:
+        return UNKNOWN_TRAVEL_MINUTES
+    km = _distance_km(a, b)
+    if km <= WALK_MAX_KM:
+        return round(km / WALK_KMH * 60)
+    return round(TRANSIT_OVERHEAD_MINUTES + km / TRANSIT_KMH * 60)
+
+
+def _simulate(route: Sequence[_Stop], weekday: Optional[int]) -> Optional[_DayPlan]:
+    """Lay out a day's visits in order, or return None if one misses its opening hours"""
+    clock = DAY_START
+    lunch: Optional[int] = None
+    total_travel = 0
+    visits = []
+    previous: Optional[_Stop] = None
+    for stop in route:
+        if weekday is not None and weekday in stop.hours.closed_weekdays:
+            return None
+        travel = travel_minutes(previous.coordinates, stop.coordinates) if previous else None
+        clock += travel or 0
+        total_travel += travel or 0
+        if lunch is None and previous is not None and (
+            clock >= LUNCH_AFTER or (clock >= LUNCH_EARLIEST and max(clock, stop.hours.open) + stop.minutes > LUNCH_LATEST)
+        ):
+            lunch = clock
+            clock += LUNCH_MINUTES
+        start = max(clock, stop.hours.open)
+        end = start + stop.minutes
+        if end > min(stop.hours.close, DAY_END):
+            return None
+        visits.append((stop, start, end, travel))
+        clock = end
+        previous = stop
+    return _DayPlan(visits, lunch if lunch is not None else max(clock, LUNCH_AFTER), total_travel, clock)
+
+
+def _improve(route: List[_Stop], weekday: Optional[int]) -> List[_Stop]:
+    """2-opt and relocate moves that finish the day earlier while keeping every visit in its opening hours"""
+    best = _simulate(route, weekday).finish
+    for _ in range(IMPROVEMENT_PASSES):
+        improved = False
+        for i in range(len(route) - 1):
+            for j in range(i + 1, len(route)):
+                candidates = [route[:i] + route[i:j + 1][::-1] + route[j + 1:]]
+                moved = route[:i] + route[i + 1:]
+                candidates += [moved[:k] + [route[i]] + moved[k:] for k in range(len(moved) + 1) if k != i]
+                for candidate in candidates:
+                    plan = _simulate(candidate, weekday)
+                    if plan is not None and plan.finish < best:
+                        route, best, improved = candidate, plan.finish, True
+        if not improved:
+            break
+    return route
+
+
+def _insert(route: List[_Stop], stop: _Stop, weekday: Optional[int]) -> Optional[List[_Stop]]:
+    """Cheapest position to add a stop to a route, or None if it fits nowhere"""
+    best_route, best_finish = None, None
+    for position in range(len(route) + 1):
+        candidate = route[:position] + [stop] + route[position:]
+        plan = _simulate(candidate, weekday)
+        if plan is not None and (best_finish is None or plan.finish < best_finish):
+            best_route, best_finish = candidate, plan.finish
+    return best_route
+
+
+def _route_day(stops: List[_Stop], weekday: Optional[int]) -> Tuple[List[_Stop], List[_Stop]]:
+    """Order a day's stops, returning the route and the stops that didn't fit"""
+    # Insert the most constrained stops first: short opening windows, then long visits
+    ordered = sorted(stops, key=lambda stop: (stop.hours.close - stop.hours.open, -stop.minutes, stop.name))
+    route: List[_Stop] = []
+    overflow: List[_Stop] = []
+    for stop in ordered:
+        extended = _insert(route, stop, weekday) if len(route) < MAX_VISITS_PER_DAY else None
+        if extended is None:
+            overflow.append(stop)
+        else:
+            route = extended
+    return (_improve(route, weekday) if len(route) > 2 else route), overflow
+
+
+def _cluster(stops: List[_Stop], k: int) -> List[List[_Stop]]:
+    """Group located stops into k nearby groups of balanced size (k-means, then capacity moves)"""
+    if len(stops) <= k:
+        return [[stop] for stop in stops] + [[] for _ in range(k - len(stops))]
+
+    # Equirectangular projection: accurate enough within a city
+    mean_lat = sum(stop.coordinates[0] for stop in stops) / len(stops)
+    scale = math.cos(math.radians(mean_lat))
+    points = {id(stop): (stop.coordinates[0], stop.coordinates[1] * scale) for stop in stops}
+
+    def distance(point, center):
+        return math.hypot(point[0] - center[0], point[1] - center[1])
+
+    centroid = (sum(p[0] for p in points.values()) / len(stops), sum(p[1] for p in points.values()) / len(stops))
+    ordered = sorted(stops, key=lambda stop: stop.name)
+    centers = [points[id(min(ordered, key=lambda stop: distance(points[id(stop)], centroid)))]]
+    while len(centers) < k:
+        farthest = max(ordered, key=lambda stop: min(distance(points[id(stop)], center) for center in centers))
+        centers.append(points[id(farthest)])
+
+    assignment: Dict[int, int] = {}
+    for _ in range(KMEANS_ITERATIONS):
+        new_assignment = {
+            id(stop): min(range(k), key=lambda index: distance(points[id(stop)], centers[index]))
+            for stop in ordered
+        }
+        if new_assignment == assignment:
+            break
+        assignment = new_assignment
+        for index in range(k):
+            members = [points[id(stop)] for stop in ordered if assignment[id(stop)] == index]
+            if members:
+                centers[index] = (sum(p[0] for p in members) / len(members), sum(p[1] for p in members) / len(members))
+
+    clusters = [[stop for stop in ordered if assignment[id(stop)] == index] for index in range(k)]
+
+    def load(cluster):
+        return sum(stop.minutes + ESTIMATED_TRAVEL_MINUTES for stop in cluster)
+
+    def over(cluster):
+        return len(cluster) > MAX_VISITS_PER_DAY or (len(cluster) > 1 and load(cluster) > TARGET_DAY_MINUTES * 1.25)
+
+    # Move stops out of overfull groups to the nearest group with room, cheapest move first
+    for _ in range(len(stops) * k):
+        moves = [
+            (distance(points[id(stop)], centers[target]) - distance(points[id(stop)], centers[source]), source, target, stop)
+            for source, cluster in enumerate(clusters) if over(cluster)
+            for stop in cluster
+            for target in range(k)
+            if target != source and not over(clusters[target] + [stop])
+        ]
+        if not moves:
+            break
+        _, source, target, stop = min(moves, key=lambda move: (move[0], move[3].name))
+        clusters[source].remove(stop)
+        clusters[target].append(stop)
+    return clusters
+
+
+def _order_clusters(clusters: List[List[_Stop]]) -> List[List[_Stop]]:
+    """Visit neighbouring areas on consecutive days, starting from the most central one"""
+    located = [cluster for cluster in clusters if any(stop.coordinates for stop in cluster)]
+    rest = [cluster for cluster in clusters if cluster not in located]
+    if not located:
+        return clusters
+
+    def center(cluster):
+        points = [stop.coordinates for stop in cluster if stop.coordinates]
+        return (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+
+    overall = center([stop for cluster in located for stop in cluster])
+    ordered = [min(located, key=lambda cluster: _distance_km(center(cluster), overall))]
+    remaining = [cluster for cluster in located if cluster is not ordered[0]]
+    while remaining:
+        following = min(remaining, key=lambda cluster: _distance_km(center(cluster), center(ordered[-1])))
+        ordered.append(following)
+        remaining = [cluster for cluster in remaining if cluster is not following]
+    return ordered + rest
+
+
+def _format_clock(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def schedule_trip(
+    attractions: List[Attraction],
+    days: int,
+    destination: Optional[str] = None,
+    start_date: Optional[date] = None,
+    gazetteer: Optional[Gazetteer] = None,
+) -> TripSkeleton:
+    """Assign attractions to days and order each day, deterministically
+
+    Attractions are clustered by proximity into as many sightseeing days as they need (the rest
+    of a long trip is left free), each day is routed with an insertion heuristic improved by
+    2-opt and relocate moves, and every visit is kept within its opening hours. Attractions that
+    don't fit their day move to the day with the most room; those that fit nowhere are listed
+    as unscheduled.
+    """
+    gazetteer = gazetteer or get_gazetteer()
+    days = max(days, 1)
+
+    stops = []
+    for attraction in attractions:
+        match = COORDINATES.search(attraction.location or "")
+        coordinates = (float(match.group(1)), float(match.group(2))) if match else None
+        stops.append(_Stop(attraction, coordinates or gazetteer.lookup(attraction.name, destination)))
+    located = [stop for stop in stops if stop.coordinates]
+    unlocated = [stop for stop in stops if not stop.coordinates]
+
+    # Sightseeing days needed, spread evenly over the trip
+    total_minutes = sum(stop.minutes + ESTIMATED_TRAVEL_MINUTES for stop in stops)
+    active_days = min(days, max(1, math.ceil(total_minutes / TARGET_DAY_MINUTES), math.ceil(len(stops) / MAX_VISITS_PER_DAY)))
+    clusters = _order_clusters(_cluster(located, active_days)) if located else [[] for _ in range(active_days)]
+    for stop in sorted(unlocated, key=lambda stop: (-stop.minutes, stop.name)):
+        min(clusters, key=lambda cluster: sum(s.minutes for s in cluster)).append(stop)
+
+    assigned: List[List[_Stop]] = [[] for _ in range(days)]
+    for index, cluster in enumerate(clusters):
+        assigned[index * days // active_days] = cluster
+
+    weekdays = [(start_date + timedelta(days=day)).weekday() if start_date else None for day in range(days)]
+    routes: List[List[_Stop]] = []
+    overflow: List[_Stop] = []
+    for day, stops_of_day in enumerate(assigned):
+        route, left_over = _route_day(stops_of_day, weekdays[day])
+        routes.append(route)
+        overflow.extend(left_over)
+
+    unscheduled = []
+    for stop in overflow:
+        # Try the emptiest days first, so free days of a long trip take the overflow
+        for day in sorted(range(days), key=lambda day: (len(routes[day]), day)):
+            if len(routes[day]) >= MAX_VISITS_PER_DAY:
+                continue
+            extended = _insert(routes[day], stop, weekdays[day])
+            if extended is not None:
+                routes[day] = extended
+                break
+        else:
+            unscheduled.append(stop.name)
+
+    skeleton_days = []
+    for day, route in enumerate(routes):
+        plan = _simulate(route, weekdays[day]) if route else None
+        skeleton_days.append(DaySkeleton(
+            day=day + 1,
+            date=(start_date + timedelta(days=day)).isoformat() if start_date else None,
+            visits=[
+                ScheduledVisit(
+                    name=stop.name,
+                    location=stop.attraction.location,
+                    start=_format_clock(start),
+                    end=_format_clock(end),
+                    travel_minutes=travel,
+                    opening_hours=stop.attraction.opening_hours,
+                )
+                for stop, start, end, travel in plan.visits
+            ] if plan else [],
+            lunch=_format_clock(plan.lunch) if plan and len(plan.visits) > 1 else None,
+            travel_minutes=plan.travel if plan else 0,
+        ))
+
+    return TripSkeleton(days=skeleton_days, unscheduled=unscheduled, unlocated=[stop.name for stop in unlocated])
+
+
+def skeleton_markdown(skeleton: TripSkeleton) -> str:
+    """Compact text form of a skeleton for the planning prompt"""
+    lines = []
+    for day in skeleton.days:
+        heading = f"Day {day.day}" + (f" ({day.date})" if day.date else "")
+        if not day.visits:
+            lines.append(f"{heading}: free day")
+            continue
+        lines.append(f"{heading}:")
+        lunch_listed = not day.lunch
+        for visit in day.visits:
+            if not lunch_listed and visit.start > day.lunch:
+                lines.append(f"- {day.lunch} lunch")
+                lunch_listed = True
+            travel = f" [{visit.travel_minutes} min travel]" if visit.travel_minutes else ""
+            lines.append(f"- {visit.start}-{visit.end} {visit.name}{travel}")
+        if not lunch_listed:
+            lines.append(f"- {day.lunch} lunch")
+    if skeleton.unscheduled:
+        lines.append(f"Did not fit: {', '.join(skeleton.unscheduled)}")
+    return "\n".join(lines)
@@ -0,0 +1,286 @@
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from travel_flow.cache import DEFAULT_CACHE_TTL, register_cache
+
+# Size of the hashed feature vectors
+VECTOR_DIM = 1024
+
+# Cosine similarity from which a cached query is served for a new one, overridden by
+# TRAVEL_FLOW_SEMANTIC_CACHE_THRESHOLD
+DEFAULT_SIMILARITY_THRESHOLD = 0.75
+
+# Every Nth near-duplicate hit is checked against a real request to measure precision,
+# overridden by TRAVEL_FLOW_SEMANTIC_CACHE_VERIFY_EVERY (0 turns the checks off)
+DEFAULT_VERIFY_EVERY = 20
+
+# Share of result URLs a verified hit must have in common with the real response to count as
+# correct, out of the shorter of the two result lists
+VERIFY_OVERLAP = 0.5
+
+# Phrasings that mean the same thing in a search query, rewritten before vectorizing
+SYNONYMS = [
+    (r"\bthings to (?:do|see)\b", "attractions"),
+    (r"\bplaces to (?:visit|see|go)\b", "attractions"),
+    (r"\bmust[- ]see\b", "top"),
+    (r"\b(?:sights|sightseeing|landmarks|highlights)\b", "attractions"),
+    (r"\b(?:best|popular|famous|greatest)\b", "top"),
+    (r"\b(?:mid[- ]range|mid|moderate|average|standard)\b", "medium"),
+    (r"\b(?:cheap|affordable|budget[- ]friendly|backpacker|shoestring|inexpensive)\b", "low"),
+    (r"\b(?:luxury|upscale|premium|lavish|high[- ]end)\b", "high"),
+    # A number of nights is a trip length in days; "night" on its own is a kind of outing
+    (r"\b(\d+)[- ]?nights?\b", r"\1 day"),
+    (r"\b(\d+)[- ]?(day|week|month)s?\b", r"\1 \2"),
+    (r"\bactivities\b", "activity"),
+    (r"\b(museum|park|market|restaurant|cafe|beach|temple|church|tour|experience)s\b", r"\1"),
+]
+
+# Words that only shape a travel query; any other word (a place, a number, a budget level, a
+# kind of attraction) has to match exactly for two queries to be near-duplicates, so "Paris" is
+# never served for "Rome", nor "medium budget" for "high budget", nor "5 days" for "5 weeks"
+QUERY_WORDS = frozenset("""
+    a an the in of for to and or with at on near around from by during my our your this that is are
+    top attractions attraction visit visiting guide tips trip travel itinerary recommended
+    day week month days weeks months weekend time what where which how do see go
+    budget price prices cost costs things places spots city town area local
+""".split())
+
+STOPWORDS = frozenset("a an the in of for to and or with at on my our your this that".split())
+
+
+def normalize_query(query: str) -> str:
+    text = query.lower()
+    for pattern, replacement in SYNONYMS:
+        text = re.sub(pattern, replacement, text)
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+# Units a number is kept together with, so "5 day" and "5 week" are different entities
+DURATION_UNITS = frozenset("day week month".split())
+
+
+def query_entities(query: str) -> FrozenSet[str]:
+    """Words of a normalized query that must match exactly: places, names and numbers with their unit"""
+    words = query.split()
+    entities = set()
+    for index, word in enumerate(words):
+        following = words[index + 1] if index + 1 < len(words) else None
+        if word.isdigit() and following in DURATION_UNITS:
+            entities.add(f"{word} {following}")
+        elif word not in QUERY_WORDS and not (word in DURATION_UNITS and index and words[index - 1].isdigit()):
+            entities.add(word)
+    return frozenset(entities)
+
+
+def _bucket(feature: str) -> Tuple[int, float]:
+    # crc32 rather than hash(): it's the same in every process, so vectors can be compared across runs
+    value = zlib.crc32(feature.encode("utf-8"))
+    return value % VECTOR_DIM, 1.0 if value & 0x80000000 else -1.0
+
+
+def vectorize(queries: Sequence[str]) -> np.ndarray:
+    """Embed normalized queries as L2-normalized hashed word and character n-gram vectors"""
+    vectors = np.zeros((len(queries), VECTOR_DIM), dtype=np.float32)
+    for row, query in enumerate(queries):
+        words = [word for word in query.split() if word not in STOPWORDS]
+        features = [(f"w:{word}", 1.0) for word in words]
+        features += [(f"b:{first} {second}", 0.5) for first, second in zip(words, words[1:])]
+        features += [(f"c:{word[i:i + 3]}", 0.25) for word in words for i in range(max(len(word) - 2, 1))]
+        for feature, weight in features:
+            index, sign = _bucket(feature)
+            vectors[row, index] += sign * weight
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class SemanticHit(NamedTuple):
+    """A cached value found for a query"""
+    value: Any
+    similarity: float
+    exact: bool
+
+
+class SemanticCache:
+    """Cache that also serves entries stored under a near-duplicate query
+
+    Queries are embedded with a hashed n-gram vectorizer into rows of a matrix backed by a
+    memory-mapped file, and looked up with one matrix product for a whole batch of queries. A
+    stored query is served when its cosine similarity reaches the threshold and it names the same
+    places and numbers. Entries expire after a time to live; when the matrix is full the least
+    recently used entry is replaced.
+
+    Precision is measured by checking every Nth near-duplicate hit against the real response
+    (see should_verify and
+    record_verification); stats() reports it next to the hit rate.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 4096,
+        threshold: Optional[float] = None,
+        ttl: Optional[float] = None,
+        verify_every: Optional[int] = None,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.threshold = threshold if threshold is not None else float(
+            os.getenv("TRAVEL_FLOW_SEMANTIC_CACHE_THRESHOLD", DEFAULT_SIMILARITY_THRESHOLD)
+        )
+        self.ttl = ttl if ttl is not None else float(os.getenv("TRAVEL_FLOW_CACHE_TTL", DEFAULT_CACHE_TTL))
+        self.verify_every = verify_every if verify_every is not None else int(
+            os.getenv("TRAVEL_FLOW_SEMANTIC_CACHE_VERIFY_EVERY", DEFAULT_VERIFY_EVERY)
+        )
+
+        # Backed by an unlinked temporary file: the matrix lives in the page cache, not on the heap
+        self._file = tempfile.TemporaryFile(prefix=f"travel_flow_{name}_")
+        self._vectors = np.memmap(self._file, dtype=np.float32, mode="w+", shape=(max_entries, VECTOR_DIM))
+        self._queries: List[Optional[str]] = [None] * max_entries
+        self._entities: List[FrozenSet[str]] = [frozenset()] * max_entries
+        self._values: List[Any] = [None] * max_entries
+        self._expires_at = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._slots: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.verified = 0
+        self.verified_correct = 0
+
+    def get(self, query: str) -> Optional[Any]:
+        hit = self.lookup(query)
+        return hit.value if hit else None
+
+    def lookup(self, query: str) -> Optional[SemanticHit]:
+        return self.lookup_many([query])[0]
+
+    def lookup_many(self, queries: Sequence[str]) -> List[Optional[SemanticHit]]:
+        """Look up a batch of queries with one matrix product, returning a hit or None for each"""
+        normalized = [normalize_query(query) for query in queries]
+        vectors = vectorize(normalized)
+        now = time.monotonic()
+        results: List[Optional[SemanticHit]] = []
+        with self._lock:
+            live = self._expires_at > now
+            similarities = vectors @ self._vectors.T
+            similarities[:, ~live] = -1.0
+            for row, query in enumerate(normalized):
+                slot = self._slots.get(query)
+                if slot is not None and live[slot]:
+                    self._last_used[slot] = now
+                    self.hits += 1
+                    results.append(SemanticHit(self._values[slot], 1.0, True))
+                    continue
+
+                entities = query_entities(query)
+                candidates = np.flatnonzero(similarities[row] >= self.threshold)
+                match = None
+                for slot in candidates[np.argsort(-similarities[row, candidates])]:
+                    if self._entities[slot] == entities:
+                        match = int(slot)
+                        break
+                if match is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self._last_used[match] = now
+                self.hits += 1
+                self.near_hits += 1
+                results.append(SemanticHit(self._values[match], float(similarities[row, match]), False))
+        return results
+
+    def set(self, query: str, value: Any, ttl: Optional[float] = None):
+        normalized = normalize_query(query)
+        now = time.monotonic()
+        with self._lock:
+            slot = self._slots.get(normalized)
+            if slot is None:
+                slot = self._free_slot(now)
+                self._slots[normalized] = slot
+            self._vectors[slot] = vectorize([normalized])[0]
+            self._queries[slot] = normalized
+            self._entities[slot] = query_entities(normalized)
+            self._values[slot] = value
+            self._expires_at[slot] = now + (ttl if ttl is not None else self.ttl)
+            self._last_used[slot] = now
+
+    def _free_slot(self, now: float) -> int:
+        """An empty or expired slot, or else the least recently used one"""
+        expired = np.flatnonzero(self._expires_at <= now)
+        if len(expired):
+            slot = int(expired[0])
+        else:
+            slot = int(np.argmin(self._last_used))
+            self.evictions += 1
+        previous = self._queries[slot]
+        if previous is not None:
+            del self._slots[previous]
+            self._queries[slot] = None
+            self._values[slot] = None
+        return slot
+
+    def should_verify(self, hit: SemanticHit) -> bool:
+        """Whether a hit, just returned by lookup, should be checked against a real request"""
+        with self._lock:
+            return not hit.exact and self.verify_every > 0 and (self.near_hits - 1) % self.verify_every == 0
+
+    def record_verification(self, correct: bool):
+        with self._lock:
+            self.verified += 1
+            self.verified_correct += int(correct)
+
+    def clear(self):
+        with self._lock:
+            self._expires_at[:] = 0
+            self._slots.clear()
+            self._queries = [None] * self.max_entries
+            self._values = [None] * self.max_entries
+
+    def __len__(self) -> int:
+        return int((self._expires_at > time.monotonic()).sum())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": int((self._expires_at > time.monotonic()).sum()),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "verified": self.verified,
+                "precision": round(self.verified_correct / self.verified, 3) if self.verified else None,
+            }
+
+
+def same_results(cached: Dict[str, Any], fresh: Dict[str, Any]) -> bool:
+    """Whether a cached search response is a fair answer to the query a fresh response was made for"""
+    cached_urls = {result.get("url") for result in cached.get("results") or []}
+    fresh_urls = {result.get("url") for result in fresh.get("results") or []}
+    if not cached_urls or not fresh_urls:
+        return cached_urls == fresh_urls
+    return len(cached_urls & fresh_urls) / min(len(cached_urls), len(fresh_urls)) >= VERIFY_OVERLAP
+
+
+_semantic_caches: Dict[str, SemanticCache] = {}
+_semantic_caches_lock = threading.Lock()
+
+
+def get_semantic_cache(name: str, max_entries: int = 4096) -> SemanticCache:
+    """Return the process-wide semantic cache with the given name, creating it on first use"""
+    with _semantic_caches_lock:
+        if name not in _semantic_caches:
+            _semantic_caches[name] = SemanticCache(name, max_entries)
+            register_cache(_semantic_caches[name])
+        return _semantic_caches[name]
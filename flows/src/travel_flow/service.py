@@ -0,0 +1,578 @@
+#!/usr/bin/env python
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+from travel_flow.cache import cache_stats
+from travel_flow.deadline import Deadline, default_time_budget
+from travel_flow.main import TripPlanningFlow, TripPlanningState
+from travel_flow.model_routing import get_router
+from travel_flow.streaming import forward_answer_tokens
+from travel_flow.warming import DEFAULT_RUNS_PER_MINUTE, DEFAULT_TOP_N, CacheWarmer
+from travel_flow.worker_pool import DEFAULT_THREADS_PER_WORKER, WorkerPool
+
+# Flows run at the same time; each one occupies a worker thread for its whole run
+DEFAULT_MAX_CONCURRENT_RUNS = 4
+
+# Accepted runs waiting for a worker; further requests are turned away with 429
+DEFAULT_MAX_QUEUED_RUNS = 16
+
+# Finished runs kept in memory for status requests and event replays
+MAX_FINISHED_RUNS = 200
+
+# Events buffered per SSE client; a client that falls further behind is disconnected and can
+# resume from where it left off with Last-Event-ID
+SUBSCRIBER_BUFFER = 1000
+
+# Seconds between SSE keep-alive comments on an idle stream
+SSE_KEEPALIVE = 15
+
+# Seconds the running runs get to finish on shutdown, before they are failed
+DRAIN_TIMEOUT = 300
+
+MAX_QUERY_LENGTH = 2000
+
+TERMINAL_EVENTS = ("completed", "failed")
+
+
+class Subscriber:
+    """An SSE client following the events of a run"""
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_BUFFER)
+        self.lagging = False
+
+
+class Run:
+    """A trip planning request accepted by the service, and the events it has produced so far
+
+    Only touched from the event loop thread; flow threads hand their events over with
+    call_soon_threadsafe.
+    """
+
+    def __init__(self, run_id: str, query: str, time_budget: float, output_dir: str):
+        self.run_id = run_id
+        self.query = query
+        self.time_budget = time_budget
+        self.output_dir = output_dir
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.flow: Optional[TripPlanningFlow] = None
+        # Set when the service shuts down, so a flow that has not started its first step yet is cut short too
+        self.cancelled = False
+        self.state: Optional[TripPlanningState] = None
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self.subscribers: List[Subscriber] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_EVENTS
+
+    def publish(self, event: str, data: Dict[str, Any]) -> int:
+        """Record an event and push it to the subscribers, returning the number of lagging ones dropped"""
+        entry = {"id": len(self.events) + 1, "event": event, "data": data}
+        self.events.append(entry)
+
+        dropped = 0
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                subscriber.lagging = True
+                self.subscribers.remove(subscriber)
+                dropped += 1
+        return dropped
+
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "run_id": self.run_id,
+            "status": self.status,
+            "query": self.query,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "output_dir": self.output_dir,
+        }
+        if self.error:
+            result["error"] = self.error
+        if self.state is not None:
+            result["trip_details"] = self.state.trip_details.model_dump() if self.state.trip_details else None
+            result["attractions_found"] = len(self.state.attractions_result.attractions) if self.state.attractions_result else 0
+            result["degraded_steps"] = self.state.degraded_steps
+            result["final_trip_plan"] = self.state.final_trip_plan
+        return result
+
+
+class Metrics:
+    """Counters and timings exposed on /metrics in the Prometheus text format"""
+
+    def __init__(self):
+        self.runs_total: Dict[str, int] = defaultdict(int)
+        self.queue_wait = [0.0, 0]
+        self.run_duration = [0.0, 0]
+        self.step_duration: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])
+        self.steps_degraded: Dict[str, int] = defaultdict(int)
+        self.tokens_streamed = 0
+        self.sse_clients = 0
+        self.sse_lagging_disconnects = 0
+
+    @staticmethod
+    def observe(summary: List[float], value: float):
+        summary[0] += value
+        summary[1] += 1
+
+    def render(self, queued: int, running: int, workers: List[Dict[str, Any]]) -> str:
+        lines = [
+            "# TYPE travel_flow_runs_queued gauge",
+            f"travel_flow_runs_queued {queued}",
+            "# TYPE travel_flow_runs_running gauge",
+            f"travel_flow_runs_running {running}",
+            "# TYPE travel_flow_runs_total counter",
+        ]
+        lines += [f'travel_flow_runs_total{{status="{status}"}} {count}' for status, count in sorted(self.runs_total.items())]
+
+        for name, summary in (("queue_wait", self.queue_wait), ("run_duration", self.run_duration)):
+            lines += [
+                f"# TYPE travel_flow_{name}_seconds summary",
+                f"travel_flow_{name}_seconds_sum {summary[0]:.3f}",
+                f"travel_flow_{name}_seconds_count {summary[1]}",
+            ]
+
+        lines.append("# TYPE travel_flow_step_duration_seconds summary")
+        for step, summary in sorted(self.step_duration.items()):
+            lines.append(f'travel_flow_step_duration_seconds_sum{{step="{step}"}} {summary[0]:.3f}')
+            lines.append(f'travel_flow_step_duration_seconds_count{{step="{step}"}} {summary[1]}')
+        lines.append("# TYPE travel_flow_steps_degraded_total counter")
+        lines += [f'travel_flow_steps_degraded_total{{step="{step}"}} {count}' for step, count in sorted(self.steps_degraded.items())]
+
+        lines += [
+            "# TYPE travel_flow_tokens_streamed_total counter",
+            f"travel_flow_tokens_streamed_total {self.tokens_streamed}",
+            "# TYPE travel_flow_sse_clients gauge",
+            f"travel_flow_sse_clients {self.sse_clients}",
+            "# TYPE travel_flow_sse_lagging_disconnects_total counter",
+            f"travel_flow_sse_lagging_disconnects_total {self.sse_lagging_disconnects}",
+        ]
+
+        if workers:
+            lines.append("# TYPE travel_flow_worker_alive gauge")
+            lines += [f'travel_flow_worker_alive{{worker="{worker["worker"]}"}} {int(worker["alive"])}' for worker in workers]
+            lines.append("# TYPE travel_flow_worker_in_flight gauge")
+            lines += [f'travel_flow_worker_in_flight{{worker="{worker["worker"]}"}} {worker["in_flight"]}' for worker in workers]
+            lines.append("# TYPE travel_flow_worker_restarts_total counter")
+            lines += [f'travel_flow_worker_restarts_total{{worker="{worker["worker"]}"}} {worker["restarts"]}' for worker in workers]
+            caches = {str(worker["worker"]): worker["caches"] for worker in workers}
+        else:
+            caches = {"main": cache_stats()}
+
+        # Near-duplicate hits and measured precision only exist for semantic caches
+        cache_metrics = (
+            ("cache_hits_total", "hits", "counter"),
+            ("cache_misses_total", "misses", "counter"),
+            ("cache_entries", "entries", "gauge"),
+            ("cache_near_hits_total", "near_hits", "counter"),
+            ("cache_precision", "precision", "gauge"),
+        )
+        for metric, key, metric_type in cache_metrics:
+            lines.append(f"# TYPE travel_flow_{metric} {metric_type}")
+            lines += [
+                f'travel_flow_{metric}{{worker="{worker}",cache="{name}"}} {stats[key]}'
+                for worker, worker_caches in sorted(caches.items())
+                for name, stats in sorted(worker_caches.items())
+                if stats.get(key) is not None
+            ]
+
+        # Calls, fallbacks and estimated cost per model route, summed over this process and the workers
+        route_metrics = (("model_calls_total", "calls"), ("model_fallbacks_total", "fallbacks"), ("model_estimated_cost_usd_total", "estimated_cost_usd"))
+        routes: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(int))
+        for report in [get_router().report()] + [worker["routes"] for worker in workers]:
+            for route, stats in report.items():
+                for _, key in route_metrics:
+                    routes[route][key] += stats[key]
+        for metric, key in route_metrics:
+            lines.append(f"# TYPE travel_flow_{metric} counter")
+            lines += [f'travel_flow_{metric}{{route="{route}"}} {round(stats[key], 6)}' for route, stats in sorted(routes.items())]
+
+        return "\n".join(lines) + "\n"
+
+
+class PlannerService:
+    """Runs TripPlanningFlow instances for HTTP clients on a shared event loop and worker pool
+
+    Accepted runs wait in a bounded queue until one of the workers is free. When the queue is
+    full new runs are rejected with 429 so clients back off instead of piling up work. Flows run
+    in threads of this process, or with a WorkerPool in worker processes sharded by destination.
+    A CacheWarmer, if given, precomputes popular trips into the caches the runs use while no
+    runs are waiting or running.
+    """
+
+    def __init__(
+        self,
+        max_concurrent_runs: int = DEFAULT_MAX_CONCURRENT_RUNS,
+        max_queued_runs: int = DEFAULT_MAX_QUEUED_RUNS,
+        time_budget: Optional[float] = None,
+        output_root: str = os.path.join("output", "runs"),
+        pool: Optional[WorkerPool] = None,
+        warmer: Optional[CacheWarmer] = None,
+    ):
+        self.pool = pool
+        self.warmer = warmer
+        # With a pool the service keeps every worker thread of every process busy
+        self.max_concurrent_runs = pool.capacity if pool is not None else max_concurrent_runs
+        self.max_queued_runs = max_queued_runs
+        # Maximum seconds per run; clients may ask for less
+        self.time_budget = time_budget if time_budget is not None else default_time_budget()
+        self.output_root = output_root
+        self.runs: "OrderedDict[str, Run]" = OrderedDict()
+        self.metrics = Metrics()
+        self.accepting = False
+        self.running = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self, app: Optional[web.Application] = None):
+        self._queue = asyncio.Queue(maxsize=self.max_queued_runs)
+        if self.pool is not None:
+            self.pool.start()
+        else:
+            self._executor = ThreadPoolExecutor(self.max_concurrent_runs, thread_name_prefix="trip-flow")
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrent_runs)]
+        self.accepting = True
+        if self.warmer is not None:
+            # Warm the caches the runs read: the workers' caches with a pool, this process's otherwise
+            if self.pool is not None:
+                self.warmer.warm = lambda trip, ttl: self.pool.warm(trip, ttl).result()
+            self.warmer.is_busy = lambda: self.running > 0 or self.queued > 0
+            threading.Thread(target=self.warmer.run, daemon=True, name="cache-warmer").start()
+
+    async def stop(self, app: Optional[web.Application] = None):
+        """Stop taking runs, let the running ones finish, then end every stream with a terminal event
+
+        Queued runs are failed without starting. Running flows have their deadlines cancelled so
+        they finish with degraded results, and get DRAIN_TIMEOUT seconds to do so. Runs still
+        unfinished after that are failed, so no SSE client is left on a stream without a
+        completed or failed event.
+        """
+        self.accepting = False
+        if self.warmer is not None:
+            self.warmer.stop()
+        loop = asyncio.get_running_loop()
+        drain_until = loop.time() + DRAIN_TIMEOUT
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._fail(self._queue.get_nowait(), "Service shut down before the run started")
+                self._queue.task_done()
+        for run in self.runs.values():
+            if run.finished:
+                continue
+            run.cancelled = True
+            if run.flow is not None and run.flow.deadline is not None:
+                run.flow.deadline.cancel()
+
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                print(f"⚠️ {self.running} runs still in progress after {DRAIN_TIMEOUT}s, failing them")
+        if self.pool is not None:
+            # Let the worker processes finish the runs they hold, in what is left of the drain time
+            await loop.run_in_executor(None, self.pool.drain, max(drain_until - loop.time(), 0))
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+        for run in self.runs.values():
+            if not run.finished:
+                self._fail(run, "Service shut down before the run finished")
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, query: str, time_budget: Optional[float] = None) -> Run:
+        """Queue a run, raising asyncio.QueueFull when the service is at capacity"""
+        run_id = str(uuid.uuid4())
+        budget = min(time_budget, self.time_budget) if time_budget is not None else self.time_budget
+        run = Run(run_id, query, budget, os.path.join(self.output_root, run_id))
+
+        self._queue.put_nowait(run)
+        self.runs[run_id] = run
+        self.metrics.runs_total["accepted"] += 1
+        run.publish("queued", {"run_id": run_id, "position": self.queued})
+        self._prune()
+        return run
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait, from the average run duration"""
+        total, count = self.metrics.run_duration
+        average = total / count if count else 60.0
+        return max(1, int(average * (self.queued + 1) / self.max_concurrent_runs))
+
+    def _prune(self):
+        finished = [run_id for run_id, run in self.runs.items() if run.finished]
+        for run_id in finished[:max(0, len(finished) - MAX_FINISHED_RUNS)]:
+            del self.runs[run_id]
+
+    def _on_event(self, run: Run, event: str, data: Dict[str, Any]):
+        if event == "step_finished":
+            self.metrics.observe(self.metrics.step_duration[data["step"]], data["duration"])
+        elif event == "step_degraded":
+            self.metrics.steps_degraded[data["step"]] += 1
+        elif event == "token":
+            self.metrics.tokens_streamed += 1
+        self.metrics.sse_lagging_disconnects += run.publish(event, data)
+
+    async def _worker(self):
+        while True:
+            run = await self._queue.get()
+            try:
+                await self._execute(run)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, run: Run):
+        loop = asyncio.get_running_loop()
+        self.running += 1
+        run.status = "running"
+        run.started_at = time.time()
+        self.metrics.observe(self.metrics.queue_wait, run.started_at - run.created_at)
+        self._on_event(run, "started", {"run_id": run.run_id})
+
+        def publish(event: str, data: Dict[str, Any]):
+            loop.call_soon_threadsafe(self._on_event, run, event, data)
+
+        try:
+            if self.pool is not None:
+                future = self.pool.submit(run.query, run.run_id, run.output_dir, run.time_budget, on_event=publish)
+                run.state = TripPlanningState.model_validate(await asyncio.wrap_future(future))
+            else:
+                run.state = await loop.run_in_executor(self._executor, self._run_flow, run, publish)
+            run.status = "completed"
+            self.metrics.runs_total["completed"] += 1
+            self._on_event(run, "completed", {
+                "run_id": run.run_id,
+                "degraded_steps": run.state.degraded_steps,
+                "output_dir": run.output_dir,
+            })
+        except Exception as e:
+            self._fail(run, str(e))
+        finally:
+            run.finished_at = time.time()
+            self.metrics.observe(self.metrics.run_duration, run.finished_at - run.started_at)
+            self.running -= 1
+
+    def _fail(self, run: Run, error: str):
+        """Mark a run failed and send its terminal event"""
+        run.status = "failed"
+        run.error = error
+        run.finished_at = time.time()
+        self.metrics.runs_total["failed"] += 1
+        self._on_event(run, "failed", {"run_id": run.run_id, "error": error})
+
+    def _run_flow(self, run: Run, publish) -> TripPlanningState:
+        """Run the flow in a worker thread, forwarding its progress and the plan's answer tokens"""
+        run.flow = TripPlanningFlow(time_budget=run.time_budget, output_dir=run.output_dir, interactive=False, progress=publish)
+        # Service runs never wait for input, so the run deadline starts now rather than with the
+        # first step, and a shutdown that came in before this point still cancels it
+        run.flow.deadline = Deadline(run.time_budget)
+        if run.cancelled:
+            run.flow.deadline.cancel()
+        with forward_answer_tokens(publish):
+            run.flow.kickoff(inputs={"id": run.run_id, "user_query": run.query})
+        return run.flow.state
+
+    # HTTP handlers
+
+    async def create_trip(self, request: web.Request) -> web.Response:
+        if not self.accepting:
+            raise web.HTTPServiceUnavailable(reason="Service is shutting down")
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise web.HTTPBadRequest(reason="Request body must be JSON")
+
+        query = body.get("query") if isinstance(body, dict) else None
+        if not isinstance(query, str) or not query.strip():
+            raise web.HTTPBadRequest(reason="A non-empty 'query' is required")
+        if len(query) > MAX_QUERY_LENGTH:
+            raise web.HTTPRequestEntityTooLarge(max_size=MAX_QUERY_LENGTH, actual_size=len(query))
+        time_budget = body.get("time_budget")
+        if time_budget is not None and (not isinstance(time_budget, (int, float)) or time_budget <= 0):
+            raise web.HTTPBadRequest(reason="'time_budget' must be a positive number of seconds")
+
+        try:
+            run = self.submit(query.strip(), time_budget)
+        except asyncio.QueueFull:
+            self.metrics.runs_total["rejected"] += 1
+            return web.json_response(
+                {"error": "Too many trip plans in progress, try again later"},
+                status=429,
+                headers={"Retry-After": str(self.retry_after())},
+            )
+
+        return web.json_response(
+            {
+                "run_id": run.run_id,
+                "status": run.status,
+                "status_url": f"/trips/{run.run_id}",
+                "events_url": f"/trips/{run.run_id}/events",
+            },
+            status=202,
+            headers={"Location": f"/trips/{run.run_id}"},
+        )
+
+    def _get_run(self, request: web.Request) -> Run:
+        run = self.runs.get(request.match_info["run_id"])
+        if run is None:
+            raise web.HTTPNotFound(reason="Unknown run id")
+        return run
+
+    async def get_trip(self, request: web.Request) -> web.Response:
+        return web.json_response(self._get_run(request).to_dict())
+
+    async def trip_events(self, request: web.Request) -> web.StreamResponse:
+        """Stream a run's events over SSE, replaying the ones after Last-Event-ID first"""
+        run = self._get_run(request)
+        try:
+            last_event_id = int(request.headers.get("Last-Event-ID", "0"))
+        except ValueError:
+            last_event_id = 0
+
+        # Take the backlog and subscribe without yielding to the loop, so no event is missed
+        backlog = run.events[last_event_id:]
+        subscriber = None
+        if not run.finished:
+            subscriber = Subscriber()
+            run.subscribers.append(subscriber)
+
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+        self.metrics.sse_clients += 1
+        try:
+            await response.prepare(request)
+            for entry in backlog:
+                await response.write(_format_sse(entry))
+            if subscriber is None:
+                return response
+
+            while True:
+                if subscriber.lagging and subscriber.queue.empty():
+                    # Ends the stream; the client reconnects with Last-Event-ID and replays the rest
+                    break
+                try:
+                    entry = await asyncio.wait_for(subscriber.queue.get(), timeout=SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    await response.write(b": keepalive\n\n")
+                    continue
+                await response.write(_format_sse(entry))
+                if entry["event"] in TERMINAL_EVENTS:
+                    break
+        except ConnectionResetError:
+            pass
+        finally:
+            self.metrics.sse_clients -= 1
+            if subscriber is not None and subscriber in run.subscribers:
+                run.subscribers.remove(subscriber)
+        return response
+
+    async def health(self, request: web.Request) -> web.Response:
+        status = 200 if self.accepting else 503
+        health: Dict[str, Any] = {"status": "ok" if self.accepting else "draining", "queued": self.queued, "running": self.running}
+        if self.pool is not None:
+            health["workers"] = self.pool.status()
+        if self.warmer is not None:
+            health["warming"] = dict(self.warmer.stats)
+        return web.json_response(health, status=status)
+
+    async def metrics_endpoint(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.metrics.render(self.queued, self.running, self.pool.status() if self.pool is not None else []),
+            content_type="text/plain",
+            charset="utf-8",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+
+def _format_sse(entry: Dict[str, Any]) -> bytes:
+    return f"id: {entry['id']}\nevent: {entry['event']}\ndata: {json.dumps(entry['data'])}\n\n".encode("utf-8")
+
+
+def create_app(service: Optional[PlannerService] = None) -> web.Application:
+    """Build the aiohttp application serving the trip planner"""
+    service = service or PlannerService()
+    app = web.Application()
+    app["service"] = service
+    app.on_startup.append(service.start)
+    app.on_shutdown.append(service.stop)
+    app.router.add_post("/trips", service.create_trip)
+    app.router.add_get("/trips/{run_id}", service.get_trip)
+    app.router.add_get("/trips/{run_id}/events", service.trip_events)
+    app.router.add_get("/healthz", service.health)
+    app.router.add_get("/metrics", service.metrics_endpoint)
+    return app
+
+
+def serve():
+    """Serve the trip planner over HTTP"""
+    parser = argparse.ArgumentParser(description="Serve the trip planner over HTTP")
+    parser.add_argument("--host", default=os.getenv("TRAVEL_FLOW_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("TRAVEL_FLOW_PORT", "8000")))
+    parser.add_argument("--max-concurrent-runs", type=int, default=int(os.getenv("TRAVEL_FLOW_MAX_CONCURRENT_RUNS", DEFAULT_MAX_CONCURRENT_RUNS)))
+    parser.add_argument("--max-queued-runs", type=int, default=int(os.getenv("TRAVEL_FLOW_MAX_QUEUED_RUNS", DEFAULT_MAX_QUEUED_RUNS)))
+    parser.add_argument("--time-budget", type=float, default=None, help="Maximum seconds per run (default: TRAVEL_FLOW_TIME_BUDGET)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("TRAVEL_FLOW_WORKERS", "0")),
+                        help="Worker processes to shard runs across by destination, -1 for one per core (default: run flows in this process)")
+    parser.add_argument("--threads-per-worker", type=int, default=DEFAULT_THREADS_PER_WORKER)
+    parser.add_argument("--warm-from", action="append", default=[],
+                        help="Run output directory or JSON lines request log to warm popular trips from (repeatable; default: no warming)")
+    parser.add_argument("--warm-top", type=int, default=DEFAULT_TOP_N, help="Most frequent trip combinations to keep warm")
+    parser.add_argument("--warm-runs-per-minute", type=float, default=DEFAULT_RUNS_PER_MINUTE)
+    parser.add_argument("--off-peak", default=os.getenv("TRAVEL_FLOW_OFF_PEAK"),
+                        help="Local time window to warm in, e.g. 01:00-06:00 (default: whenever the service is idle)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile each step into the run's profile/ directory (same as TRAVEL_FLOW_PROFILE=1)")
+    args = parser.parse_args()
+
+    if args.profile:
+        # Set in the environment so worker processes, spawned later, profile too
+        os.environ["TRAVEL_FLOW_PROFILE"] = "1"
+
+    pool = None
+    if args.workers:
+        pool = WorkerPool(num_workers=args.workers if args.workers > 0 else None, threads_per_worker=args.threads_per_worker)
+
+    warmer = None
+    if args.warm_from:
+        warmer = CacheWarmer(args.warm_from, args.warm_top, args.warm_runs_per_minute, args.off_peak)
+
+    service = PlannerService(
+        max_concurrent_runs=args.max_concurrent_runs,
+        max_queued_runs=args.max_queued_runs,
+        time_budget=args.time_budget,
+        pool=pool,
+        warmer=warmer,
+    )
+    web.run_app(create_app(service), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    serve()
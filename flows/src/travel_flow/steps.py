@@ -0,0 +1,34 @@
+import functools
+import time
+from typing import Callable
+
+from travel_flow.deadline import Deadline, use_deadline
+from travel_flow.profiling import profile_step
+
+
+def flow_step(method: Callable) -> Callable:
+    """Run a TripPlanningFlow step inside its slice of the run's time budget
+
+    The run deadline starts with the first decorated step, so time spent waiting for the
+    user's query does not count against it. The flow's progress callback is told when the
+    step starts and finishes. With TRAVEL_FLOW_PROFILE set, the step is profiled into the flow's
+    output directory. Place the decorator below @listen/@router.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.deadline is None:
+            self.deadline = Deadline(self.time_budget)
+
+        step = method.__name__
+        step_deadline = self.deadline.for_step(step)
+        print(f"⏱️ {step}: {step_deadline.remaining():.0f}s budget")
+        self._emit_progress("step_started", step=step, budget=round(step_deadline.remaining(), 1))
+
+        start = time.perf_counter()
+        with use_deadline(step_deadline), profile_step(step, self.output_dir):
+            result = method(self, *args, **kwargs)
+        self._emit_progress("step_finished", step=step, duration=round(time.perf_counter() - start, 3))
+        return result
+
+    return wrapper
@@ -0,0 +1,115 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from crewai.utilities.events import crewai_event_bus
+from crewai.utilities.events.llm_events import LLMCallStartedEvent, LLMStreamChunkEvent
+
+
+class FinalAnswerFilter:
+    """Pass through only the final answer of a streamed agent response, skipping the agent's reasoning"""
+
+    def __init__(self, marker: str = "Final Answer:"):
+        self.marker = marker
+        self.reset()
+
+    def reset(self):
+        """Start over, e.g. when the agent makes a new LLM call"""
+        self._prefix = ""
+        self.in_answer = not self.marker
+
+    def feed(self, chunk: str) -> str:
+        """Return the part of the chunk that belongs to the final answer"""
+        if self.in_answer:
+            return chunk
+        self._prefix += chunk
+        _, marker, rest = self._prefix.partition(self.marker)
+        if not marker:
+            # Only keep enough text to find a marker split across chunks
+            self._prefix = self._prefix[-len(self.marker):]
+            return ""
+        self.in_answer = True
+        return rest.lstrip()
+
+
+class StreamListener:
+    """Callbacks for the streamed output of the LLM calls made in one context"""
+
+    def __init__(self, on_chunk: Callable[[str], None], on_call_started: Optional[Callable[[], None]] = None):
+        self.on_chunk = on_chunk
+        self.on_call_started = on_call_started
+
+
+_current_listener: contextvars.ContextVar[Optional[StreamListener]] = contextvars.ContextVar("stream_listener", default=None)
+_handlers_registered = False
+_handlers_lock = threading.Lock()
+
+
+def _register_handlers():
+    """Register the event bus handlers once; they forward events to the listener of the calling context
+
+    The event bus is global and emits in the thread making the LLM call, so the context variable
+    tells apart the runs and steps that stream at the same time.
+    """
+    global _handlers_registered
+    with _handlers_lock:
+        if _handlers_registered:
+            return
+
+        @crewai_event_bus.on(LLMCallStartedEvent)
+        def on_call_started(source, event: LLMCallStartedEvent):
+            listener = _current_listener.get()
+            if listener is not None and listener.on_call_started is not None:
+                listener.on_call_started()
+
+        @crewai_event_bus.on(LLMStreamChunkEvent)
+        def on_stream_chunk(source, event: LLMStreamChunkEvent):
+            listener = _current_listener.get()
+            # Tool call chunks carry function arguments, not answer text
+            if listener is not None and event.tool_call is None:
+                listener.on_chunk(event.chunk)
+
+        _handlers_registered = True
+
+
+@contextmanager
+def listen_to_stream(on_chunk: Callable[[str], None], on_call_started: Optional[Callable[[], None]] = None) -> Iterator[StreamListener]:
+    """Receive the chunks streamed by LLM calls made in this context, including worker threads started with a copy of it"""
+    _register_handlers()
+    listener = StreamListener(on_chunk, on_call_started)
+    token = _current_listener.set(listener)
+    try:
+        yield listener
+    finally:
+        _current_listener.reset(token)
+
+
+@contextmanager
+def detached_from_stream() -> Iterator[None]:
+    """Stop forwarding stream events to the current listener, e.g. in work started from a stream callback"""
+    token = _current_listener.set(None)
+    try:
+        yield
+    finally:
+        _current_listener.reset(token)
+
+
+@contextmanager
+def forward_answer_tokens(publish: Callable[[str, dict], None]) -> Iterator[None]:
+    """Publish the final answer text streamed by LLM calls in this context as "token" events"""
+    answer = FinalAnswerFilter()
+
+    def on_chunk(chunk: str):
+        text = answer.feed(chunk)
+        if text:
+            publish("token", {"text": text})
+
+    def on_call_started():
+        # A fallback model starts the answer over, so clients drop the tokens they have
+        if answer.in_answer:
+            publish("tokens_reset", {})
+        answer.reset()
+
+    with listen_to_stream(on_chunk, on_call_started):
+        yield
@@ -1,6 +1,28 @@
 from crewai.tools import BaseTool
 from typing import Type, Dict, Any, Optional
 from pydantic import BaseModel, Field
+import select
+import sys
+
+from travel_flow.deadline import DeadlineExceeded, current_deadline
+
+# Seconds to wait for the user to answer one prompt when the run has no tighter deadline
+DEFAULT_INPUT_TIMEOUT = 120.0
+
+
+def input_with_timeout(prompt: str, timeout: float) -> str:
+    """Read a line from stdin, returning an empty string if nothing is entered in time"""
+    print(prompt, end="", flush=True)
+    try:
+        ready, _, _ = select.select([sys.stdin], [], [], timeout)
+    except (OSError, ValueError):
+        # stdin can't be polled (e.g. on Windows), fall back to a blocking read
+        return input()
+    if not ready:
+        print("\n⏱️ No answer received in time, skipping")
+        return ""
+    return sys.stdin.readline().rstrip("\n")
+
 
 class HumanInputSchema(BaseModel):
     """Input schema for human input tool"""
@@ -51,6 +73,7 @@ class HumanInputTool(BaseTool):
             
             # Collect all missing fields at once
             missing_inputs = {}
+            deadline = current_deadline()
             for field in fields_list:
                 # Clean field name to match our mapping
                 field_clean = field.lower().replace('(', '').replace(')', '').strip()
@@ -64,7 +87,12 @@ class HumanInputTool(BaseTool):
                 
                 if field_key and (not data.get(field_key) or str(data.get(field_key, '')).strip() == ''):
                     prompt = field_prompts[field_key]
-                    user_input = input(f"{prompt}: ").strip()
+                    try:
+                        timeout = deadline.timeout(DEFAULT_INPUT_TIMEOUT) if deadline else DEFAULT_INPUT_TIMEOUT
+                    except DeadlineExceeded:
+                        print("⏱️ Out of time for collecting details")
+                        break
+                    user_input = input_with_timeout(f"{prompt}: ", timeout).strip()
                     if user_input:
                         missing_inputs[field_key] = user_input
             
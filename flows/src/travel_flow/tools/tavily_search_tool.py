@@ -1,9 +1,30 @@
 from crewai.tools import BaseTool
-from typing import Type
+from typing import Any, Dict, Type
 from pydantic import BaseModel, Field
 import os
 import requests
 
+from travel_flow.cache import get_cache
+from travel_flow.deadline import DeadlineExceeded, current_deadline
+from travel_flow.semantic_cache import get_semantic_cache, same_results
+
+# Seconds to wait for a Tavily response when the run has no tighter deadline
+DEFAULT_SEARCH_TIMEOUT = 20.0
+
+# Maximum number of Tavily responses kept in memory, keyed by query
+SEARCH_CACHE_SIZE = 1024
+
+# Maximum number of Tavily responses that can be served for near-duplicate queries
+SEMANTIC_SEARCH_CACHE_SIZE = 4096
+
+
+def search_cache_key(query: str, max_results: int) -> tuple:
+    return (" ".join(query.lower().split()), max_results)
+
+
+class SearchError(RuntimeError):
+    """Raised when a Tavily search can't be made or fails"""
+
 
 class TavilySearchInput(BaseModel):
     """Input schema for TavilySearchTool."""
@@ -30,10 +51,68 @@ class TavilySearchTool(BaseTool):
         Returns:
             Formatted search results as a string
         """
+        try:
+            data = self.search(query, max_results)
+        except DeadlineExceeded:
+            return "Error: The time budget for searching is exhausted. Do not search again, compile your answer from the results you already have."
+        except SearchError as e:
+            return f"Error: {e}"
+        
+        try:
+            return self.format_results(data, max_results)
+        except Exception as e:
+            return f"Error processing Tavily search: {str(e)}"
+
+    def search(self, query: str, max_results: int = 10) -> Dict[str, Any]:
+        """
+        Run a Tavily search and return the raw response, for callers that inspect the results.
+        
+        Raises:
+            SearchError: The API key is missing or the request failed
+            DeadlineExceeded: The current deadline has no time left for a request
+        """
         api_key = os.getenv("TAVILY_API_KEY")
         if not api_key:
-            return "Error: TAVILY_API_KEY environment variable not set. Please set your Tavily API key."
+            raise SearchError("TAVILY_API_KEY environment variable not set. Please set your Tavily API key.")
         
+        deadline = current_deadline()
+        cache = get_cache("search", SEARCH_CACHE_SIZE)
+        cache_key = search_cache_key(query, max_results)
+        semantic_cache = get_semantic_cache("search_semantic", SEMANTIC_SEARCH_CACHE_SIZE)
+        
+        data = cache.get(cache_key)
+        if data is None:
+            # Paraphrases of a cached query are served its response ("best things to do in Paris"
+            # for "top attractions in Paris"), as long as it asked for at least as many results
+            hit = semantic_cache.lookup(query)
+            if hit is not None and hit.value[0] >= max_results:
+                data = hit.value[1]
+                if semantic_cache.should_verify(hit):
+                    # Measure the cache's precision against a real response now and then; if the
+                    # check can't be made, the hit is served unverified
+                    try:
+                        fresh = self._request(api_key, query, max_results)
+                    except (SearchError, DeadlineExceeded) as e:
+                        print(f"⚠️ Could not verify a cached search for {query!r}: {e}")
+                    else:
+                        semantic_cache.record_verification(same_results(data, fresh))
+                        data = fresh
+                        semantic_cache.set(query, (max_results, data))
+            else:
+                data = self._request(api_key, query, max_results)
+                semantic_cache.set(query, (max_results, data))
+            cache.set(cache_key, data)
+        
+        # Keep the raw results so a step that runs out of time can still use them
+        if deadline and data.get("results"):
+            for result in data["results"][:max_results]:
+                deadline.add_partial_result("search_results", result)
+        
+        return data
+
+    @staticmethod
+    def _request(api_key: str, query: str, max_results: int) -> Dict[str, Any]:
+        """POST a search to Tavily within the current deadline"""
         url = "https://api.tavily.com/search"
         
         payload = {
@@ -46,34 +125,35 @@ class TavilySearchTool(BaseTool):
             "max_results": max_results
         }
         
+        deadline = current_deadline()
+        timeout = deadline.timeout(DEFAULT_SEARCH_TIMEOUT) if deadline else DEFAULT_SEARCH_TIMEOUT
+        
         try:
-            response = requests.post(url, json=payload)
+            response = requests.post(url, json=payload, timeout=timeout)
             response.raise_for_status()
-            
-            data = response.json()
-            
-            # Format the results
-            results = []
-            
-            # Add the answer if available
-            if data.get("answer"):
-                results.append(f"**Answer:** {data['answer']}\n")
-            
-            # Add search results
-            if data.get("results"):
-                results.append("**Search Results:**")
-                for i, result in enumerate(data["results"][:max_results], 1):
-                    title = result.get("title", "No title")
-                    url = result.get("url", "No URL")
-                    content = result.get("content", "No content available")
-                    
-                    results.append(f"\n{i}. **{title}**")
-                    results.append(f"   URL: {url}")
-                    results.append(f"   Content: {content[:300]}{'...' if len(content) > 300 else ''}")
-            
-            return "\n".join(results) if results else "No results found for the given query."
-            
+            return response.json()
         except requests.exceptions.RequestException as e:
-            return f"Error making request to Tavily API: {str(e)}"
-        except Exception as e:
-            return f"Error processing Tavily search: {str(e)}" 
\ No newline at end of file
+            raise SearchError(f"Error making request to Tavily API: {str(e)}") from e
+
+    @staticmethod
+    def format_results(data: Dict[str, Any], max_results: int = 10) -> str:
+        """Format a raw Tavily response as the text handed to agents"""
+        results = []
+        
+        # Add the answer if available
+        if data.get("answer"):
+            results.append(f"**Answer:** {data['answer']}\n")
+        
+        # Add search results
+        if data.get("results"):
+            results.append("**Search Results:**")
+            for i, result in enumerate(data["results"][:max_results], 1):
+                title = result.get("title", "No title")
+                url = result.get("url", "No URL")
+                content = result.get("content", "No content available")
+                
+                results.append(f"\n{i}. **{title}**")
+                results.append(f"   URL: {url}")
+                results.append(f"   Content: {content[:300]}{'...' if len(content) > 300 else ''}")
+        
+        return "\n".join(results) if results else "No results found for the given query."
@@ -0,0 +1,165 @@
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from travel_flow.models import TripDetails, Attraction, AttractionsSearchResult, TripSkeleton
+
+# Multipliers used to turn free-text durations ("5 days", "2 weeks", "1 month") into days
+DURATION_UNITS = {
+    "day": 1,
+    "night": 1,
+    "weekend": 2,
+    "week": 7,
+    "fortnight": 14,
+    "month": 30,
+}
+
+WORD_NUMBERS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+    "eleven": 11, "twelve": 12, "fourteen": 14, "fifteen": 15, "twenty": 20, "thirty": 30,
+}
+
+BUDGET_TIER_KEYWORDS = {
+    "low": ["budget", "low", "cheap", "backpack", "shoestring", "affordable", "economy"],
+    "medium": ["medium", "mid", "moderate", "average", "standard"],
+    "high": ["high", "luxury", "premium", "lavish", "splurge", "5-star", "five star"],
+}
+
+
+def parse_duration_days(duration: Optional[str]) -> Optional[int]:
+    """Convert a free-text trip duration into a number of days, or None if it can't be read"""
+    if not duration:
+        return None
+
+    text = duration.lower().strip()
+    if text.isdigit():
+        return int(text)
+
+    # Largest amount given for each unit: "7 days / 6 nights" describes one trip twice
+    counts: Dict[str, float] = {}
+    for amount, unit in re.findall(r"\b(\d+(?:\.\d+)?|[a-z]+)[\s-]*(day|night|weekend|week|fortnight|month)s?\b", text):
+        count = float(amount) if amount[0].isdigit() else WORD_NUMBERS.get(amount)
+        if count is None:
+            continue
+        counts[unit] = max(count, counts.get(unit, 0))
+
+    # Nights count only when no days are given, and the longest of the larger units wins
+    days = counts.get("day", counts.get("night", 0))
+    longest = max((count * DURATION_UNITS[unit] for unit, count in counts.items() if unit not in ("day", "night")), default=0)
+    # Less than a week of days next to a larger unit is the rest of the trip ("1 week and 3 days"),
+    # more is the same trip in days ("2 weeks (14 days)")
+    total = longest + days if longest and days < 7 else max(days, longest)
+
+    return int(round(total)) or None
+
+
+def duration_bucket(days: Optional[int]) -> Optional[str]:
+    """Map a number of days to the short/medium/long buckets used in the attractions prompt"""
+    if days is None:
+        return None
+    if days <= 3:
+        return "short"
+    if days <= 7:
+        return "medium"
+    return "long"
+
+
+def budget_tier(budget: Optional[str]) -> Optional[str]:
+    """Classify a free-text budget as low/medium/high, or None when it is just an amount"""
+    if not budget:
+        return None
+
+    text = budget.lower()
+    # Check high before low so that "high budget" is not read as "budget"
+    for tier in ("high", "medium", "low"):
+        if any(re.search(rf"\b{re.escape(keyword)}\b", text) for keyword in BUDGET_TIER_KEYWORDS[tier]):
+            return tier
+    return None
+
+
+def attractions_cache_key(trip_details: TripDetails) -> tuple:
+    """Key under which attractions are cached: trips that would get the same search share it"""
+    duration = trip_details.duration or ""
+    budget = trip_details.budget or ""
+    return (
+        " ".join((trip_details.destination or "").lower().split()),
+        duration_bucket(parse_duration_days(duration)) or duration.strip().lower(),
+        budget_tier(budget) or budget.strip().lower(),
+    )
+
+
+def plan_cache_key(trip_details: TripDetails) -> tuple:
+    """Key under which a generated plan is cached
+
+    Plans also depend on the exact length, interests and group size of the trip, and on its start
+    date, which decides the weekday closures the day skeleton works around.
+    """
+    return (
+        *attractions_cache_key(trip_details),
+        parse_duration_days(trip_details.duration),
+        tuple(sorted(" ".join(interest.lower().split()) for interest in trip_details.interests)),
+        trip_details.group_size,
+        " ".join((trip_details.start_date or "").lower().split()) or None,
+    )
+
+
+def attractions_from_search_results(destination: str, search_results: List[Dict[str, Any]]) -> AttractionsSearchResult:
+    """Turn raw web search results into attractions, used when the attractions step runs out of time"""
+    attractions = []
+    seen = set()
+    for result in search_results:
+        name = (result.get("title") or "").strip()
+        if not name or name.lower() in seen:
+            continue
+        seen.add(name.lower())
+        attractions.append(Attraction(
+            name=name,
+            description=(result.get("content") or "")[:300],
+            location=destination,
+        ))
+
+    return AttractionsSearchResult(
+        destination=destination,
+        attractions=attractions,
+        total_found=len(attractions),
+        search_date=datetime.now().strftime('%Y-%m-%d'),
+    )
+
+
+def fallback_trip_plan(
+    trip_details: Optional[TripDetails], attractions: List[Attraction], skeleton: Optional[TripSkeleton] = None,
+) -> str:
+    """Build a simple day-by-day plan without the LLM, used when plan generation runs out of time"""
+    destination = trip_details.destination if trip_details and trip_details.destination else "your destination"
+    days = len(skeleton.days) if skeleton else parse_duration_days(trip_details.duration if trip_details else None) or 1
+
+    lines = [
+        f"### {days}-Day Trip to {destination}",
+        "",
+        "_This is a shortened plan: the detailed itinerary could not be generated in time._",
+    ]
+    if skeleton:
+        # The day skeleton already groups nearby attractions and orders them within opening hours
+        by_name = {attraction.name: attraction for attraction in attractions}
+        for day in skeleton.days:
+            lines.extend(["", f"#### Day {day.day}" + (f" ({day.date})" if day.date else "")])
+            if not day.visits:
+                lines.append(f"- Free day to explore {destination}")
+            for visit in day.visits:
+                attraction = by_name.get(visit.name)
+                details = ", ".join(filter(None, [visit.location, attraction.opening_hours if attraction else None]))
+                lines.append(f"- {visit.start}-{visit.end} **{visit.name}**" + (f" ({details})" if details else ""))
+        return "\n".join(lines)
+
+    for day in range(1, days + 1):
+        lines.extend(["", f"#### Day {day}"])
+        # Spread the attractions over the days in the order they were found
+        day_attractions = attractions[day - 1::days]
+        if not day_attractions:
+            lines.append(f"- Free day to explore {destination}")
+        for attraction in day_attractions:
+            details = ", ".join(filter(None, [attraction.location, attraction.opening_hours]))
+            lines.append(f"- **{attraction.name}**" + (f" ({details})" if details else ""))
+
+    return "\n".join(lines)
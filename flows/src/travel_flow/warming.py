@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, time as clock_time, timedelta
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from travel_flow.cache import get_cache
+from travel_flow.models import TripDetails
+from travel_flow.trip_utils import attractions_cache_key
+
+# Combinations of destination, duration and budget tier kept warm
+DEFAULT_TOP_N = 50
+
+# Warming runs started per minute; each one makes up to two web searches and one or two model calls
+DEFAULT_RUNS_PER_MINUTE = 4.0
+
+# Warmed results stay fresh for this long, overridden by TRAVEL_FLOW_WARM_TTL: long enough to
+# last from one off-peak window to the next
+DEFAULT_WARM_TTL = 30 * 60 * 60
+
+# Entries are refreshed once less than this share of their time to live is left
+REFRESH_MARGIN = 0.25
+
+# Seconds between passes over the frequency table during the off-peak window
+PASS_INTERVAL = 15 * 60
+
+# Seconds waited while the service is busy with requests before checking again
+BUSY_WAIT = 30.0
+
+# Slowest pacing after repeated failures, as a multiple of the normal interval
+MAX_BACKOFF = 16
+
+WarmFunction = Callable[[Dict[str, Any], float], Dict[str, Any]]
+
+
+class TripCombination(NamedTuple):
+    """A popular combination of trip details, with the details it is warmed with"""
+    key: tuple
+    trip_details: TripDetails
+    count: int
+
+
+def _trip_details_records(source: str) -> Iterator[Dict[str, Any]]:
+    """Trip details found in a source: a directory of run outputs, a trip_details.json, or a JSON lines log"""
+    if os.path.isdir(source):
+        for path in sorted(glob.glob(os.path.join(source, "**", "trip_details.json"), recursive=True)):
+            yield from _trip_details_records(path)
+        return
+    if not os.path.exists(source):
+        print(f"⚠️ Warming source {source} does not exist")
+        return
+
+    with open(source, "r", encoding="utf-8") as f:
+        lines = [f.read()] if source.endswith(".json") else f.readlines()
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        # Log lines may carry the details under "trip_details" or at the top level
+        record = record.get("trip_details") or record
+        if isinstance(record, dict) and record.get("destination"):
+            yield record
+
+
+def frequency_table(sources: List[str]) -> List[TripCombination]:
+    """Count past trips by the key their attractions are cached under, most frequent first
+
+    Each combination is warmed with the most common exact destination, duration, budget and
+    interests seen for it.
+    """
+    counts: Counter = Counter()
+    variants: Dict[tuple, Counter] = defaultdict(Counter)
+    for source in sources:
+        for record in _trip_details_records(source):
+            try:
+                trip_details = TripDetails(**{field: record.get(field) for field in ("destination", "duration", "budget", "interests", "group_size") if record.get(field)})
+            except ValueError:
+                continue
+            key = attractions_cache_key(trip_details)
+            counts[key] += 1
+            variants[key][trip_details.model_dump_json(exclude={"start_date"})] += 1
+
+    table = []
+    for key, count in sorted(counts.items(), key=lambda item: (-item[1], item[0])):
+        representative, _ = variants[key].most_common(1)[0]
+        table.append(TripCombination(key, TripDetails.model_validate_json(representative), count))
+    return table
+
+
+def warm_ttl() -> float:
+    return float(os.getenv("TRAVEL_FLOW_WARM_TTL", DEFAULT_WARM_TTL))
+
+
+def is_fresh(trip_details: TripDetails, ttl: float) -> bool:
+    """Whether this process already holds attractions for the trip that won't need a refresh soon"""
+    from travel_flow.main import ATTRACTIONS_CACHE_SIZE
+
+    remaining = get_cache("attractions", ATTRACTIONS_CACHE_SIZE).expires_in(attractions_cache_key(trip_details))
+    return remaining is not None and remaining >= ttl * REFRESH_MARGIN
+
+
+def warm_trip(trip: Dict[str, Any], ttl: float) -> Dict[str, Any]:
+    """Precompute the attractions of a trip into this process's caches
+
+    Plans are not warmed: they depend on the trip's start date, which every request gives and
+    which can't be guessed ahead of time. Entries that are still fresh are left alone. Warmed
+    entries get the warming time to live, so they last until the next off-peak window.
+    """
+    from travel_flow.main import ATTRACTIONS_CACHE_SIZE, TripPlanningFlow
+
+    trip_details = TripDetails(**trip)
+    if is_fresh(trip_details, ttl):
+        return {"status": "fresh"}
+
+    flow = TripPlanningFlow(interactive=False)
+    flow.state.trip_details = trip_details
+    # Drop the entries due for a refresh, so the flow doesn't just read them back
+    attractions = get_cache("attractions", ATTRACTIONS_CACHE_SIZE)
+    attractions_key = attractions_cache_key(trip_details)
+    attractions.set(attractions_key, None, ttl=0)
+    flow.search_attractions()
+    if flow.state.degraded_steps or not flow.state.attractions_result or not flow.state.attractions_result.attractions:
+        return {"status": "failed", "degraded_steps": flow.state.degraded_steps}
+    attractions.set(attractions_key, flow.state.attractions_result.model_copy(deep=True), ttl=ttl)
+    return {"status": "warmed", "attractions": len(flow.state.attractions_result.attractions)}
+
+
+def parse_window(window: str) -> Tuple[clock_time, clock_time]:
+    """Read an off-peak window like "01:00-06:00"; it may wrap around midnight"""
+    start, end = (datetime.strptime(part.strip(), "%H:%M").time() for part in window.split("-"))
+    return start, end
+
+
+def seconds_until_window(window: Optional[Tuple[clock_time, clock_time]], now: Optional[datetime] = None) -> float:
+    """Seconds until the off-peak window opens, 0 while it is open or if there is no window"""
+    if window is None:
+        return 0.0
+    now = now or datetime.now()
+    start, end = window
+    current = now.time()
+    inside = start <= current < end if start <= end else (current >= start or current < end)
+    if inside:
+        return 0.0
+    opens = datetime.combine(now.date(), start)
+    if opens <= now:
+        opens += timedelta(days=1)
+    return (opens - now).total_seconds()
+
+
+class CacheWarmer:
+    """Keeps the results of the most frequent trips warm, during an off-peak window
+
+    Every pass rebuilds the frequency table from the sources and warms the top combinations whose
+    cached results are missing or close to expiry. Warming runs are paced to runs_per_minute, and
+    the pace halves after each failure (rate limits, timeouts) until a run succeeds again. While
+    the service is busy (is_busy returns True) warming waits, so it never competes with requests.
+    """
+
+    def __init__(
+        self,
+        sources: List[str],
+        top_n: int = DEFAULT_TOP_N,
+        runs_per_minute: float = DEFAULT_RUNS_PER_MINUTE,
+        window: Optional[str] = None,
+        ttl: Optional[float] = None,
+        warm: Optional[WarmFunction] = None,
+        is_busy: Optional[Callable[[], bool]] = None,
+    ):
+        self.sources = sources
+        self.top_n = top_n
+        self.interval = 60.0 / runs_per_minute
+        self.window = parse_window(window) if window else None
+        self.ttl = ttl if ttl is not None else warm_ttl()
+        self.warm = warm or warm_trip
+        self.is_busy = is_busy or (lambda: False)
+        self.stats = Counter()
+        self._backoff = 1
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def run(self):
+        """Warm caches pass after pass until stopped"""
+        while not self._stopping.is_set():
+            wait = seconds_until_window(self.window)
+            if wait:
+                print(f"🌙 Cache warming resumes in {wait / 60:.0f} minutes")
+                self._stopping.wait(wait)
+                continue
+            self.warm_pass()
+            self._stopping.wait(PASS_INTERVAL)
+
+    def warm_pass(self) -> Counter:
+        """Warm the top combinations once, returning how many were warmed, fresh or failed"""
+        outcomes: Counter = Counter()
+        for combination in frequency_table(self.sources)[:self.top_n]:
+            if self._stopping.is_set() or seconds_until_window(self.window):
+                break
+            while self.is_busy() and not self._stopping.is_set():
+                self._stopping.wait(BUSY_WAIT)
+
+            started = time.monotonic()
+            try:
+                result = self.warm(combination.trip_details.model_dump(), self.ttl)
+            except Exception as e:
+                result = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+            status = result["status"]
+            outcomes[status] += 1
+            self.stats[status] += 1
+            if status == "fresh":
+                continue
+
+            destination = combination.trip_details.destination
+            if status == "warmed":
+                self._backoff = 1
+                print(f"🔥 Warmed {destination} ({combination.count} past trips)")
+            else:
+                self._backoff = min(self._backoff * 2, MAX_BACKOFF)
+                print(f"⚠️ Warming {destination} failed, slowing down: {result.get('error') or result.get('degraded_steps')}")
+            # Pace from the start of the run, so slow runs don't add their duration to the wait
+            self._stopping.wait(max(self.interval * self._backoff - (time.monotonic() - started), 0))
+
+        print(f"🔥 Cache warming pass: {dict(outcomes)}")
+        return outcomes
+
+
+def warm():
+    """Show the trips the service would keep warm (see serve --warm-from)"""
+    parser = argparse.ArgumentParser(description="Show the most frequent trip combinations")
+    parser.add_argument("sources", nargs="*", default=[os.path.join("output", "runs")],
+                        help="Run output directories, trip_details.json files or JSON lines request logs")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_N)
+    args = parser.parse_args()
+
+    for combination in frequency_table(args.sources)[:args.top]:
+        details = combination.trip_details
+        print(f"{combination.count:5d}  {details.destination} | {details.duration} | {details.budget}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(warm())
@@ -0,0 +1,267 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+# Seconds a leased job stays invisible to other workers unless its lease is extended
+DEFAULT_VISIBILITY_TIMEOUT = 600.0
+
+# Times a job is leased before it is dead-lettered
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Seconds before a failed job is retried, doubled on every further attempt
+RETRY_BACKOFF = 30.0
+
+DEFAULT_QUEUE_PATH = os.path.join("output", "work_queue.sqlite3")
+
+
+class LeaseLost(RuntimeError):
+    """Raised when a worker acts on a lease that expired and may have been given to another worker"""
+
+
+class Job(BaseModel):
+    """A unit of work in the queue"""
+    job_id: str
+    payload: Dict[str, Any]
+    status: str
+    attempts: int
+    max_attempts: int
+    available_at: float
+    created_at: float
+    updated_at: float
+    leased_by: Optional[str] = None
+    lease_expires_at: Optional[float] = None
+    last_error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+
+
+class Lease(BaseModel):
+    """Exclusive claim on a job until expires_at"""
+    job: Job
+    token: str
+    worker_id: str
+    expires_at: float
+
+
+class WorkQueue(ABC):
+    """Queue of jobs leased to workers with visibility timeouts, retries and a dead-letter state
+
+    A job is queued, leased by one worker at a time, and ends up done or dead. A lease that is
+    not completed or extended before it expires makes the job visible again, so a job held by a
+    crashed worker is picked up by another one. Every lease counts as an attempt; a job that
+    runs out of attempts is dead-lettered and kept for inspection until it is requeued.
+    """
+
+    @abstractmethod
+    def enqueue(self, payload: Dict[str, Any], job_id: Optional[str] = None, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Optional[str]:
+        """Add a job, returning its id. Enqueuing an id that already exists does nothing and returns None."""
+
+    @abstractmethod
+    def lease(self, worker_id: str, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> Optional[Lease]:
+        """Claim the oldest available job, or return None if there is none"""
+
+    @abstractmethod
+    def extend(self, lease: Lease, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> Lease:
+        """Keep a job invisible for longer while it is being worked on; raises LeaseLost"""
+
+    @abstractmethod
+    def complete(self, lease: Lease, result: Dict[str, Any]):
+        """Mark a leased job done and store its result; raises LeaseLost"""
+
+    @abstractmethod
+    def fail(self, lease: Lease, error: str, retry_delay: Optional[float] = None):
+        """Release a leased job after an error, to be retried later or dead-lettered; raises LeaseLost"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id"""
+
+    @abstractmethod
+    def jobs(self, status: Optional[str] = None, limit: int = 100) -> List[Job]:
+        """List jobs, optionally only those with a given status"""
+
+    @abstractmethod
+    def requeue(self, job_id: str) -> bool:
+        """Give a dead-lettered job a fresh set of attempts"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """WorkQueue stored in a SQLite file
+
+    Safe to share between threads and processes on one machine. SQLite locking is not reliable
+    on network filesystems, so workers on several machines need a networked WorkQueue.
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    available_at REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    leased_by TEXT,
+                    lease_token TEXT,
+                    lease_expires_at REAL,
+                    last_error TEXT,
+                    result TEXT
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, available_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A connection per call: connections can't be shared between threads
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction that takes the database lock up front, so leases never race"""
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Job:
+        return Job(
+            job_id=row["job_id"],
+            payload=json.loads(row["payload"]),
+            status=row["status"],
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            available_at=row["available_at"],
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+            leased_by=row["leased_by"],
+            lease_expires_at=row["lease_expires_at"],
+            last_error=row["last_error"],
+            result=json.loads(row["result"]) if row["result"] else None,
+        )
+
+    def enqueue(self, payload: Dict[str, Any], job_id: Optional[str] = None, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Optional[str]:
+        job_id = job_id or str(uuid.uuid4())
+        now = time.time()
+        with self._transaction() as db:
+            inserted = db.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, payload, status, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), max_attempts, now, now, now),
+            ).rowcount > 0
+        return job_id if inserted else None
+
+    def lease(self, worker_id: str, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> Optional[Lease]:
+        now = time.time()
+        with self._transaction() as db:
+            while True:
+                row = db.execute(
+                    "SELECT * FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+                    "OR (status = 'leased' AND lease_expires_at <= ?) ORDER BY available_at LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    return None
+
+                if row["attempts"] >= row["max_attempts"]:
+                    # The last attempt's lease expired without the worker reporting back
+                    db.execute(
+                        "UPDATE jobs SET status = 'dead', lease_token = NULL, updated_at = ?, "
+                        "last_error = COALESCE(last_error, 'Lease expired') WHERE job_id = ?",
+                        (now, row["job_id"]),
+                    )
+                    continue
+
+                token = str(uuid.uuid4())
+                expires_at = now + visibility_timeout
+                db.execute(
+                    "UPDATE jobs SET status = 'leased', attempts = attempts + 1, leased_by = ?, lease_token = ?, "
+                    "lease_expires_at = ?, updated_at = ? WHERE job_id = ?",
+                    (worker_id, token, expires_at, now, row["job_id"]),
+                )
+                job = self._job(db.execute("SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],)).fetchone())
+                return Lease(job=job, token=token, worker_id=worker_id, expires_at=expires_at)
+
+    def _update_leased(self, lease: Lease, assignments: str, values: tuple):
+        """Update a job only while the lease is still held"""
+        with self._transaction() as db:
+            updated = db.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE job_id = ? AND lease_token = ? AND status = 'leased'",
+                (*values, time.time(), lease.job.job_id, lease.token),
+            ).rowcount
+        if not updated:
+            raise LeaseLost(f"Lease on job {lease.job.job_id} was lost")
+
+    def extend(self, lease: Lease, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> Lease:
+        expires_at = time.time() + visibility_timeout
+        self._update_leased(lease, "lease_expires_at = ?", (expires_at,))
+        return lease.model_copy(update={"expires_at": expires_at})
+
+    def complete(self, lease: Lease, result: Dict[str, Any]):
+        self._update_leased(lease, "status = 'done', lease_token = NULL, result = ?", (json.dumps(result),))
+
+    def fail(self, lease: Lease, error: str, retry_delay: Optional[float] = None):
+        if lease.job.attempts >= lease.job.max_attempts:
+            self._update_leased(lease, "status = 'dead', lease_token = NULL, last_error = ?", (error,))
+            return
+        if retry_delay is None:
+            retry_delay = RETRY_BACKOFF * 2 ** (lease.job.attempts - 1)
+        self._update_leased(
+            lease,
+            "status = 'queued', lease_token = NULL, lease_expires_at = NULL, last_error = ?, available_at = ?",
+            (error, time.time() + retry_delay),
+        )
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def jobs(self, status: Optional[str] = None, limit: int = 100) -> List[Job]:
+        with self._connect() as db:
+            if status:
+                rows = db.execute("SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT ?", (status, limit)).fetchall()
+            else:
+                rows = db.execute("SELECT * FROM jobs ORDER BY created_at LIMIT ?", (limit,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def requeue(self, job_id: str) -> bool:
+        now = time.time()
+        with self._transaction() as db:
+            return db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, updated_at = ? WHERE job_id = ? AND status = 'dead'",
+                (now, now, job_id),
+            ).rowcount > 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as db:
+            rows = db.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        stats = {"queued": 0, "leased": 0, "done": 0, "dead": 0}
+        stats.update({row["status"]: row["count"] for row in rows})
+        return stats
@@ -0,0 +1,448 @@
+import hashlib
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from travel_flow.cache import cache_stats
+from travel_flow.deadline import default_time_budget
+
+# Flows each worker process runs at the same time; steps mostly wait on model and search calls
+DEFAULT_THREADS_PER_WORKER = 4
+
+# Seconds between worker heartbeats, and without one before a worker is restarted
+HEARTBEAT_INTERVAL = 5.0
+HEARTBEAT_TIMEOUT = 30.0
+
+# Seconds a job may run past its time budget before its worker is taken as hung and restarted.
+# Heartbeats come from their own thread, so they keep arriving while a job is stuck.
+JOB_TIMEOUT_GRACE = 60.0
+
+# Times a job is started before it fails, when the worker running it dies
+MAX_JOB_ATTEMPTS = 2
+
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def shard_for(destination: Optional[str], num_workers: int) -> int:
+    """Worker slot that owns a destination
+
+    The hash is stable across processes and restarts, so a destination keeps going to the
+    same worker and finds its searches and attractions in that worker's caches.
+    """
+    key = " ".join((destination or "").lower().split())
+    return int(hashlib.sha1(key.encode("utf-8")).hexdigest(), 16) % num_workers
+
+
+# Worker process side
+
+
+def _run_extraction(job: Dict[str, Any], emit: EventCallback) -> Dict[str, Any]:
+    """First phase of a run: extract the trip details from the query"""
+    from travel_flow.main import TripPlanningFlow
+
+    # The search runs on the destination's worker, so searching early here would only be wasted
+    flow = TripPlanningFlow(
+        time_budget=job["time_budget"], output_dir=job["output_dir"], interactive=False, progress=emit, speculative_search=False,
+    )
+    flow.state.id = job["run_id"]
+    flow.state.user_query = job["query"]
+    flow.extract_trip_details()
+    flow.validate_trip_details()
+    return {"state": flow.state.model_dump(), "remaining": flow.deadline.remaining()}
+
+
+def _run_planning(job: Dict[str, Any], emit: EventCallback) -> Dict[str, Any]:
+    """Second phase of a run, on the worker that owns the destination: search, plan and save"""
+    from travel_flow.main import TripPlanningFlow, TripPlanningState
+
+    flow = TripPlanningFlow(time_budget=job["remaining"], output_dir=job["output_dir"], interactive=False, progress=emit)
+    state = TripPlanningState.model_validate(job["state"])
+    for field in TripPlanningState.model_fields:
+        setattr(flow.state, field, getattr(state, field))
+    flow.state.id = job["run_id"]
+
+    if flow.state.needs_missing_details:
+        flow.collect_missing_details()
+    flow.search_attractions()
+    flow.generate_trip_plan()
+    flow.save_trip_plan()
+    return {"state": flow.state.model_dump()}
+
+
+def _run_warming(job: Dict[str, Any], emit: EventCallback) -> Dict[str, Any]:
+    """Precompute a popular trip's results into the caches of the worker that owns its destination"""
+    from travel_flow.warming import warm_trip
+
+    return {"result": warm_trip(job["trip"], job["ttl"])}
+
+
+# Job phases and the functions that run them
+PHASES = {"extract": _run_extraction, "plan": _run_planning, "warm": _run_warming}
+
+
+def _worker_main(worker_id: int, jobs: multiprocessing.Queue, results: multiprocessing.Queue, threads: int, heartbeat_interval: float):
+    """Entry point of a worker process: run jobs from the worker's queue until told to stop"""
+    from travel_flow.model_routing import get_router
+    from travel_flow.streaming import forward_answer_tokens
+
+    executor = ThreadPoolExecutor(threads, thread_name_prefix=f"worker-{worker_id}")
+    stopped = threading.Event()
+    counters = {"active": 0, "completed": 0, "failed": 0}
+    counters_lock = threading.Lock()
+
+    def heartbeat():
+        while not stopped.is_set():
+            with counters_lock:
+                info = dict(counters)
+            results.put(("heartbeat", worker_id, {**info, "pid": os.getpid(), "caches": cache_stats(), "routes": get_router().report()}))
+            stopped.wait(heartbeat_interval)
+
+    def run_job(job: Dict[str, Any]):
+        def emit(event: str, data: Dict[str, Any]):
+            results.put(("event", job["job_id"], job["attempt"], event, data))
+
+        results.put(("started", job["job_id"], job["attempt"]))
+        with counters_lock:
+            counters["active"] += 1
+        try:
+            with forward_answer_tokens(emit):
+                payload = PHASES[job["phase"]](job, emit)
+            results.put(("done", job["job_id"], job["attempt"], payload))
+            outcome = "completed"
+        except Exception as e:
+            traceback.print_exc()
+            results.put(("error", job["job_id"], job["attempt"], f"{type(e).__name__}: {e}"))
+            outcome = "failed"
+        with counters_lock:
+            counters["active"] -= 1
+            counters[outcome] += 1
+
+    threading.Thread(target=heartbeat, daemon=True, name="heartbeat").start()
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        executor.submit(run_job, job)
+
+    # Draining: finish the jobs already taken before exiting
+    executor.shutdown(wait=True)
+    stopped.set()
+    results.put(("stopped", worker_id, {}))
+
+
+# Dispatcher side
+
+
+class PoolJob:
+    """A run going through the pool: extraction on any worker, then planning on the destination's worker"""
+
+    def __init__(self, job_id: str, query: str, time_budget: float, output_dir: str, on_event: Optional[EventCallback]):
+        self.job_id = job_id
+        self.query = query
+        self.time_budget = time_budget
+        self.output_dir = output_dir
+        self.on_event = on_event
+        self.future: Future = Future()
+        self.phase = "extract"
+        self.attempt = 0
+        self.payload: Dict[str, Any] = {}
+        self.worker_id: Optional[int] = None
+        # When the worker began the current attempt, as told by its "started" message
+        self.started_at: Optional[float] = None
+
+    @property
+    def budget(self) -> float:
+        """Seconds the current phase may take: planning gets what extraction left of the run's budget"""
+        return self.payload["remaining"] if self.phase == "plan" else self.time_budget
+
+    def message(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "run_id": self.job_id,
+            "attempt": self.attempt,
+            "phase": self.phase,
+            "query": self.query,
+            "time_budget": self.time_budget,
+            "output_dir": self.output_dir,
+            **self.payload,
+        }
+
+
+class WorkerSlot:
+    """One worker position in the pool; a restarted worker takes over its slot and its shard"""
+
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.process: Optional[multiprocessing.Process] = None
+        self.jobs: Optional[multiprocessing.Queue] = None
+        self.in_flight: Dict[str, PoolJob] = {}
+        self.last_heartbeat = 0.0
+        self.info: Dict[str, Any] = {}
+        self.restarts = 0
+
+
+class WorkerPool:
+    """Runs TripPlanningFlow in worker processes, sharding runs by destination
+
+    Extraction is independent of the destination, so it goes to the least busy worker. The rest
+    of the run goes to the worker that owns the extracted destination, whose in-memory search
+    and attractions caches already hold results for it. Workers that die or stop sending
+    heartbeats, or hold a job well past its time budget, are restarted in the same slot, and the
+    jobs they held are retried there.
+    """
+
+    def __init__(
+        self,
+        num_workers: Optional[int] = None,
+        threads_per_worker: int = DEFAULT_THREADS_PER_WORKER,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+        heartbeat_timeout: float = HEARTBEAT_TIMEOUT,
+        max_job_attempts: int = MAX_JOB_ATTEMPTS,
+        job_timeout_grace: float = JOB_TIMEOUT_GRACE,
+    ):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_job_attempts = max_job_attempts
+        self.job_timeout_grace = job_timeout_grace
+        # Spawned rather than forked: forking a process that runs threads is not safe
+        self._context = multiprocessing.get_context("spawn")
+        self._results: Optional[multiprocessing.Queue] = None
+        self._slots: List[WorkerSlot] = []
+        self._jobs: Dict[str, PoolJob] = {}
+        self._lock = threading.Condition()
+        self._closing = threading.Event()
+        self.accepting = False
+
+    @property
+    def capacity(self) -> int:
+        """Runs the pool works on at the same time"""
+        return self.num_workers * self.threads_per_worker
+
+    def start(self):
+        self._results = self._context.Queue()
+        self._slots = [WorkerSlot(worker_id) for worker_id in range(self.num_workers)]
+        for slot in self._slots:
+            self._spawn(slot)
+        threading.Thread(target=self._collect, daemon=True, name="pool-collector").start()
+        threading.Thread(target=self._monitor, daemon=True, name="pool-monitor").start()
+        self.accepting = True
+
+    def _spawn(self, slot: WorkerSlot):
+        # A fresh queue, so a restarted worker doesn't pick up messages meant for the old one
+        slot.jobs = self._context.Queue()
+        slot.process = self._context.Process(
+            target=_worker_main,
+            args=(slot.worker_id, slot.jobs, self._results, self.threads_per_worker, self.heartbeat_interval),
+            name=f"trip-flow-worker-{slot.worker_id}",
+            daemon=True,
+        )
+        slot.process.start()
+        # Give a new worker the full timeout to import crewai and send its first heartbeat
+        slot.last_heartbeat = time.monotonic()
+
+    def submit(self, query: str, run_id: str, output_dir: str, time_budget: float, on_event: Optional[EventCallback] = None) -> Future:
+        """Queue a run, returning a future that resolves to the final state as a dict"""
+        if not self.accepting:
+            raise RuntimeError("Worker pool is not accepting runs")
+        job = PoolJob(run_id, query, time_budget, output_dir, on_event)
+        with self._lock:
+            self._jobs[run_id] = job
+            slot = min(self._slots, key=lambda slot: len(slot.in_flight))
+            self._dispatch(job, slot)
+        return job.future
+
+    def warm(self, trip: Dict[str, Any], ttl: float) -> Future:
+        """Warm the caches of the worker that owns a trip's destination, returning a future of the outcome"""
+        if not self.accepting:
+            raise RuntimeError("Worker pool is not accepting runs")
+        # Warming runs a flow with the default time budget
+        job = PoolJob(f"warm-{uuid.uuid4().hex[:12]}", "", default_time_budget(), "", None)
+        job.phase = "warm"
+        job.payload = {"trip": trip, "ttl": ttl}
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._dispatch(job, self._slots[shard_for(trip.get("destination"), self.num_workers)])
+        return job.future
+
+    def _dispatch(self, job: PoolJob, slot: WorkerSlot):
+        """Send a job to a worker; called with the lock held"""
+        job.attempt += 1
+        job.worker_id = slot.worker_id
+        job.started_at = None
+        slot.in_flight[job.job_id] = job
+        slot.jobs.put(job.message())
+
+    def _finish(self, job: PoolJob, result: Any = None, error: Optional[str] = None):
+        """Settle a job; called with the lock held"""
+        self._slots[job.worker_id].in_flight.pop(job.job_id, None)
+        self._jobs.pop(job.job_id, None)
+        if error is None:
+            job.future.set_result(result)
+        else:
+            job.future.set_exception(RuntimeError(error))
+        self._lock.notify_all()
+
+    def _collect(self):
+        """Handle the heartbeats, events and results sent back by the workers"""
+        while not self._closing.is_set():
+            try:
+                message = self._results.get(timeout=self.heartbeat_interval)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            kind = message[0]
+            if kind in ("heartbeat", "stopped"):
+                _, worker_id, info = message
+                with self._lock:
+                    slot = self._slots[worker_id]
+                    slot.last_heartbeat = time.monotonic()
+                    slot.info = info
+                    self._lock.notify_all()
+                continue
+
+            _, job_id, attempt, *rest = message
+            with self._lock:
+                job = self._jobs.get(job_id)
+                # Ignore messages from an attempt that was abandoned when its worker died
+                if job is None or job.attempt != attempt:
+                    continue
+                if kind == "started":
+                    job.started_at = time.monotonic()
+                elif kind == "done":
+                    self._job_done(job, rest[0])
+                elif kind == "error":
+                    self._finish(job, error=rest[0])
+
+            if kind == "event" and job.on_event is not None:
+                event, data = rest
+                try:
+                    job.on_event(event, data)
+                except Exception as e:
+                    print(f"⚠️ Event handler failed for run {job_id}: {e}")
+
+    def _job_done(self, job: PoolJob, payload: Dict[str, Any]):
+        """Move a finished extraction on to its destination's worker, or settle a finished plan or warming"""
+        if job.phase == "plan":
+            self._finish(job, payload["state"])
+            return
+        if job.phase == "warm":
+            self._finish(job, payload["result"])
+            return
+
+        self._slots[job.worker_id].in_flight.pop(job.job_id, None)
+        destination = (payload["state"].get("trip_details") or {}).get("destination")
+        # Without a destination there is no shard to prefer, so stay on the same worker
+        worker_id = shard_for(destination, self.num_workers) if destination else job.worker_id
+        job.phase = "plan"
+        job.attempt = 0
+        job.payload = payload
+        self._dispatch(job, self._slots[worker_id])
+
+    def _monitor(self):
+        """Restart workers that died, stopped sending heartbeats or hang on a job"""
+        while not self._closing.wait(self.heartbeat_interval):
+            with self._lock:
+                if not self.accepting:
+                    continue
+                now = time.monotonic()
+                failing = [(slot, self._failure(slot, now)) for slot in self._slots]
+            for slot, reason in failing:
+                if reason is not None:
+                    self._restart(slot, reason)
+
+    def _failure(self, slot: WorkerSlot, now: float) -> Optional[str]:
+        """Why a worker needs restarting, or None if it is healthy; called with the lock held"""
+        if not slot.process.is_alive():
+            return f"exited with code {slot.process.exitcode}"
+        if now - slot.last_heartbeat > self.heartbeat_timeout:
+            return f"no heartbeat for {now - slot.last_heartbeat:.0f}s"
+        for job in slot.in_flight.values():
+            if job.started_at is not None and now - job.started_at > job.budget + self.job_timeout_grace:
+                return f"job {job.job_id} still running {now - job.started_at:.0f}s after it started, with a {job.budget:.0f}s budget"
+        return None
+
+    def _restart(self, slot: WorkerSlot, reason: str):
+        """Replace a worker in its slot and retry the jobs it held
+
+        The old process is killed and joined without the lock, so results from the other workers
+        keep flowing meanwhile.
+        """
+        print(f"⚠️ Restarting worker {slot.worker_id}: {reason}")
+        if slot.process.is_alive():
+            slot.process.kill()
+        slot.process.join(timeout=5)
+
+        with self._lock:
+            # A drain that started meanwhile stops the workers and fails what they held
+            if not self.accepting:
+                return
+            slot.restarts += 1
+            orphans = list(slot.in_flight.values())
+            slot.in_flight.clear()
+            self._spawn(slot)
+            for job in orphans:
+                if job.attempt >= self.max_job_attempts:
+                    self._finish(job, error=f"Worker {slot.worker_id} failed while running the job: {reason}")
+                else:
+                    self._dispatch(job, slot)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Stop taking runs, let the queued and running ones finish, then stop the workers
+
+        Returns False if runs were still in progress when the timeout passed; their workers are
+        stopped anyway.
+        """
+        self.accepting = False
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            while self._jobs:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    break
+                self._lock.wait(remaining)
+            drained = not self._jobs
+
+        for slot in self._slots:
+            slot.jobs.put(None)
+        for slot in self._slots:
+            remaining = max(deadline - time.monotonic(), 0) if deadline is not None else None
+            slot.process.join(remaining)
+            if slot.process.is_alive():
+                slot.process.kill()
+                slot.process.join()
+
+        with self._lock:
+            for job in list(self._jobs.values()):
+                self._finish(job, error="Worker pool shut down before the run finished")
+        self._closing.set()
+        return drained
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Health of each worker slot, with its load, cache and model route counters"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "worker": slot.worker_id,
+                    "pid": slot.process.pid if slot.process else None,
+                    "alive": bool(slot.process and slot.process.is_alive()),
+                    "in_flight": len(slot.in_flight),
+                    "restarts": slot.restarts,
+                    "seconds_since_heartbeat": round(now - slot.last_heartbeat, 1),
+                    "completed": slot.info.get("completed", 0),
+                    "failed": slot.info.get("failed", 0),
+                    "caches": slot.info.get("caches", {}),
+                    "routes": slot.info.get("routes", {}),
+                }
+                for slot in self._slots
+            ]
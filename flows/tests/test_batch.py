@@ -0,0 +1,57 @@
+import sys
+
+import pytest
+
+from travel_flow.batch import batch, job_from_request, job_id_from_request
+from travel_flow.work_queue import SQLiteWorkQueue
+
+
+def test_job_from_request():
+    assert job_from_request({"query": " 3 days in Rome ", "time_budget": "60"}) == {"query": "3 days in Rome", "time_budget": 60.0}
+
+
+@pytest.mark.parametrize("request_line", [{}, {"query": "  "}, {"body": "3 days in Rome"}])
+def test_job_from_request_needs_a_query(request_line):
+    with pytest.raises(ValueError):
+        job_from_request(request_line)
+
+
+def test_job_id_from_request():
+    assert job_id_from_request({"request_id": "user-001"}) == "user-001"
+    assert job_id_from_request({"run_id": "run.2", "request_id": "user-001"}) == "run.2"
+    assert job_id_from_request({}) is None
+
+
+@pytest.mark.parametrize("job_id", ["../etc", "/tmp/x", "..", ".hidden", "a/b", "a\\b", "", 7])
+def test_job_id_from_request_rejects_unsafe_ids(job_id):
+    with pytest.raises(ValueError):
+        job_id_from_request({"request_id": job_id})
+
+
+def test_enqueue_reports_duplicates(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.db"))
+    assert queue.enqueue({"query": "q"}, job_id="a") == "a"
+    assert queue.enqueue({"query": "q"}, job_id="a") is None
+    assert queue.enqueue({"query": "q"}) is not None
+
+
+def test_enqueue_command_skips_bad_lines(tmp_path, monkeypatch, capsys):
+    requests_file = tmp_path / "requests.jsonl"
+    requests_file.write_text("\n".join([
+        '{"query": "3 days in Rome", "request_id": "user-001"}',
+        "not json",
+        '["not", "an", "object"]',
+        '{"query": "3 days in Rome", "request_id": "../escape"}',
+        '{"query": "3 days in Rome", "request_id": "user-001"}',
+        '{"query": "2 days in Paris"}',
+    ]))
+    queue_path = str(tmp_path / "queue.db")
+    monkeypatch.setattr(sys, "argv", ["batch", "--queue", queue_path, "enqueue", str(requests_file)])
+
+    batch()
+
+    output = capsys.readouterr().out
+    for line_number in (2, 3, 4):
+        assert f"Skipping line {line_number}" in output
+    assert "Queued 2 jobs" in output and "1 already queued" in output
+    assert SQLiteWorkQueue(queue_path).stats()["queued"] == 2
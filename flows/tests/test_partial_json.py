@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from travel_flow.models import TripDetails
+from travel_flow.partial_json import StreamingJSONParser, parse_model_output, repair_json
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"duration": 5 days}', {"duration": "5 days"}),
+    ('{"time": 9:00 AM, "open": True}', {"time": "9:00 AM", "open": True}),
+    ("{destination: Rome, budget: low , group_size: 2}", {"destination": "Rome", "budget": "low", "group_size": 2}),
+    ('{"interests": [art, street food ,]}', {"interests": ["art", "street food"]}),
+    ("{'note': 'it\\'s open'}", {"note": "it's open"}),
+    ("{'note': 'say \"hi\"'}", {"note": 'say "hi"'}),
+    ('{"note": "a\\qb"}', {"note": "aqb"}),
+    ('{"note": "caf\\u00e9"}', {"note": "café"}),
+    ('{"note": "line one\nline two"}', {"note": "line one\nline two"}),
+    ('Here you go: {"a": 1, "b": null,} Hope this helps', {"a": 1, "b": None}),
+])
+def test_repairs_llm_json(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": "caf\\u00', {"a": "caf"}),
+    ('{"a": "caf\\', {"a": "caf"}),
+    ('{"a": "x", "b": 5 da', {"a": "x", "b": "5 da"}),
+    ('{"a": "x", "b', {"a": "x"}),
+    ('{"a": [1, 2', {"a": [1, 2]}),
+])
+def test_closes_truncated_json(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+def test_parse_model_output_reads_unquoted_values():
+    details = parse_model_output("{destination: Rome, duration: 5 days, interests: [food]}", TripDetails)
+    assert details == TripDetails(destination="Rome", duration="5 days", interests=["food"])
+
+
+def test_parse_model_output_drops_invalid_fields():
+    details = parse_model_output('{"destination": "Rome", "group_size": "a few"}', TripDetails)
+    assert details == TripDetails(destination="Rome")
+
+
+def test_streaming_publishes_only_completed_members():
+    parser = StreamingJSONParser(start_marker="")
+    assert parser.feed('{"destination": "Ro') == {}
+    assert parser.feed('me", "budget": "mod') == {"destination": "Rome"}
+    assert parser.feed('erate", "duration": 5') == {"budget": "moderate"}
+    # An unquoted value may go on after a space, so it is published only once it ends
+    assert parser.feed(" days") == {}
+    assert parser.feed("}") == {"duration": "5 days"}
+
+
+def test_streaming_skips_text_before_the_final_answer():
+    parser = StreamingJSONParser()
+    assert parser.feed('Thought: {"destination": "Paris"} looks right\n') == {}
+    assert parser.feed('Final Answer: {"destination": "Rome",') == {"destination": "Rome"}
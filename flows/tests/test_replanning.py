@@ -0,0 +1,64 @@
+from travel_flow.models import TripDetails
+from travel_flow.replanning import (
+    compute_invalidation, join_plan_sections, load_previous_state, shorten_plan_sections, split_plan_days,
+)
+
+PLAN = """### 3-Day Trip to Rome
+
+#### Day 1: Ancient Rome
+- Colosseum
+
+#### Day 2: Vatican
+- St. Peter's
+
+#### Day 3: Trastevere
+- Food tour
+
+### Total Trip Budget Summary
+- 3 days of meals: €90
+
+### Final Tips
+- Book the Vatican early"""
+
+
+def test_split_and_join_plan_days():
+    sections = split_plan_days(PLAN)
+    assert sections.header == "### 3-Day Trip to Rome"
+    assert sorted(sections.days) == [1, 2, 3]
+    assert sections.footer.startswith("### Total Trip Budget Summary")
+    assert split_plan_days(join_plan_sections(sections)) == sections
+
+
+def test_shorter_trip_only_drops_days():
+    old = TripDetails(destination="Rome", duration="3 days", budget="low")
+    new = TripDetails(destination="Rome", duration="2 days", budget="low")
+    invalidation = compute_invalidation(old, new, PLAN)
+    assert not invalidation.regenerate_full_plan
+    assert invalidation.days_to_generate == []
+    assert invalidation.days_to_drop == [3]
+
+
+def test_longer_trip_generates_new_days():
+    old = TripDetails(destination="Rome", duration="3 days", budget="low")
+    new = TripDetails(destination="Rome", duration="5 days", budget="low")
+    invalidation = compute_invalidation(old, new, PLAN)
+    assert invalidation.days_to_generate == [4, 5]
+    assert invalidation.days_to_drop == []
+
+
+def test_shorten_plan_sections_fixes_title_and_drops_budget():
+    sections = split_plan_days(PLAN)
+    sections.days.pop(3)
+    shorten_plan_sections(sections, 3, 2)
+    assert sections.header == "### 2-Day Trip to Rome"
+    assert "Budget" not in sections.footer
+    assert sections.footer == "### Final Tips\n- Book the Vatican early"
+
+
+def test_load_previous_state_restores_the_query(tmp_path):
+    (tmp_path / "user_query.txt").write_text("3 days in Rome on a budget")
+    (tmp_path / "trip_details.json").write_text('{"destination": "Rome", "duration": "3 days"}')
+    (tmp_path / "complete_trip_plan.md").write_text("# Trip to Rome\n\n## Your Itinerary\n\n" + PLAN)
+    state = load_previous_state(str(tmp_path))
+    assert state.user_query == "3 days in Rome on a budget"
+    assert state.final_trip_plan == PLAN
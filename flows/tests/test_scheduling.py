@@ -0,0 +1,134 @@
+from datetime import date
+
+import pytest
+
+from travel_flow.models import Attraction
+from travel_flow.scheduling import (
+    MAX_VISITS_PER_DAY, Gazetteer, parse_opening_hours, parse_start_date, parse_visit_minutes, schedule_trip,
+)
+
+GAZETTEER = Gazetteer({
+    "paris, ile de france, france": {
+        "Eiffel Tower": [48.8584, 2.2945],
+        "Louvre Museum": [48.8606, 2.3376],
+        "Musée d'Orsay": [48.8600, 2.3266],
+        "Sacré-Cœur Basilica": [48.8867, 2.3431],
+    },
+    "new york, ny, usa": {
+        "Central Park": [40.7829, -73.9654],
+    },
+})
+
+
+def attraction(name, location="", opening_hours=None, visit_time=None):
+    return Attraction(name=name, description="", location=location, opening_hours=opening_hours, estimated_visit_time=visit_time)
+
+
+def minutes(clock):
+    hours, mins = clock.split(":")
+    return int(hours) * 60 + int(mins)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("9:00 AM - 6:00 PM", (9 * 60, 18 * 60, set())),
+    ("9-5", (9 * 60, 17 * 60, set())),
+    ("10am-6pm, closed Mondays", (10 * 60, 18 * 60, {0})),
+    ("09:30-17:30, closed on Tuesday and Wednesday", (9 * 60 + 30, 17 * 60 + 30, {1, 2})),
+    ("18:00-02:00", (18 * 60, 24 * 60, set())),
+    ("Open 24 hours", (0, 24 * 60, set())),
+    (None, (0, 24 * 60, set())),
+])
+def test_parse_opening_hours(text, expected):
+    hours = parse_opening_hours(text)
+    assert (hours.open, hours.close, set(hours.closed_weekdays)) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2 hours", 120), ("1-2 hrs", 90), ("45 minutes", 45), ("half day", 240), (None, 90),
+])
+def test_parse_visit_minutes(text, expected):
+    assert parse_visit_minutes(text) == expected
+
+
+def test_parse_start_date():
+    assert parse_start_date("June 3rd, 2025") == date(2025, 6, 3)
+    assert parse_start_date("2025-06-03") == date(2025, 6, 3)
+    assert parse_start_date("next month") is None
+
+
+@pytest.mark.parametrize("destination, found", [
+    ("Paris", True),
+    ("Paris, France", True),
+    ("paris ile-de-france", True),
+    ("Paris, Texas", False),
+    ("Paris Texas", False),
+    ("New York City", True),
+    ("New York, NY", True),
+    ("Newark", False),
+    ("Lyon", False),
+])
+def test_gazetteer_matches_whole_destination_names(destination, found):
+    coordinates = GAZETTEER.lookup("Eiffel Tower", destination) or GAZETTEER.lookup("Central Park", destination)
+    assert (coordinates is not None) == found
+
+
+def test_gazetteer_matches_similar_names_within_the_destination():
+    assert GAZETTEER.lookup("The Louvre", "Paris") == (48.8606, 2.3376)
+    assert GAZETTEER.lookup("Sacre Coeur", "Paris") == (48.8867, 2.3431)
+    assert GAZETTEER.lookup("Central Park", "Paris") is None
+
+
+def test_visits_stay_within_opening_hours():
+    skeleton = schedule_trip([
+        attraction("Evening Show", opening_hours="5pm-11pm", visit_time="2 hours"),
+        attraction("Morning Market", opening_hours="8:00-11:00", visit_time="1 hour"),
+        attraction("Museum", opening_hours="10:00-18:00", visit_time="2 hours"),
+    ], 1, gazetteer=GAZETTEER)
+
+    visits = {visit.name: visit for visit in skeleton.days[0].visits}
+    assert [visit.name for visit in skeleton.days[0].visits] == ["Morning Market", "Museum", "Evening Show"]
+    assert minutes(visits["Morning Market"].end) <= 11 * 60
+    assert minutes(visits["Evening Show"].start) >= 17 * 60
+    assert skeleton.unscheduled == []
+
+
+def test_weekday_closures_move_visits_to_open_days():
+    # 2025-06-02 is a Monday
+    skeleton = schedule_trip([
+        attraction("Louvre Museum", opening_hours="9am-6pm, closed Tuesdays", visit_time="3 hours"),
+        attraction("Musée d'Orsay", opening_hours="9:30-18:00, closed Mondays", visit_time="3 hours"),
+        attraction("Eiffel Tower", opening_hours="9:00-23:00", visit_time="2 hours"),
+        attraction("Sacré-Cœur Basilica", opening_hours="6:00-22:30", visit_time="1 hour"),
+    ], 2, destination="Paris, France", start_date=date(2025, 6, 2), gazetteer=GAZETTEER)
+
+    day_of = {visit.name: day.date for day in skeleton.days for visit in day.visits}
+    assert day_of["Musée d'Orsay"] != "2025-06-02"
+    assert day_of["Louvre Museum"] != "2025-06-03"
+    assert skeleton.unscheduled == []
+
+
+def test_days_are_packed_without_overlaps():
+    attractions = [attraction(f"Sight {index}", visit_time="1 hour") for index in range(12)]
+    skeleton = schedule_trip(attractions, 5, gazetteer=GAZETTEER)
+
+    scheduled = [visit.name for day in skeleton.days for visit in day.visits]
+    assert sorted(scheduled + skeleton.unscheduled) == sorted(a.name for a in attractions)
+    for day in skeleton.days:
+        assert len(day.visits) <= MAX_VISITS_PER_DAY
+        for previous, following in zip(day.visits, day.visits[1:]):
+            assert minutes(previous.end) <= minutes(following.start)
+    # 12 one-hour visits need 3 sightseeing days, the rest of the trip is left free
+    assert sum(1 for day in skeleton.days if day.visits) == 3
+    assert set(skeleton.unlocated) == {a.name for a in attractions}
+
+
+def test_located_attractions_are_grouped_by_area():
+    skeleton = schedule_trip([
+        attraction("West A", location="48.8584, 2.2945"),
+        attraction("East A", location="48.8530, 2.3700"),
+        attraction("West B", location="48.8600, 2.2900"),
+        attraction("East B", location="48.8550, 2.3750"),
+    ], 2, gazetteer=GAZETTEER, destination="Paris")
+
+    days = [{visit.name.split()[0] for visit in day.visits} for day in skeleton.days if day.visits]
+    assert sorted(map(sorted, days)) == [["East"], ["West"]]
@@ -0,0 +1,47 @@
+import pytest
+
+from travel_flow.semantic_cache import SemanticCache, normalize_query, query_entities
+
+CACHED_QUERIES = [
+    "top attractions in Paris for a 5 day trip",
+    "things to do in Paris",
+    "budget friendly things to do in Rome",
+]
+
+
+@pytest.fixture
+def cache():
+    cache = SemanticCache("test", max_entries=16, threshold=0.75, ttl=60, verify_every=0)
+    for query in CACHED_QUERIES:
+        cache.set(query, query)
+    return cache
+
+
+@pytest.mark.parametrize("query, cached", [
+    ("best attractions in Paris for a 5-day trip", CACHED_QUERIES[0]),
+    ("must-see sights in Paris for a 5 days trip", CACHED_QUERIES[0]),
+    ("top attractions in Paris for 5 nights", CACHED_QUERIES[0]),
+    ("places to visit in Paris", CACHED_QUERIES[1]),
+    ("cheap things to do in Rome", CACHED_QUERIES[2]),
+])
+def test_paraphrases_are_served(cache, query, cached):
+    hit = cache.lookup(query)
+    assert hit is not None and hit.value == cached
+
+
+@pytest.mark.parametrize("query", [
+    "top attractions in Paris for a 5 week trip",
+    "top attractions in Paris for a 7 day trip",
+    "things to do in Paris at night",
+    "Paris nightlife",
+    "things to do in Lyon",
+    "luxury things to do in Rome",
+])
+def test_near_misses_are_not_served(cache, query):
+    assert cache.lookup(query) is None
+
+
+def test_nights_are_days_only_after_a_number():
+    assert normalize_query("4 nights in Lisbon") == "4 day in lisbon"
+    assert query_entities(normalize_query("4 nights in Lisbon")) == {"4 day", "lisbon"}
+    assert query_entities(normalize_query("Lisbon at night")) == {"lisbon", "night"}
@@ -0,0 +1,36 @@
+import pytest
+
+from travel_flow.semantic_cache import SemanticCache
+from travel_flow.tools import tavily_search_tool
+from travel_flow.tools.tavily_search_tool import SearchError, TavilySearchTool
+
+CACHED = {"results": [{"url": "https://example.com/louvre", "title": "Louvre"}]}
+FRESH = {"results": [{"url": "https://example.com/orsay", "title": "Musée d'Orsay"}]}
+
+
+@pytest.fixture
+def semantic_cache(monkeypatch):
+    monkeypatch.setenv("TAVILY_API_KEY", "test")
+    cache = SemanticCache("test_search", max_entries=16, threshold=0.75, ttl=60, verify_every=1)
+    monkeypatch.setattr(tavily_search_tool, "get_semantic_cache", lambda name, size: cache)
+    return cache
+
+
+def test_verified_hit_is_replaced_by_the_fresh_response(monkeypatch, semantic_cache):
+    semantic_cache.set("top attractions in Marseille", (5, CACHED))
+    monkeypatch.setattr(TavilySearchTool, "_request", staticmethod(lambda api_key, query, max_results: FRESH))
+
+    assert TavilySearchTool().search("Marseille top attractions guide", 5) == FRESH
+    assert semantic_cache.stats()["verified"] == 1
+
+
+def test_failed_verification_still_serves_the_hit(monkeypatch, semantic_cache):
+    semantic_cache.set("top attractions in Nantes", (5, CACHED))
+
+    def failing_request(api_key, query, max_results):
+        raise SearchError("connection reset")
+
+    monkeypatch.setattr(TavilySearchTool, "_request", staticmethod(failing_request))
+
+    assert TavilySearchTool().search("Nantes top attractions guide", 5) == CACHED
+    assert semantic_cache.stats()["verified"] == 0
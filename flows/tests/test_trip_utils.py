@@ -0,0 +1,40 @@
+import pytest
+
+from travel_flow.models import TripDetails
+from travel_flow.trip_utils import attractions_cache_key, duration_bucket, parse_duration_days
+
+
+@pytest.mark.parametrize("duration, days", [
+    ("5", 5),
+    ("5 days", 5),
+    ("a 5-day trip", 5),
+    ("five days", 5),
+    ("4 nights", 4),
+    ("5 days 4 nights", 5),
+    ("6 nights/7 days", 7),
+    ("7 days / 6 nights", 7),
+    ("2 weeks", 14),
+    ("2 weeks (14 days)", 14),
+    ("1 week and 3 days", 10),
+    ("a fortnight", 14),
+    ("1 month", 30),
+    ("a weekend", 2),
+    ("1.5 weeks", 10),
+])
+def test_parse_duration_days(duration, days):
+    assert parse_duration_days(duration) == days
+
+
+@pytest.mark.parametrize("duration", [None, "", "a while", "weekend getaway ideas", "weekly"])
+def test_parse_duration_days_unreadable(duration):
+    assert parse_duration_days(duration) is None
+
+
+def test_duration_bucket():
+    assert [duration_bucket(days) for days in (None, 1, 3, 4, 7, 8)] == [None, "short", "short", "medium", "medium", "long"]
+
+
+def test_days_and_nights_share_a_cache_bucket():
+    days = TripDetails(destination="Lisbon", duration="5 days", budget="low")
+    days_and_nights = TripDetails(destination="Lisbon", duration="5 days 4 nights", budget="low")
+    assert attractions_cache_key(days) == attractions_cache_key(days_and_nights)